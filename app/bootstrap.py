@@ -0,0 +1,111 @@
+# backend-python/app/bootstrap.py
+"""
+Preparación del proceso: esquema, categorías iniciales y cachés.
+
+- Con gunicorn --preload (gunicorn.conf.py) prepare() corre una sola vez en
+  el master, antes del fork: los workers heredan el índice de búsqueda y la
+  caché ya cargados y su arranque se reduce a abrir el event loop.
+- Sin preload (uvicorn, desarrollo) la ejecuta el startup de cada proceso;
+  el esquema se comprueba con una sola consulta (ver utils/schema.py).
+
+Los tiempos de arranque en frío y de reinicio de workers se registran en
+`timings`, se imprimen y se exponen en /internal/startup.
+"""
+import os
+import time
+from typing import Any, Dict
+
+_process_started = time.perf_counter()
+
+from .database import SessionLocal, engine  # noqa: E402
+from .models.base import Base  # noqa: E402
+from .services import category_service, change_service, product_service, search_service, stats_service  # noqa: E402
+from .utils.schema import ensure_schema  # noqa: E402
+
+# Precarga del índice de búsqueda en memoria y de product_cache. Se hace
+# siempre en el master con preload; en cada proceso sólo si STARTUP_WARM
+# (construir el índice de búsqueda en memoria lleva segundos con 100k filas)
+STARTUP_WARM = os.getenv("STARTUP_WARM", "false").lower() in ("1", "true", "yes")
+# Productos más recientes que se precargan en product_cache
+STARTUP_WARM_PRODUCTS = int(os.getenv("STARTUP_WARM_PRODUCTS", "1000"))
+
+timings: Dict[str, Any] = {"pid": os.getpid(), "import_s": round(time.perf_counter() - _process_started, 4)}
+_prepared = False
+
+
+def _elapsed(since: float) -> float:
+    return round(time.perf_counter() - since, 4)
+
+
+def prepare(warm: bool = STARTUP_WARM) -> Dict[str, Any]:
+    """
+    Esquema, categorías iniciales y, con `warm`, precalentamiento.
+    Idempotente: si ya se hizo en este proceso (o en el master antes del
+    fork) no repite nada.
+    """
+    global _prepared
+    if _prepared:
+        return timings
+    started = time.perf_counter()
+
+    migrated = ensure_schema(
+        engine, Base.metadata,
+        steps=[search_service.ensure_indexes, stats_service.ensure_triggers, change_service.ensure_triggers],
+        extra=[*search_service.schema_ddl(), *stats_service.schema_ddl(), *change_service.schema_ddl()],
+    )
+    timings["schema_migrated"] = migrated
+    timings["schema_s"] = _elapsed(started)
+
+    db = SessionLocal()
+    try:
+        step = time.perf_counter()
+        created = category_service.ensure_categories(db, category_service.INITIAL_CATEGORIES)
+        timings["categories_created"] = created
+        # Copia en memoria de las categorías: con preload la heredan los workers
+        category_service.category_snapshot.reload(db)
+        timings["categories_s"] = _elapsed(step)
+
+        # Deltas de estadísticas acumulados mientras nadie compactaba
+        # (p. ej. una carga con seed_products)
+        step = time.perf_counter()
+        stats_service.compact(db)
+        timings["stats_s"] = _elapsed(step)
+
+        step = time.perf_counter()
+        if warm:
+            search_service.warm_index(db)
+            timings["warm_products"] = product_service.warm_product_cache(db, STARTUP_WARM_PRODUCTS)
+        timings["warm_s"] = _elapsed(step)
+    finally:
+        db.close()
+
+    timings["prepare_s"] = _elapsed(started)
+    timings["cold_start_s"] = _elapsed(_process_started)
+    _prepared = True
+    print(
+        f"🚀 Preparado en {timings['prepare_s']:.3f}s (esquema {timings['schema_s']:.3f}s, "
+        f"categorías {timings['categories_s']:.3f}s, precarga {timings['warm_s']:.3f}s); "
+        f"arranque en frío {timings['cold_start_s']:.3f}s"
+    )
+    return timings
+
+
+def _after_fork() -> None:
+    global _process_started
+    _process_started = time.perf_counter()
+    timings["pid"] = os.getpid()
+    timings["forked"] = True
+
+
+os.register_at_fork(after_in_child=_after_fork)
+
+
+def worker_ready() -> Dict[str, Any]:
+    """
+    Marca el fin del arranque del proceso actual (startup de la app). En un
+    worker creado por fork mide el reinicio: del fork a aceptar peticiones.
+    """
+    key = "worker_ready_s" if timings.get("forked") else "ready_s"
+    timings[key] = _elapsed(_process_started)
+    print(f"✅ Worker {os.getpid()} listo en {timings[key]:.3f}s")
+    return timings
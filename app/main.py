@@ -1,11 +1,29 @@
 import os
+import anyio
+from . import bootstrap  # Primero: marca el inicio del arranque
 from fastapi import FastAPI
+from fastapi.responses import PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
-from .database import engine
-from .models import category, product
+from fastapi.staticfiles import StaticFiles
+from .database import READ_YOUR_WRITES_COOKIE, READ_YOUR_WRITES_SECONDS, THREADPOOL_SIZE, read_replicas
 from .routes import product as product_routes, category as category_routes
-from .database import get_db
-from .routes import upload
+from .routes import upload, internal, changes as change_routes
+from .services import change_service, stats_service
+from .services.category_service import category_snapshot
+from .services.product_service import product_cache
+from .utils import metrics, storage
+from .utils.admission import AdmissionMiddleware, route_class
+from .utils.body_limit import BodySizeLimitMiddleware
+from .utils.replicas import ReadYourWritesMiddleware
+from .utils.request_metrics import MetricsMiddleware, instrument_sqlalchemy, register_cache
+
+
+def is_write(method: str, path: str) -> bool:
+    """
+    Peticiones tras las que el cliente debe leer de la primaria
+    """
+    return route_class(method, path) in ("write", "priority", "upload")
+
 
 app = FastAPI(
     title="Productos API",
@@ -13,6 +31,28 @@ app = FastAPI(
     version="1.0.0"
 )
 
+# Control de admisión por clase de ruta: el más interno, para que los 503
+# lleven cabeceras CORS y queden en las métricas
+app.add_middleware(AdmissionMiddleware)
+
+# Subidas demasiado grandes: 413 antes de recibir el cuerpo y sin esperar turno
+app.add_middleware(
+    BodySizeLimitMiddleware,
+    max_bytes=upload.UPLOAD_MAX_BYTES + upload.UPLOAD_FORM_OVERHEAD,
+    paths=("/api/upload",),
+    detail=upload.UPLOAD_TOO_LARGE,
+)
+
+# Con réplicas de lectura: tras escribir, el cliente lee de la primaria
+# durante READ_YOUR_WRITES_SECONDS (cookie)
+if read_replicas:
+    app.add_middleware(
+        ReadYourWritesMiddleware,
+        cookie=READ_YOUR_WRITES_COOKIE,
+        seconds=READ_YOUR_WRITES_SECONDS,
+        is_write=is_write,
+    )
+
 # Configurar CORS
 app.add_middleware(
     CORSMiddleware,
@@ -26,23 +66,46 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Métricas de cada petición (latencia, estados, consultas SQL)
+app.add_middleware(MetricsMiddleware)
+instrument_sqlalchemy()
+register_cache("productos", product_cache)
+register_cache("categorias", category_snapshot)
+
 @app.on_event("startup")
 async def startup_event():
-    # Crear tablas si no existen
-    category.Base.metadata.create_all(bind=engine)
-    product.Base.metadata.create_all(bind=engine)
+    # Hilos que pueden ocupar a la vez una conexión del pool (rutas sync)
+    anyio.to_thread.current_default_thread_limiter().total_tokens = THREADPOOL_SIZE
+    metrics.start_exporter()
 
-    # Crear categorías iniciales
-    db = next(get_db())
-    try:
-        await category_routes.create_initial_categories(db)
-    finally:
-        db.close()
+    # Esquema, categorías iniciales y precarga; no hace nada si el master
+    # ya lo hizo antes del fork (gunicorn --preload)
+    bootstrap.prepare()
+    stats_service.start_compactor()
+    change_service.start_sequencer()
+    change_service.start_compactor()
+    read_replicas.start_health_checks()
+    bootstrap.worker_ready()
 
 # Incluir rutas
 app.include_router(product_routes.router, prefix="/api/products", tags=["products"])
 app.include_router(category_routes.router, prefix="/api/categories", tags=["categories"])
 app.include_router(upload.router, prefix="/api/upload", tags=["upload"])
+app.include_router(change_routes.router, prefix="/api/changes", tags=["changes"])
+app.include_router(internal.router, prefix="/internal", tags=["internal"], include_in_schema=False)
+
+# Con almacenamiento local las imágenes se sirven desde la propia API
+if storage.STORAGE_BACKEND == "local":
+    os.makedirs(storage.MEDIA_ROOT, exist_ok=True)
+    app.mount(storage.MEDIA_URL, StaticFiles(directory=storage.MEDIA_ROOT), name="media")
+
+@app.get("/metrics", include_in_schema=False)
+def metrics_endpoint():
+    # Agregado de todos los workers si METRICS_DIR está definido
+    return PlainTextResponse(
+        metrics.render_text(metrics.collect()),
+        media_type="text/plain; version=0.0.4; charset=utf-8",
+    )
 
 @app.get("/")
 def root():
@@ -1,3 +1,6 @@
 # backend-python/app/models/__init__.py
 from .category import Category
-from .product import Product
\ No newline at end of file
+from .product import Product
+from .image import ImageAsset
+from .category_stats import CategoryStats, CategoryStatsDelta
+from .change import Change, ChangeLogState
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Text
+from sqlalchemy import Column, Integer, String, Text, DateTime, Index, func, literal_column
 from .base import Base
 
 class Category(Base):
@@ -7,6 +7,15 @@ class Category(Base):
     id = Column(Integer, primary_key=True, index=True, autoincrement=True)
     nombre = Column(String(100), nullable=False, unique=True)
     descripcion = Column(Text)
+    version = Column(Integer, nullable=False, default=1, server_default="1",
+                     onupdate=literal_column("version") + 1)
+    actualizado_en = Column(DateTime(timezone=True), default=func.now(), server_default=func.now(),
+                            onupdate=func.now())
     
     def __repr__(self):
         return f"<Category(id={self.id}, nombre='{self.nombre}')>"
+
+
+# Nombres únicos sin distinguir mayúsculas: category_service detecta los
+# duplicados por la violación de este índice, sin consultar antes
+Index("ux_categorias_nombre_lower", func.lower(Category.nombre), unique=True)
@@ -0,0 +1,33 @@
+from sqlalchemy import BigInteger, Column, Integer, Numeric
+from .base import Base
+
+class CategoryStats(Base):
+    """
+    Agregados por categoría (ver services/stats_service.py). Nunca se
+    escriben desde las rutas: los triggers de `productos` anotan cada cambio
+    en CategoryStatsDelta y la compactación los suma aquí.
+    """
+    __tablename__ = "categoria_stats"
+
+    categoria_id = Column(Integer, primary_key=True)
+    productos = Column(Integer, nullable=False, default=0, server_default="0")
+    stock_total = Column(BigInteger, nullable=False, default=0, server_default="0")
+    con_stock = Column(Integer, nullable=False, default=0, server_default="0")
+    precio_total = Column(Numeric(18, 2), nullable=False, default=0, server_default="0")
+
+    def __repr__(self):
+        return f"<CategoryStats(categoria_id={self.categoria_id}, productos={self.productos})>"
+
+class CategoryStatsDelta(Base):
+    """
+    Cambios pendientes de compactar: sólo se insertan (sin bloqueos entre
+    escrituras concurrentes de la misma categoría)
+    """
+    __tablename__ = "categoria_stats_delta"
+
+    id = Column(BigInteger().with_variant(Integer, "sqlite"), primary_key=True, autoincrement=True)
+    categoria_id = Column(Integer, nullable=False)
+    productos = Column(Integer, nullable=False)
+    stock_total = Column(BigInteger, nullable=False)
+    con_stock = Column(Integer, nullable=False)
+    precio_total = Column(Numeric(18, 2), nullable=False)
@@ -0,0 +1,42 @@
+from sqlalchemy import BigInteger, Column, DateTime, Index, Integer, String, func, text
+from .base import Base
+
+class Change(Base):
+    """
+    Registro de cambios del catálogo (ver services/change_service.py). Lo
+    escriben los triggers de `productos` y `categorias` en la misma
+    transacción que el cambio; `seq` se asigna después, en orden de commit.
+    """
+    __tablename__ = "cambios"
+    __table_args__ = (
+        Index("ux_cambios_seq", "seq", unique=True),
+        # Cambios todavía sin número de secuencia
+        Index(
+            "ix_cambios_pendientes", "id",
+            postgresql_where=text("seq IS NULL"), sqlite_where=text("seq IS NULL"),
+        ),
+        # Compactación: último cambio de cada entidad
+        Index("ix_cambios_entidad", "entidad", "entidad_id", "seq"),
+        # AUTOINCREMENT: SQLite no reutiliza ids tras borrar los últimos
+        {"sqlite_autoincrement": True},
+    )
+
+    id = Column(BigInteger().with_variant(Integer, "sqlite"), primary_key=True, autoincrement=True)
+    seq = Column(BigInteger)
+    entidad = Column(String(20), nullable=False)  # producto | categoria
+    entidad_id = Column(String(50), nullable=False)
+    operacion = Column(String(10), nullable=False)  # insert | update | delete
+    version = Column(Integer)  # Versión de la fila tras el cambio (None en las bajas)
+    creado_en = Column(DateTime(timezone=True), nullable=False, server_default=func.now())
+
+    def __repr__(self):
+        return f"<Change(seq={self.seq}, {self.entidad}={self.entidad_id}, {self.operacion})>"
+
+class ChangeLogState(Base):
+    """
+    Marcas de la compactación del registro de cambios (clave -> seq)
+    """
+    __tablename__ = "cambios_estado"
+
+    clave = Column(String(50), primary_key=True)
+    valor = Column(BigInteger, nullable=False)
@@ -0,0 +1,16 @@
+from sqlalchemy import Column, String, Text
+from .base import Base
+
+class ImageAsset(Base):
+    """
+    Índice de contenido: hash SHA-256 de la imagen original -> URLs ya
+    subidas, para no volver a subir imágenes idénticas
+    """
+    __tablename__ = "imagenes"
+
+    hash = Column(String(64), primary_key=True)
+    url = Column(String(255), nullable=False)
+    variantes = Column(Text)  # JSON {"320": url, ...} con las miniaturas
+
+    def __repr__(self):
+        return f"<ImageAsset(hash={self.hash[:12]}, url='{self.url}')>"
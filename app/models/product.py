@@ -1,9 +1,25 @@
-from sqlalchemy import Column, String, Text, Numeric, Integer, ForeignKey
+from sqlalchemy import Column, String, Text, Numeric, Integer, ForeignKey, DateTime, Index, func, literal_column
 from .base import Base
 import uuid
 
 class Product(Base):
     __tablename__ = 'productos'
+    # Índices de los listados con filtros y orden (product_service)
+    __table_args__ = (
+        # Categoría + rango/orden de precio; también el precio mínimo y
+        # máximo de cada categoría (stats_service)
+        Index("ix_productos_categoria_precio_id", "categoria_id", "precio", "id"),
+        # Categoría con el orden por defecto (id) y paginación por cursor
+        Index("ix_productos_categoria_id", "categoria_id", "id"),
+        # Orden y rango de precio, y orden por nombre, sin filtro de categoría
+        Index("ix_productos_precio_id", "precio", "id"),
+        Index("ix_productos_nombre_id", "nombre", "id"),
+        # Prefijo de SKU con LIKE 'abc%' en PostgreSQL (en SQLite se usa un
+        # rango sobre el índice único de sku)
+        Index(
+            "ix_productos_sku_pattern", "sku", postgresql_ops={"sku": "text_pattern_ops"}
+        ).ddl_if(dialect="postgresql"),
+    )
 
     id = Column(String(50), primary_key=True, index=True, default=lambda: str(uuid.uuid4()))
     nombre = Column(String(255), nullable=False)
@@ -13,6 +29,12 @@ class Product(Base):
     categoria_id = Column(Integer, ForeignKey('categorias.id'), nullable=False)
     sku = Column(String(50), unique=True)
     imagen_url = Column(String(255))  # Linea para la nueva columna para URL de imagen
+    # Versión de la fila: la incrementa cada UPDATE (también los de stock);
+    # con ella se calculan los ETag
+    version = Column(Integer, nullable=False, default=1, server_default="1",
+                     onupdate=literal_column("version") + 1)
+    actualizado_en = Column(DateTime(timezone=True), default=func.now(), server_default=func.now(),
+                            onupdate=func.now())
     
     def __repr__(self):
         return f"<Product(id={self.id}, nombre='{self.nombre}', precio={self.precio})>"
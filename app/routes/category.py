@@ -1,23 +1,67 @@
 # backend-python/app/routes/category.py
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Request, Response
 from sqlalchemy.orm import Session
-from ..database import get_db
-from ..schemas import Category, CategoryCreate
-from ..services import category_service
+from typing import Optional, Union
+from ..database import get_read_db, get_session, run_db
+from ..schemas import Category, CategoryCreate, CategoryUpdate, CategoryPage, CategoryStats
+from ..services import category_service, stats_service
+from ..utils import http_cache
+from ..utils.pagination import CURSOR_MAX_LIMIT, check_cursor_limit
 
 router = APIRouter()
 
 @router.post("/", response_model=Category, status_code=status.HTTP_201_CREATED)
-def create_category(category: CategoryCreate, db: Session = Depends(get_db)):
-    return category_service.create_category(db, category)
+async def create_category(category: CategoryCreate, db: Session = Depends(get_session)):
+    return await run_db(db, category_service.create_category, category)
 
-@router.get("/", response_model=list[Category])
-def get_categories(db: Session = Depends(get_db)):
-    return category_service.get_categories(db)
+async def _snapshot(db: Session) -> category_service.CategorySnapshot:
+    # Con la copia en memoria vigente no se pasa por el threadpool ni por la
+    # base de datos; si no, run_db la comprueba o la recarga
+    snapshot = category_service.category_snapshot.peek()
+    if snapshot is None:
+        snapshot = await run_db(db, category_service.get_snapshot)
+    return snapshot
+
+@router.get("/", response_model=Union[list[Category], CategoryPage])
+async def get_categories(
+    request: Request,
+    response: Response,
+    skip: int = Query(0, ge=0),
+    limit: int = Query(100, ge=0, description=f"Sin tope con skip; entre 1 y {CURSOR_MAX_LIMIT} con `after`"),
+    after: Optional[str] = Query(
+        None,
+        description="Cursor de paginación; envíelo vacío para pedir la primera página"
+    ),
+    db: Session = Depends(get_session)
+):
+    if after is not None:
+        check_cursor_limit(limit)
+    snapshot = await _snapshot(db)
+    # Con `after` se usa paginación por cursor y se devuelve `next_cursor`
+    if after is not None:
+        items, next_cursor = snapshot.page_after(after, limit)
+    else:
+        items, next_cursor = snapshot.page(skip, limit), None
+
+    # If-None-Match: las filas de la copia ya traen la versión, así que el
+    # 304 se decide sin consultas
+    validators = http_cache.collection_validators("categorias", items, next_cursor)
+    if http_cache.is_not_modified(request, validators, use_last_modified=False):
+        return http_cache.not_modified(validators)
+    http_cache.apply(response, validators)
+    if after is not None:
+        return {"items": items, "next_cursor": next_cursor}
+    return items
+
+# Debe declararse antes de /{category_id}
+@router.get("/stats", response_model=list[CategoryStats])
+async def get_category_stats(db: Session = Depends(get_read_db)):
+    # Contadores mantenidos por triggers: no recorre los productos
+    return await run_db(db, stats_service.get_category_stats)
 
 @router.get("/{category_id}", response_model=Category)
-def get_category(category_id: int, db: Session = Depends(get_db)):
-    category = category_service.get_category(db, category_id)
+async def get_category(category_id: int, db: Session = Depends(get_session)):
+    category = (await _snapshot(db)).by_id.get(category_id)
     if not category:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -26,34 +70,26 @@ def get_category(category_id: int, db: Session = Depends(get_db)):
     return category
 
 @router.put("/{category_id}", response_model=Category)
-def update_category(
+async def update_category(
     category_id: int, 
     category_update: CategoryCreate, 
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_session)
 ):
-    return category_service.update_category(db, category_id, category_update)
+    return await run_db(db, category_service.update_category, category_id, category_update)
+
+@router.patch("/{category_id}", response_model=Category)
+async def patch_category(
+    category_id: int,
+    category_update: CategoryUpdate,
+    db: Session = Depends(get_session)
+):
+    return await run_db(db, category_service.patch_category, category_id, category_update)
 
 @router.delete("/{category_id}", status_code=status.HTTP_204_NO_CONTENT)
-def delete_category(category_id: int, db: Session = Depends(get_db)):
-    if not category_service.delete_category(db, category_id):
+async def delete_category(category_id: int, db: Session = Depends(get_session)):
+    if not await run_db(db, category_service.delete_category, category_id):
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Categoría no encontrada"
         )
     return
-
-# Función para crear categorías iniciales
-async def create_initial_categories(db: Session = Depends(get_db)):
-    initial_categories = [
-        {"nombre": "Electrónicos", "descripcion": "Dispositivos electrónicos de consumo"},
-        {"nombre": "Ropa", "descripcion": "Prendas de vestir"},
-        {"nombre": "Alimentos", "descripcion": "Productos alimenticios"},
-        {"nombre": "Hogar", "descripcion": "Artículos para el hogar"},
-        {"nombre": "Deportes", "descripcion": "Artículos deportivos"}
-    ]
-    
-    for category_data in initial_categories:
-        if not category_service.get_category_by_name(db, category_data["nombre"]):
-            category_service.create_category(db, CategoryCreate(**category_data))
-    
-    print("✅ Categorías iniciales creadas")
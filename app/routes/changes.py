@@ -0,0 +1,43 @@
+# backend-python/app/routes/changes.py
+import time
+from typing import Optional
+
+import anyio
+from fastapi import APIRouter, Depends, Query, Request
+from sqlalchemy.orm import Session
+
+from ..database import get_session, run_db
+from .. import schemas
+from ..services import change_service
+from ..utils.admission import admission_slot
+
+# Registro de cambios para sincronización incremental (ver change_service)
+router = APIRouter()
+
+@router.get("/", response_model=schemas.ChangePage)
+async def get_changes(
+    request: Request,
+    since: int = Query(0, ge=0, description="Último seq procesado (next_since de la respuesta anterior)"),
+    limit: int = Query(100, ge=1, le=1000),
+    entidad: Optional[str] = Query(None, pattern="^(producto|categoria)$"),
+    wait: float = Query(
+        0, ge=0, le=change_service.CHANGES_MAX_WAIT,
+        description="Long-poll: segundos a esperar si no hay cambios nuevos"
+    ),
+    db: Session = Depends(get_session)
+):
+    page = await run_db(db, change_service.get_changes, since, limit, entidad)
+    deadline = time.monotonic() + wait
+    slot = admission_slot(request)
+    while not page["changes"] and time.monotonic() < deadline:
+        # La espera no ocupa una conexión del pool ni un lugar de admisión;
+        # el último seq se comparte entre las peticiones en espera del worker
+        await run_db(db, change_service.release)
+        if slot is not None:
+            slot.release()
+        await anyio.sleep(min(change_service.CHANGES_POLL_SECONDS, max(deadline - time.monotonic(), 0)))
+        if slot is not None and not await slot.reacquire():
+            break  # Saturado: el cliente recibe la página vacía y vuelve a preguntar
+        if await run_db(db, change_service.latest_seq_cached) > page["next_since"]:
+            page = await run_db(db, change_service.get_changes, page["next_since"], limit, entidad)
+    return page
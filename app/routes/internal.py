@@ -0,0 +1,62 @@
+from fastapi import APIRouter
+from .. import bootstrap
+from ..database import DB_MAX_OVERFLOW, DB_POOL_SIZE, DB_POOL_TIMEOUT, THREADPOOL_SIZE, engines, read_replicas
+from ..utils import admission, metrics
+from ..utils.db_pool import pool_status
+import os
+
+router = APIRouter()
+
+
+@router.get("/pool")
+def pool_stats():
+    """
+    Estado de los pools de conexiones de este worker
+    """
+    return {
+        "pid": os.getpid(),
+        "config": {
+            "pool_size": DB_POOL_SIZE,
+            "max_overflow": DB_MAX_OVERFLOW,
+            "pool_timeout": DB_POOL_TIMEOUT,
+            "threadpool_size": THREADPOOL_SIZE,
+        },
+        "pools": {name: pool_status(e.pool) for name, e in engines().items()},
+        "replicas": read_replicas.status(),
+    }
+
+
+@router.get("/admission")
+def admission_stats():
+    """
+    Límites, peticiones en curso y en cola por clase de ruta en este worker
+    """
+    return {"pid": os.getpid(), "enabled": admission.ADMISSION_CONTROL, "classes": admission.status()}
+
+
+@router.get("/latency")
+def latency_summary():
+    """
+    p50/p95/p99 por ruta, agregados entre workers
+    """
+    families = metrics.collect()
+    latency = families.get("http_request_duration_seconds", {"samples": {}})["samples"]
+    queries = families.get("http_request_db_queries", {"samples": {}})["samples"]
+    summary = []
+    for (method, route), snapshot in sorted(latency.items()):
+        db = queries.get((method, route))
+        summary.append({
+            "method": method,
+            "route": route,
+            **metrics.summarize(snapshot),
+            "db_queries_per_request": round(db["sum"] / db["count"], 2) if db and db["count"] else 0.0,
+        })
+    return summary
+
+
+@router.get("/startup")
+def startup_timings():
+    """
+    Tiempos de arranque de este proceso (ver app/bootstrap.py)
+    """
+    return bootstrap.timings
@@ -1,70 +1,266 @@
 # backend-python/app/routes/product.py
-from fastapi import APIRouter, Depends, HTTPException, status, Path
+from fastapi import APIRouter, Depends, HTTPException, status, Path, Query, Request, Response, UploadFile, File
 from sqlalchemy.orm import Session
-from ..database import get_db
+from typing import List, Optional, Union
+import json
+from fastapi.responses import StreamingResponse
+from ..database import DB_MODE, get_db, get_read_db, get_session, is_async_session, read_session_factory, run_db
 from .. import schemas
 from ..services import product_service  # Importar el servicio
+from ..services import export_service, import_service
+from ..utils import http_cache
+from ..utils.fast_json import FastJSONResponse, records
+from ..utils.pagination import CURSOR_MAX_LIMIT, check_cursor_limit
+
+_FAST_DESCRIPTION = (
+    "Respuesta rápida: lee tuplas de columnas y las codifica con orjson sin "
+    "pasar por objetos ORM ni por la validación del response_model"
+)
+
+def _fast_response(rows, headers: Optional[dict] = None, **envelope) -> FastJSONResponse:
+    items = records(product_service.PRODUCT_ROW_FIELDS, rows)
+    return FastJSONResponse({"items": items, **envelope} if envelope else items, headers=headers)
 
 # rutas de los productos
+# Las rutas son async y llaman a los servicios con run_db: en modo sync
+# (DB_MODE) van al threadpool y en modo async corren sobre AsyncSession
 router = APIRouter()
 
 @router.post("/", response_model=schemas.Product, status_code=status.HTTP_201_CREATED)
-def create_product(
-    product: schemas.ProductCreate, 
-    db: Session = Depends(get_db)
+async def create_product(
+    product: schemas.ProductCreate,
+    db: Session = Depends(get_session)
 ):
-    return product_service.create_product(db, product)
+    return await run_db(db, product_service.create_product, product)
 
-@router.get("/", response_model=list[schemas.Product])
-def get_products(
-    skip: int = 0,
-    limit: int = 100,
+def _parse_bulk_body(body: bytes, content_type: str) -> list:
+    """
+    Acepta un arreglo JSON o NDJSON (un producto por línea)
+    """
+    try:
+        if "ndjson" in content_type or "jsonlines" in content_type:
+            return [json.loads(line) for line in body.splitlines() if line.strip()]
+        items = json.loads(body)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"Cuerpo inválido: {e}")
+    if not isinstance(items, list):
+        raise HTTPException(status_code=400, detail="Se esperaba un arreglo de productos")
+    return items
+
+@router.post("/bulk", response_model=schemas.ProductBulkReport)
+async def bulk_create_products(
+    request: Request,
+    mode: str = Query("upsert", pattern="^(insert|upsert)$", description="insert: los SKU existentes se reportan como conflicto; upsert: se actualizan"),
+    db: Session = Depends(get_session)
+):
+    items = _parse_bulk_body(await request.body(), request.headers.get("content-type", ""))
+    return await run_db(db, product_service.bulk_upsert_products, items, mode == "upsert")
+
+# Ruta síncrona a propósito: leer y parsear el archivo es trabajo bloqueante
+# que debe hacerse en el threadpool y no en el event loop, en ambos DB_MODE
+@router.post("/import", response_model=schemas.ProductImportReport)
+def import_products(
+    file: UploadFile = File(...),
+    format: Optional[str] = Query(None, pattern="^(csv|ndjson)$", description="Por defecto se deduce del nombre del archivo"),
+    mode: str = Query("upsert", pattern="^(insert|upsert)$"),
+    chunk_size: int = Query(import_service.IMPORT_CHUNK_ROWS, ge=1, le=100000, description="Filas por commit"),
     db: Session = Depends(get_db)
 ):
-    return product_service.get_products(db, skip, limit)
+    fmt = format or import_service.detect_format(file.filename, file.content_type)
+    if fmt is None:
+        raise HTTPException(status_code=400, detail="Formato no reconocido; use format=csv o format=ndjson")
+    return import_service.import_products(db, file.file, fmt, mode == "upsert", chunk_size)
+
+@router.post("/reservations", response_model=schemas.Reservation)
+async def reserve_stock(
+    reservation: schemas.ReservationCreate,
+    db: Session = Depends(get_session)
+):
+    # Todo o nada: 409 si algún producto no tiene stock suficiente
+    items = [(item.product_id, item.cantidad) for item in reservation.items]
+    return {"items": await run_db(db, product_service.reserve_stock, items)}
+
+@router.get("/", response_model=Union[list[schemas.Product], schemas.ProductFacetPage, schemas.ProductPage])
+async def get_products(
+    request: Request,
+    response: Response,
+    skip: int = Query(0, ge=0),
+    limit: int = Query(100, ge=0, description=f"Sin tope con skip; entre 1 y {CURSOR_MAX_LIMIT} con `after`"),
+    after: Optional[str] = Query(
+        None,
+        description="Cursor de paginación; envíelo vacío para pedir la primera página"
+    ),
+    categoria_id: Optional[List[int]] = Query(None, description="Una o varias categorías"),
+    precio_min: Optional[float] = Query(None, ge=0),
+    precio_max: Optional[float] = Query(None, ge=0),
+    en_stock: Optional[bool] = Query(None, description="true: con stock; false: sin stock"),
+    sku_prefix: Optional[str] = Query(None, min_length=1, max_length=50),
+    sort: str = Query(
+        "id", pattern=product_service.SORT_PATTERN,
+        description="id, precio o nombre; con '-' delante en orden descendente"
+    ),
+    facets: bool = Query(
+        False,
+        description="Incluir conteos por categoría y por rango de precio (devuelve {items, next_cursor, facets})"
+    ),
+    fast: bool = Query(False, description=_FAST_DESCRIPTION),
+    db: Session = Depends(get_read_db)
+):
+    if after is not None:
+        check_cursor_limit(limit)
+    filters = product_service.ProductFilters(
+        tuple(categoria_id or ()), precio_min, precio_max, en_stock, sku_prefix
+    )
+
+    # If-None-Match: basta con leer las versiones de la página para
+    # responder 304 sin cargar ni serializar los productos. Con facetas no:
+    # pueden cambiar por productos que no están en la página
+    if not facets and http_cache.has_validators(request, use_last_modified=False):
+        rows, next_cursor = await run_db(
+            db, product_service.get_products_versions, skip, limit, after, filters=filters, sort=sort
+        )
+        validators = http_cache.collection_validators("productos", rows, next_cursor)
+        if http_cache.is_not_modified(request, validators, use_last_modified=False):
+            return http_cache.not_modified(validators)
+
+    # Con `after` se usa paginación por cursor y se devuelve `next_cursor`
+    if after is not None:
+        items, next_cursor = await run_db(
+            db, product_service.get_products_page, after, limit, fast, filters=filters, sort=sort
+        )
+    else:
+        items = await run_db(db, product_service.get_products, skip, limit, fast, filters=filters, sort=sort)
+        next_cursor = None
+    facet_counts = await run_db(db, product_service.get_product_facets, filters) if facets else None
+    validators = http_cache.collection_validators("productos", items, next_cursor, facet_counts)
+
+    envelope = {}
+    if after is not None or facets:
+        envelope["next_cursor"] = next_cursor
+    if facets:
+        envelope["facets"] = facet_counts
+
+    if fast:
+        return _fast_response(items, http_cache.cache_headers(validators), **envelope)
+
+    http_cache.apply(response, validators)
+    if envelope:
+        return {"items": items, **envelope}
+    return items
+
+# Consulta por lote para carritos y pedidos: una petición y una consulta IN
+# en lugar de un GET /{product_id} por línea. Debe declararse antes de /{product_id}
+@router.get("/batch", response_model=schemas.ProductBatch)
+async def get_products_batch(
+    ids: Optional[List[str]] = Query(None, description="IDs de producto (?ids=a&ids=b)"),
+    skus: Optional[List[str]] = Query(None, description="SKU de producto (?skus=x&skus=y)"),
+    db: Session = Depends(get_read_db)
+):
+    return await run_db(db, product_service.get_products_batch, ids or [], skus or [])
+
+@router.post("/batch", response_model=schemas.ProductBatch)
+async def post_products_batch(
+    batch: schemas.ProductBatchRequest,
+    db: Session = Depends(get_read_db)
+):
+    # Igual que GET /batch, para listas que no caben en la URL
+    return await run_db(db, product_service.get_products_batch, batch.ids, batch.skus)
+
+# Debe declararse antes de /{product_id}
+@router.get("/export")
+def export_products(
+    request: Request,
+    format: str = Query("ndjson", pattern="^(ndjson|csv)$")
+):
+    sessions = read_session_factory(request)
+    if DB_MODE == "async":
+        chunks = export_service.aiter_products_export(format, session_factory=sessions)
+    else:
+        chunks = export_service.iter_products_export(format, session_factory=sessions)
+    return StreamingResponse(
+        chunks,
+        media_type=export_service.MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="productos.{format}"'},
+    )
 
 @router.get("/{product_id}", response_model=schemas.Product)
-def get_product(
+async def get_product(
+    request: Request,
+    response: Response,
     product_id: str = Path(..., description="ID del producto"),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_session)
 ):
-    db_product = product_service.get_product(db, product_id)
-    if not db_product:
+    if is_async_session(db):
+        snapshot = await product_service.get_product_cached_async(db, product_id)
+    else:
+        snapshot = await run_db(db, product_service.get_product_cached, product_id)
+    if not snapshot:
         raise HTTPException(status_code=404, detail="Producto no encontrado")
-    return db_product
+
+    validators = http_cache.resource_validators(
+        "producto", product_id, snapshot.version, snapshot.actualizado_en
+    )
+    if http_cache.is_not_modified(request, validators):
+        return http_cache.not_modified(validators)
+    http_cache.apply(response, validators)
+    return snapshot.product
 
 @router.put("/{product_id}", response_model=schemas.Product)
-def update_product(
+async def update_product(
     product_id: str,
     product_update: schemas.ProductCreate,
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_session)
+):
+    updated_product = await run_db(db, product_service.update_product, product_id, product_update)
+    if not updated_product:
+        raise HTTPException(status_code=404, detail="Producto no encontrado")
+    return updated_product
+
+@router.patch("/{product_id}", response_model=schemas.Product)
+async def patch_product(
+    product_id: str,
+    product_update: schemas.ProductUpdate,
+    db: Session = Depends(get_session)
 ):
-    updated_product = product_service.update_product(db, product_id, product_update)
+    updated_product = await run_db(db, product_service.patch_product, product_id, product_update)
     if not updated_product:
         raise HTTPException(status_code=404, detail="Producto no encontrado")
     return updated_product
 
 @router.delete("/{product_id}", status_code=status.HTTP_204_NO_CONTENT)
-def delete_product(
+async def delete_product(
     product_id: str,
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_session)
 ):
-    success = product_service.delete_product(db, product_id)
+    success = await run_db(db, product_service.delete_product, product_id)
     if not success:
         raise HTTPException(status_code=404, detail="Producto no encontrado")
 
 @router.get("/category/{category_id}", response_model=list[schemas.Product])
-def get_products_by_category(
+async def get_products_by_category(
     category_id: int,
-    db: Session = Depends(get_db)
+    skip: int = 0,
+    limit: Optional[int] = Query(
+        None, ge=1, le=1000,
+        description="Sin límite devuelve toda la categoría; para listados paginados y filtrados use GET /api/products/?categoria_id="
+    ),
+    fast: bool = Query(False, description=_FAST_DESCRIPTION),
+    db: Session = Depends(get_read_db)
 ):
-    return product_service.get_products_by_category(db, category_id)
+    products = await run_db(db, product_service.get_products_by_category, category_id, fast, skip, limit)
+    return _fast_response(products) if fast else products
 
 @router.get("/search/", response_model=list[schemas.Product])
-def search_products(
+async def search_products(
     query: str,
     skip: int = 0,
     limit: int = 100,
-    db: Session = Depends(get_db)
+    fast: bool = Query(False, description=_FAST_DESCRIPTION),
+    db: Session = Depends(get_read_db)
 ):
-    return product_service.search_products(db, query, skip, limit)
\ No newline at end of file
+    products = await run_db(db, product_service.search_products, query, skip, limit, fast)
+    return _fast_response(products) if fast else products
+
+@router.get("/cache/stats")
+def get_product_cache_stats():
+    return product_service.product_cache.stats()
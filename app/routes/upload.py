@@ -1,25 +1,125 @@
-from fastapi import APIRouter, UploadFile, File
-from ..utils.cloudinary import upload_image
+from fastapi import APIRouter, UploadFile, File, HTTPException, status
+from concurrent.futures import ThreadPoolExecutor
+from ..utils.storage import StorageError
+from typing import Optional
+import asyncio
 import tempfile
 import os
 
 router = APIRouter()
 
+# Límites de subida
+UPLOAD_MAX_BYTES = int(os.getenv("UPLOAD_MAX_BYTES", str(10 * 1024 * 1024)))
+UPLOAD_MAX_CONCURRENCY = int(os.getenv("UPLOAD_MAX_CONCURRENCY", "4"))
+UPLOAD_QUEUE_TIMEOUT = float(os.getenv("UPLOAD_QUEUE_TIMEOUT", "10"))
+UPLOAD_CHUNK_BYTES = 1024 * 1024
+# Margen para las cabeceras y separadores del multipart: el cuerpo completo
+# puede superar un poco UPLOAD_MAX_BYTES (ver BodySizeLimitMiddleware en main)
+UPLOAD_FORM_OVERHEAD = 64 * 1024
+UPLOAD_TOO_LARGE = f"La imagen supera el máximo de {UPLOAD_MAX_BYTES} bytes"
+
+# Pool propio para la E/S de imágenes: una subida lenta ocupa uno de estos
+# hilos, no el event loop ni el threadpool que atiende al resto de la API
+_executor = ThreadPoolExecutor(max_workers=UPLOAD_MAX_CONCURRENCY, thread_name_prefix="upload")
+_slots: Optional[asyncio.Semaphore] = None
+
+
+class _TooLarge(Exception):
+    pass
+
+
+class _NotAnImage(Exception):
+    pass
+
+
+def _get_slots() -> asyncio.Semaphore:
+    global _slots
+    if _slots is None:
+        _slots = asyncio.Semaphore(UPLOAD_MAX_CONCURRENCY)
+    return _slots
+
+
+def _copy_to_disk(source, suffix: str) -> str:
+    """
+    Copia el archivo recibido a un temporal por bloques, cortando en cuanto
+    supera UPLOAD_MAX_BYTES. Es la última barrera: BodySizeLimitMiddleware ya
+    rechaza los cuerpos demasiado grandes antes de leer el formulario
+    """
+    written = 0
+    with tempfile.NamedTemporaryFile(delete=False, suffix=suffix) as temp:
+        try:
+            source.seek(0)
+            while True:
+                chunk = source.read(UPLOAD_CHUNK_BYTES)
+                if not chunk:
+                    break
+                written += len(chunk)
+                if written > UPLOAD_MAX_BYTES:
+                    raise _TooLarge()
+                temp.write(chunk)
+        except BaseException:
+            temp.close()
+            os.unlink(temp.name)
+            raise
+    return temp.name
+
+
+def _store_upload(source, filename: str) -> dict:
+    # Corre en _executor: copia a disco, procesa/deduplica, sube y limpia.
+    # Pillow se importa aquí para no cargarlo en el arranque de cada worker
+    from ..utils.images import ImageError, store_image
+
+    temp_path = _copy_to_disk(source, os.path.splitext(filename)[1])
+    try:
+        return store_image(temp_path)
+    except ImageError as e:
+        raise _NotAnImage(str(e)) from e
+    finally:
+        os.unlink(temp_path)
+
+
 @router.post("/upload")
 async def upload_image_endpoint(file: UploadFile = File(...)):
+    if file.content_type and not file.content_type.startswith("image/"):
+        raise HTTPException(
+            status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+            detail="El archivo debe ser una imagen"
+        )
+    if file.size is not None and file.size > UPLOAD_MAX_BYTES:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=UPLOAD_TOO_LARGE
+        )
+
+    slots = _get_slots()
+    try:
+        await asyncio.wait_for(slots.acquire(), timeout=UPLOAD_QUEUE_TIMEOUT)
+    except asyncio.TimeoutError:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Demasiadas subidas en curso, intente de nuevo",
+            headers={"Retry-After": str(int(UPLOAD_QUEUE_TIMEOUT))},
+        )
+
     try:
-        # Guardar archivo temporal
-        with tempfile.NamedTemporaryFile(delete=False, suffix=os.path.splitext(file.filename)[1]) as temp:
-            content = await file.read()
-            temp.write(content)
-            temp_path = temp.name
-        
-        # Subir a Cloudinary
-        image_url = upload_image(temp_path)
-        os.unlink(temp_path)  # Eliminar temporal
-        
-        if image_url:
-            return {"image_url": image_url}
-        return {"error": "Failed to upload image"}, 500
-    except Exception as e:
-        return {"error": str(e)}, 500
+        loop = asyncio.get_running_loop()
+        stored = await loop.run_in_executor(
+            _executor, _store_upload, file.file, file.filename or "imagen"
+        )
+    except _TooLarge:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=UPLOAD_TOO_LARGE
+        )
+    except StorageError as e:
+        raise HTTPException(status_code=status.HTTP_502_BAD_GATEWAY, detail=str(e))
+    except _NotAnImage as e:
+        raise HTTPException(status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE, detail=str(e))
+    finally:
+        slots.release()
+
+    return {
+        "image_url": stored["url"],
+        "thumbnails": stored["thumbnails"],
+        "deduplicated": stored["deduplicated"],
+    }
@@ -1,3 +1,10 @@
 # backend-python/app/schemas/__init__.py
-from .category import Category, CategoryBase, CategoryCreate
-from .product import Product, ProductBase, ProductCreate
+from .category import Category, CategoryBase, CategoryCreate, CategoryUpdate, CategoryPage, CategoryStats
+from .product import (
+    Product, ProductBase, ProductCreate, ProductUpdate, ProductPage,
+    CategoryFacet, PriceFacet, ProductFacets, ProductFacetPage,
+    ProductBatchRequest, ProductBatchResult, ProductBatch,
+    ProductBulkResult, ProductBulkReport, ProductImportReport,
+)
+from .reservation import ReservationItem, ReservationCreate, ReservationLine, Reservation
+from .change import Change, ChangePage
@@ -7,8 +7,30 @@ class CategoryBase(BaseModel):
 class CategoryCreate(CategoryBase):
     pass
 
+class CategoryUpdate(BaseModel):
+    # PATCH: sólo los campos enviados; nombre no admite null explícito
+    nombre: str = None
+    descripcion: str | None = None
+
 class Category(CategoryBase):
     id: int
     
     class Config:
-        orm_mode = True
\ No newline at end of file
+        orm_mode = True
+        from_attributes = True
+
+
+class CategoryPage(BaseModel):
+    items: list[Category]
+    next_cursor: str | None = None
+
+
+class CategoryStats(BaseModel):
+    categoria_id: int
+    nombre: str
+    productos: int
+    stock_total: int
+    con_stock: int
+    precio_min: float | None = None
+    precio_max: float | None = None
+    precio_promedio: float | None = None
@@ -0,0 +1,19 @@
+from datetime import datetime
+from pydantic import BaseModel
+from typing import List, Optional
+
+
+class Change(BaseModel):
+    seq: int
+    entidad: str  # producto | categoria
+    id: str
+    operacion: str  # insert | update | delete
+    version: Optional[int] = None  # None en las bajas
+    creado_en: datetime
+
+
+class ChangePage(BaseModel):
+    changes: List[Change]
+    next_since: int  # `since` de la siguiente petición
+    latest: int
+    has_more: bool
@@ -1,5 +1,5 @@
 from pydantic import BaseModel
-from typing import Optional
+from typing import List, Optional
 
 class ProductBase(BaseModel):
     nombre: str
@@ -14,8 +14,101 @@ class ProductCreate(ProductBase):
     pass
 
 
+class ProductUpdate(BaseModel):
+    """
+    PATCH: sólo se escriben los campos enviados. Los obligatorios tienen
+    default None pero no admiten null explícito
+    """
+    nombre: str = None
+    descripcion: Optional[str] = None
+    precio: float = None
+    stock: int = None
+    categoria_id: int = None
+    sku: Optional[str] = None
+    imagen_url: Optional[str] = None
+
+
 class Product(ProductBase):
     id: str
     
     class Config:
         orm_mode = True
+        from_attributes = True
+
+
+class ProductPage(BaseModel):
+    items: List[Product]
+    next_cursor: Optional[str] = None
+
+
+class CategoryFacet(BaseModel):
+    categoria_id: int
+    productos: int
+
+
+class PriceFacet(BaseModel):
+    desde: float
+    hasta: Optional[float] = None  # None: sin límite superior
+    productos: int
+
+
+class ProductFacets(BaseModel):
+    total: int
+    categorias: List[CategoryFacet]
+    precios: List[PriceFacet]
+
+
+class ProductFacetPage(ProductPage):
+    facets: ProductFacets
+
+
+class ProductBatchRequest(BaseModel):
+    ids: List[str] = []
+    skus: List[str] = []
+
+
+class ProductBatchResult(BaseModel):
+    key: str
+    by: str  # id | sku
+    found: bool
+    product: Optional[Product] = None  # None si no existe
+
+
+class ProductBatch(BaseModel):
+    items: List[ProductBatchResult]  # En el orden de la petición
+    found: int
+    not_found: int
+
+
+class ProductBulkResult(BaseModel):
+    index: int
+    status: str  # created | updated | conflict | error
+    id: Optional[str] = None
+    sku: Optional[str] = None
+    error: Optional[str] = None
+
+
+class ProductBulkReport(BaseModel):
+    total: int
+    created: int
+    updated: int
+    conflict: int
+    error: int
+    elapsed_ms: float
+    rows_per_second: float
+    results: List[ProductBulkResult]
+
+
+class ProductImportReport(BaseModel):
+    total: int
+    created: int
+    updated: int
+    conflict: int
+    error: int
+    committed: int
+    chunks_committed: int
+    elapsed_ms: float
+    rows_per_second: float
+    rejected: List[ProductBulkResult]
+    rejected_truncated: bool
+    aborted: Optional[str] = None
@@ -0,0 +1,19 @@
+from pydantic import BaseModel, Field
+from typing import List
+
+
+class ReservationItem(BaseModel):
+    product_id: str
+    cantidad: int = Field(..., gt=0)
+
+
+class ReservationCreate(BaseModel):
+    items: List[ReservationItem]
+
+
+class ReservationLine(ReservationItem):
+    stock: int  # Stock restante después de la reserva
+
+
+class Reservation(BaseModel):
+    items: List[ReservationLine]
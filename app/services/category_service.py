@@ -1,12 +1,156 @@
 # backend-python/app/services/category_service.py
 from sqlalchemy.orm import Session
 from .. import models
-from ..schemas import CategoryCreate, Category
+from ..schemas import CategoryCreate, CategoryUpdate, Category
 from ..database import get_db
-from typing import List, Optional
+from ..utils.pagination import encode_cursor, decode_cursor
+from ..utils import integrity
+from ..utils.snapshot import VersionedSnapshot
+from ..utils.versioning import shared_versions
+from . import stats_service
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Tuple
+from types import MappingProxyType
+from datetime import datetime
+import bisect
+import os
+import string
 from fastapi import HTTPException, status
+from sqlalchemy import String, Text, func, insert, literal, select, union_all, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.dialects import postgresql, sqlite
 
-def create_category(db: Session, category: CategoryCreate) -> models.Category:
+# Categorías que se crean al arrancar si no existen
+INITIAL_CATEGORIES = [
+    {"nombre": "Electrónicos", "descripcion": "Dispositivos electrónicos de consumo"},
+    {"nombre": "Ropa", "descripcion": "Prendas de vestir"},
+    {"nombre": "Alimentos", "descripcion": "Productos alimenticios"},
+    {"nombre": "Hogar", "descripcion": "Artículos para el hogar"},
+    {"nombre": "Deportes", "descripcion": "Artículos deportivos"}
+]
+
+# Máximo desfase (segundos) de la copia en memoria frente a cambios hechos
+# desde otra máquina o por fuera de la API; los de esta máquina se ven al instante
+CATEGORY_SNAPSHOT_STALENESS = float(os.getenv("CATEGORY_SNAPSHOT_STALENESS", "5"))
+
+class CategoryRow(NamedTuple):
+    id: int
+    nombre: str
+    descripcion: Optional[str]
+    version: int
+    actualizado_en: Optional[datetime]
+
+_ASCII_LOWER = str.maketrans(string.ascii_uppercase, string.ascii_lowercase)
+
+def _ascii_lower(name: str) -> str:
+    return name.translate(_ASCII_LOWER)
+
+def name_folder(dialect_name: str) -> Callable[[str], str]:
+    """
+    Plegado de nombres igual al lower() del índice ux_categorias_nombre_lower:
+    SQLite sólo pasa a minúsculas ASCII ("ELECTRÓNICOS" y "electrónicos" son
+    nombres distintos); PostgreSQL pliega también el resto de Unicode
+    """
+    return _ascii_lower if dialect_name == "sqlite" else str.lower
+
+class CategorySnapshot(NamedTuple):
+    """
+    Todas las categorías en orden de id, con índices por id y por nombre
+    sin distinguir mayúsculas (`fold`). Inmutable: se reemplaza entera al recargar
+    """
+    items: Tuple[CategoryRow, ...]
+    ids: Tuple[int, ...]
+    by_id: "MappingProxyType[int, CategoryRow]"
+    by_name: "MappingProxyType[str, CategoryRow]"
+    fold: Callable[[str], str]
+
+    @classmethod
+    def build(cls, rows, fold: Callable[[str], str] = str.lower) -> "CategorySnapshot":
+        items = tuple(sorted((CategoryRow(*row) for row in rows), key=lambda r: r.id))
+        by_name: Dict[str, CategoryRow] = {}
+        for r in items:
+            # Si la base admitió nombres que aquí pliegan igual, gana el de
+            # menor id, siempre el mismo
+            by_name.setdefault(fold(r.nombre), r)
+        return cls(
+            items,
+            tuple(r.id for r in items),
+            MappingProxyType({r.id: r for r in items}),
+            MappingProxyType(by_name),
+            fold,
+        )
+
+    def page(self, skip: int, limit: int) -> List[CategoryRow]:
+        skip, limit = max(skip, 0), max(limit, 0)
+        return list(self.items[skip:skip + limit])
+
+    def page_after(self, after: Optional[str], limit: int) -> Tuple[List[CategoryRow], Optional[str]]:
+        start = 0
+        if after:
+            (last_id,) = decode_cursor(after, (int,))
+            start = bisect.bisect_right(self.ids, last_id)
+        items = list(self.items[start:start + limit])
+        next_cursor = None
+        if start + limit < len(self.items):
+            next_cursor = encode_cursor(items[-1].id)
+        return items, next_cursor
+
+def _snapshot_marker(db: Session) -> Tuple[int, int, int]:
+    # Cambia con cada alta (count, max id), baja (count) y modificación
+    # (el UPDATE incrementa version)
+    Category = models.Category
+    row = db.query(
+        func.count(Category.id), func.coalesce(func.sum(Category.version), 0), func.coalesce(func.max(Category.id), 0)
+    ).one()
+    return tuple(int(v) for v in row)
+
+def _load_snapshot(db: Session) -> Tuple[CategorySnapshot, Tuple[int, int, int]]:
+    Category = models.Category
+    rows = db.query(
+        Category.id, Category.nombre, Category.descripcion, Category.version, Category.actualizado_en
+    ).all()
+    snapshot = CategorySnapshot.build(rows, name_folder(db.get_bind().dialect.name))
+    marker = (len(rows), sum(r.version for r in rows), max(snapshot.ids, default=0))
+    return snapshot, marker
+
+# Copia de la tabla de categorías de este worker; las escrituras la
+# invalidan en todos los workers de la máquina (versions compartidas)
+category_snapshot = VersionedSnapshot(
+    "categorias", _load_snapshot, _snapshot_marker,
+    max_staleness=CATEGORY_SNAPSHOT_STALENESS,
+    versions=shared_versions("categorias"),
+    size=lambda snapshot: len(snapshot.items),
+)
+
+def get_snapshot(db: Session) -> CategorySnapshot:
+    """
+    Copia en memoria vigente de las categorías; sólo consulta la base de
+    datos para recargarla o, cada CATEGORY_SNAPSHOT_STALENESS segundos,
+    para comprobar su marca de versión
+    """
+    return category_snapshot.get(db)
+
+def _execute_write(db: Session, stmt, nombre: Optional[str]):
+    """
+    Ejecuta un INSERT/UPDATE ... RETURNING y hace commit en un solo viaje a
+    la base de datos. Un nombre repetido (sin distinguir mayúsculas) se
+    detecta por la violación del índice único ux_categorias_nombre_lower.
+    """
+    try:
+        row = db.execute(stmt.returning(*models.Category.__table__.c)).first()
+        db.commit()
+        if row is not None:
+            category_snapshot.invalidate()
+    except IntegrityError as e:
+        db.rollback()
+        if integrity.violation(e) != integrity.UNIQUE:
+            raise
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"La categoría '{nombre}' ya existe"
+        )
+    return row
+
+def create_category(db: Session, category: CategoryCreate):
     """
     Crea una nueva categoría en la base de datos
     
@@ -16,25 +160,14 @@ def create_category(db: Session, category: CategoryCreate) -> models.Category:
     
     Returns:
         La categoría creada
-    """
-    # Verificar si la categoría ya existe
-    existing_category = db.query(models.Category).filter(
-        models.Category.nombre.ilike(category.nombre)
-    ).first()
     
-    if existing_category:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail=f"La categoría '{category.nombre}' ya existe"
-        )
-    
-    new_category = models.Category(**category.dict())
-    db.add(new_category)
-    db.commit()
-    db.refresh(new_category)
-    return new_category
+    Raises:
+        HTTPException: 400 si ya existe una categoría con ese nombre
+    """
+    stmt = insert(models.Category.__table__).values(**category.dict())
+    return _execute_write(db, stmt, category.nombre)
 
-def get_category(db: Session, category_id: int) -> Optional[models.Category]:
+def get_category(db: Session, category_id: int) -> Optional[CategoryRow]:
     """
     Obtiene una categoría por su ID
     
@@ -45,9 +178,9 @@ def get_category(db: Session, category_id: int) -> Optional[models.Category]:
     Returns:
         La categoría si existe, None si no
     """
-    return db.query(models.Category).filter(models.Category.id == category_id).first()
+    return get_snapshot(db).by_id.get(category_id)
 
-def get_categories(db: Session, skip: int = 0, limit: int = 100) -> List[models.Category]:
+def get_categories(db: Session, skip: int = 0, limit: int = 100) -> List[CategoryRow]:
     """
     Obtiene todas las categorías con paginación
     
@@ -59,11 +192,50 @@ def get_categories(db: Session, skip: int = 0, limit: int = 100) -> List[models.
     Returns:
         Lista de categorías
     """
-    return db.query(models.Category).offset(skip).limit(limit).all()
+    return get_snapshot(db).page(skip, limit)
+
+def get_categories_page(
+    db: Session, after: Optional[str] = None, limit: int = 100
+) -> Tuple[List[CategoryRow], Optional[str]]:
+    """
+    Obtiene una página de categorías con paginación por cursor (keyset)
+    
+    Args:
+        db: Sesión de base de datos
+        after: Cursor devuelto por la página anterior (None para la primera)
+        limit: Número máximo de registros a devolver
+    
+    Returns:
+        Tupla con la lista de categorías y el cursor de la siguiente página
+        (None si no hay más)
+    """
+    return get_snapshot(db).page_after(after, limit)
 
-def update_category(db: Session, category_id: int, category_update: CategoryCreate) -> models.Category:
+def get_categories_versions(
+    db: Session, skip: int = 0, limit: int = 100, after: Optional[str] = None
+) -> Tuple[List[Any], Optional[str]]:
     """
-    Actualiza una categoría existente
+    Obtiene sólo (id, version, actualizado_en) de la página que devolverían
+    get_categories (after=None) o get_categories_page
+    
+    Args:
+        db: Sesión de base de datos
+        skip: Número de registros a saltar (paginación por offset)
+        limit: Número máximo de registros a devolver
+        after: Cursor de paginación (None para paginación por offset)
+    
+    Returns:
+        Tupla con las filas y el cursor de la siguiente página
+    """
+    # Las filas de la copia en memoria ya traen version y actualizado_en
+    snapshot = get_snapshot(db)
+    if after is None:
+        return snapshot.page(skip, limit), None
+    return snapshot.page_after(after, limit)
+
+def update_category(db: Session, category_id: int, category_update: CategoryCreate):
+    """
+    Reemplaza los campos de una categoría existente (PUT)
     
     Args:
         db: Sesión de base de datos
@@ -73,33 +245,41 @@ def update_category(db: Session, category_id: int, category_update: CategoryCrea
     Returns:
         La categoría actualizada
     """
-    db_category = db.query(models.Category).filter(models.Category.id == category_id).first()
+    return _update_category_columns(db, category_id, category_update.dict())
+
+def patch_category(db: Session, category_id: int, category_update: CategoryUpdate):
+    """
+    Actualiza sólo los campos enviados (PATCH)
+    
+    Args:
+        db: Sesión de base de datos
+        category_id: ID de la categoría a actualizar
+        category_update: Campos a cambiar
     
+    Returns:
+        La categoría actualizada
+    """
+    changes = category_update.dict(exclude_unset=True)
+    if not changes:
+        db_category = get_category(db, category_id)
+        if not db_category:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Categoría no encontrada"
+            )
+        return db_category
+    return _update_category_columns(db, category_id, changes)
+
+def _update_category_columns(db: Session, category_id: int, changes: Dict[str, Any]):
+    # version y actualizado_en se calculan en el propio UPDATE (onupdate)
+    table = models.Category.__table__
+    stmt = update(table).where(table.c.id == category_id).values(**changes)
+    db_category = _execute_write(db, stmt, changes.get("nombre"))
     if not db_category:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Categoría no encontrada"
         )
-    
-    # Verificar si el nuevo nombre ya existe
-    if category_update.nombre != db_category.nombre:
-        existing_category = db.query(models.Category).filter(
-            models.Category.nombre.ilike(category_update.nombre),
-            models.Category.id != category_id
-        ).first()
-        
-        if existing_category:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail=f"La categoría '{category_update.nombre}' ya existe"
-            )
-    
-    # Actualizar campos
-    for key, value in category_update.dict().items():
-        setattr(db_category, key, value)
-    
-    db.commit()
-    db.refresh(db_category)
     return db_category
 
 def delete_category(db: Session, category_id: int) -> bool:
@@ -121,23 +301,21 @@ def delete_category(db: Session, category_id: int) -> bool:
     if not db_category:
         return False
     
-    # Verificar si la categoría tiene productos asociados
-    product_count = db.query(models.Product).filter(
-        models.Product.categoria_id == category_id
-    ).count()
-    
-    if product_count > 0:
+    # Verificar si la categoría tiene productos asociados (contadores de
+    # stats_service, sin recorrer la tabla de productos)
+    if stats_service.product_count(db, category_id) > 0:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="No se puede eliminar una categoría con productos asociados"
         )
 
-    
+    stats_service.forget_category(db, category_id)
     db.delete(db_category)
     db.commit()
+    category_snapshot.invalidate()
     return True
 
-def get_category_by_name(db: Session, name: str) -> Optional[models.Category]:
+def get_category_by_name(db: Session, name: str) -> Optional[CategoryRow]:
     """
     Obtiene una categoría por su nombre
     
@@ -148,6 +326,47 @@ def get_category_by_name(db: Session, name: str) -> Optional[models.Category]:
     Returns:
         La categoría si existe, None si no
     """
-    return db.query(models.Category).filter(
-        models.Category.nombre.ilike(name)
-    ).first()
+    snapshot = get_snapshot(db)
+    return snapshot.by_name.get(snapshot.fold(name))
+
+def ensure_categories(db: Session, categories: List[Dict[str, Any]]) -> int:
+    """
+    Crea las categorías que falten con una sola sentencia
+    INSERT ... SELECT ... WHERE NOT EXISTS (sin distinguir mayúsculas, como
+    get_category_by_name). Es idempotente: repetirla no crea duplicados.
+    
+    Args:
+        db: Sesión de base de datos
+        categories: Lista de {"nombre", "descripcion"}
+    
+    Returns:
+        Número de categorías creadas
+    """
+    if not categories:
+        return 0
+    Category = models.Category
+    wanted = union_all(*[
+        select(
+            literal(c["nombre"], String).label("nombre"),
+            literal(c.get("descripcion"), Text).label("descripcion"),
+        )
+        for c in categories
+    ]).subquery("nuevas")
+    exists = select(Category.id).where(func.lower(Category.nombre) == func.lower(wanted.c.nombre)).exists()
+    missing = select(wanted.c.nombre, wanted.c.descripcion).where(~exists)
+
+    dialect = db.get_bind().dialect.name
+    if dialect == "postgresql":
+        stmt = postgresql.insert(Category).from_select(["nombre", "descripcion"], missing)
+        stmt = stmt.on_conflict_do_nothing()
+    elif dialect == "sqlite":
+        stmt = sqlite.insert(Category).from_select(["nombre", "descripcion"], missing)
+        stmt = stmt.on_conflict_do_nothing()
+    else:
+        stmt = insert(Category).from_select(["nombre", "descripcion"], missing)
+
+    created = db.execute(stmt).rowcount
+    db.commit()
+    if created:
+        category_snapshot.invalidate()
+    return created
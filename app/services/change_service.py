@@ -0,0 +1,385 @@
+# backend-python/app/services/change_service.py
+"""
+Registro de cambios del catálogo (outbox) para sincronización incremental.
+
+- Triggers sobre `productos` y `categorias` anotan en `cambios` cada alta,
+  modificación (incluidos stock y reservas) y baja, en la misma transacción
+  que la escritura. Como en stats_service, cubren todas las rutas de
+  escritura y lo que se escribe por fuera de la API.
+- El número de secuencia (`seq`) no lo asigna el trigger: dos transacciones
+  concurrentes pueden confirmar en distinto orden que el de sus inserts, y
+  un cliente que ya leyó el seq mayor perdería el menor. assign_sequence()
+  numera en un solo paso serializado las filas ya confirmadas, así que una
+  fila que se confirma después siempre recibe un seq mayor. La numeración
+  la hace un hilo por worker (start_sequencer) en cuanto se confirma una
+  escritura y, para lo escrito por fuera de la API, cada
+  CHANGES_SEQUENCE_SECONDS.
+- GET /api/changes?since= devuelve los cambios con seq > since en orden; el
+  cliente guarda el último seq y vuelve a pedir desde ahí (O(cambios)). Es
+  de sólo lectura: los cambios sin numerar todavía no se ven.
+- compact() deja sólo el último cambio de cada entidad y borra los de más
+  de CHANGES_RETENTION_HOURS. Quien pida desde antes de lo borrado recibe
+  410 y debe hacer una sincronización completa.
+"""
+import logging
+import os
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+from fastapi import HTTPException
+from sqlalchemy import delete, event, exists, func, insert, literal_column, select, text, tuple_, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session, aliased
+
+from .. import models
+from ..database import SessionLocal, engine
+
+logger = logging.getLogger(__name__)
+
+# Antigüedad máxima de un cambio antes de borrarlo (horas)
+CHANGES_RETENTION_HOURS = float(os.getenv("CHANGES_RETENTION_HOURS", "168"))
+# Cada cuántos segundos compacta el registro cada worker (0 = nunca)
+CHANGES_COMPACT_SECONDS = float(os.getenv("CHANGES_COMPACT_SECONDS", "60"))
+# Intervalo de consulta de las peticiones en espera (long-poll) y máximo de espera
+CHANGES_POLL_SECONDS = float(os.getenv("CHANGES_POLL_SECONDS", "0.5"))
+CHANGES_MAX_WAIT = float(os.getenv("CHANGES_MAX_WAIT", "30"))
+# Intervalo máximo entre numeraciones cuando no hay escrituras en el worker
+CHANGES_SEQUENCE_SECONDS = float(os.getenv("CHANGES_SEQUENCE_SECONDS", "1"))
+
+# Clave del advisory lock de PostgreSQL que serializa la numeración
+_SEQUENCE_LOCK_KEY = 0x63616D62
+# Claves de cambios_estado
+_PURGED = "purgado_hasta"      # seq más alto borrado por antigüedad
+_COMPACTED = "compactado_hasta"  # seq más alto ya revisado por compact()
+
+_TABLES = (("productos", "producto"), ("categorias", "categoria"))
+
+# SQLite sólo tiene triggers por fila
+_SQLITE_TRIGGERS = [
+    statement
+    for table, entity in _TABLES
+    for statement in (
+        f"CREATE TRIGGER IF NOT EXISTS trg_{table}_cambios_ins AFTER INSERT ON {table} BEGIN "
+        "INSERT INTO cambios (entidad, entidad_id, operacion, version) "
+        f"VALUES ('{entity}', CAST(NEW.id AS TEXT), 'insert', NEW.version); END",
+        f"CREATE TRIGGER IF NOT EXISTS trg_{table}_cambios_upd AFTER UPDATE ON {table} BEGIN "
+        "INSERT INTO cambios (entidad, entidad_id, operacion, version) "
+        f"VALUES ('{entity}', CAST(NEW.id AS TEXT), 'update', NEW.version); END",
+        f"CREATE TRIGGER IF NOT EXISTS trg_{table}_cambios_del AFTER DELETE ON {table} BEGIN "
+        "INSERT INTO cambios (entidad, entidad_id, operacion, version) "
+        f"VALUES ('{entity}', CAST(OLD.id AS TEXT), 'delete', NULL); END",
+    )
+]
+
+_POSTGRES_FUNCTION = """
+CREATE OR REPLACE FUNCTION registrar_cambios() RETURNS trigger LANGUAGE plpgsql AS $$
+BEGIN
+    IF TG_OP = 'DELETE' THEN
+        INSERT INTO cambios (entidad, entidad_id, operacion, version)
+        SELECT TG_ARGV[0], id::text, 'delete', NULL FROM viejas ORDER BY id;
+    ELSE
+        INSERT INTO cambios (entidad, entidad_id, operacion, version)
+        SELECT TG_ARGV[0], id::text, lower(TG_OP), version FROM nuevas ORDER BY id;
+    END IF;
+    RETURN NULL;
+END
+$$
+"""
+
+# Triggers por sentencia con tablas de transición: una carga masiva hace un
+# solo INSERT ... SELECT en `cambios`
+_POSTGRES_TRIGGERS = [_POSTGRES_FUNCTION] + [
+    statement
+    for table, entity in _TABLES
+    for statement in (
+        f"DROP TRIGGER IF EXISTS trg_{table}_cambios_ins ON {table}",
+        f"CREATE TRIGGER trg_{table}_cambios_ins AFTER INSERT ON {table} "
+        f"REFERENCING NEW TABLE AS nuevas FOR EACH STATEMENT EXECUTE FUNCTION registrar_cambios('{entity}')",
+        f"DROP TRIGGER IF EXISTS trg_{table}_cambios_upd ON {table}",
+        f"CREATE TRIGGER trg_{table}_cambios_upd AFTER UPDATE ON {table} "
+        f"REFERENCING NEW TABLE AS nuevas FOR EACH STATEMENT EXECUTE FUNCTION registrar_cambios('{entity}')",
+        f"DROP TRIGGER IF EXISTS trg_{table}_cambios_del ON {table}",
+        f"CREATE TRIGGER trg_{table}_cambios_del AFTER DELETE ON {table} "
+        f"REFERENCING OLD TABLE AS viejas FOR EACH STATEMENT EXECUTE FUNCTION registrar_cambios('{entity}')",
+    )
+]
+
+
+def schema_ddl(bind: Engine = engine) -> List[str]:
+    """
+    DDL de los triggers del motor; forma parte de la huella del esquema
+    """
+    dialect = bind.dialect.name
+    if dialect == "postgresql":
+        return _POSTGRES_TRIGGERS
+    if dialect == "sqlite":
+        return _SQLITE_TRIGGERS
+    return []
+
+
+def ensure_triggers(bind: Engine = engine) -> None:
+    """
+    Crea los triggers del registro. El registro empieza vacío: los clientes
+    hacen una sincronización completa y siguen desde `latest`.
+    """
+    statements = schema_ddl(bind)
+    if not statements:
+        logger.warning("Registro de cambios no disponible para %s", bind.dialect.name)
+        return
+    with bind.begin() as conn:
+        for statement in statements:
+            conn.execute(text(statement))
+
+
+def _state(db: Session, clave: str) -> int:
+    State = models.ChangeLogState
+    return db.execute(select(State.valor).where(State.clave == clave)).scalar() or 0
+
+
+def _set_state(db: Session, clave: str, valor: int) -> None:
+    State = models.ChangeLogState
+    dialect = db.get_bind().dialect.name
+    if dialect == "postgresql":
+        stmt = postgresql.insert(State)
+    elif dialect == "sqlite":
+        stmt = sqlite.insert(State)
+    else:
+        # Sin ON CONFLICT: UPDATE y, si la clave no existía, INSERT
+        if db.execute(update(State).where(State.clave == clave).values(valor=valor)).rowcount == 0:
+            db.execute(insert(State).values(clave=clave, valor=valor))
+        return
+    stmt = stmt.values(clave=clave, valor=valor)
+    db.execute(stmt.on_conflict_do_update(index_elements=[State.clave], set_={"valor": stmt.excluded.valor}))
+
+
+def assign_sequence(db: Session) -> int:
+    """
+    Numera los cambios confirmados que todavía no tienen seq, en orden de id,
+    a continuación del último seq (o de lo ya purgado). Devuelve cuántos numeró.
+    """
+    Change, State = models.Change, models.ChangeLogState
+    if db.execute(select(Change.id).where(Change.seq.is_(None)).limit(1)).first() is None:
+        return 0  # Sin pendientes no se toma ningún bloqueo
+
+    if db.get_bind().dialect.name == "postgresql":
+        # Una numeración a la vez; SQLite ya serializa las escrituras
+        db.execute(text("SELECT pg_advisory_xact_lock(:key)"), {"key": _SEQUENCE_LOCK_KEY})
+    # Alias: las subconsultas no deben correlacionarse con la fila del UPDATE
+    numbered_rows, previous = aliased(Change), aliased(Change)
+    last = select(func.max(previous.seq)).scalar_subquery()
+    purged = select(State.valor).where(State.clave == _PURGED).scalar_subquery()
+    base = func.coalesce(last, purged, 0)
+    numbered = (
+        select(numbered_rows.id, (base + func.row_number().over(order_by=numbered_rows.id)).label("seq"))
+        .where(numbered_rows.seq.is_(None))
+        .subquery("numerados")
+    )
+    stmt = (
+        update(Change)
+        .where(Change.id == numbered.c.id)
+        .values(seq=numbered.c.seq)
+        .execution_options(synchronize_session=False)
+    )
+    assigned = db.execute(stmt).rowcount
+    db.commit()
+    return assigned
+
+
+def latest_seq(db: Session) -> int:
+    """
+    Último seq asignado
+    """
+    Change, State = models.Change, models.ChangeLogState
+    return int(db.execute(select(func.coalesce(
+        select(func.max(Change.seq)).scalar_subquery(),
+        select(State.valor).where(State.clave == _PURGED).scalar_subquery(),
+        0,
+    ))).scalar())
+
+
+def get_changes(
+    db: Session, since: int = 0, limit: int = 100, entidad: Optional[str] = None
+) -> Dict[str, Any]:
+    """
+    Cambios con seq > since en orden de seq. `next_since` es el valor a
+    enviar en la siguiente petición; con `has_more` hay más páginas ya.
+
+    Raises:
+        HTTPException: 410 si `since` es anterior a lo ya purgado
+    """
+    # `latest` se fija antes de leer y acota la consulta: con filtro por
+    # entidad se puede avanzar hasta él sin saltarse filas numeradas después
+    latest = latest_seq(db)
+    purged = _state(db, _PURGED)
+    if since < purged:
+        raise HTTPException(
+            status_code=410,
+            detail={
+                "message": "Los cambios pedidos ya se compactaron; haga una sincronización completa",
+                "min_since": purged,
+            },
+        )
+
+    Change = models.Change
+    query = select(Change).where(Change.seq > since, Change.seq <= latest)
+    if entidad is not None:
+        query = query.where(Change.entidad == entidad)
+    rows = db.execute(query.order_by(Change.seq).limit(limit + 1)).scalars().all()
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    return {
+        "changes": [
+            {
+                "seq": row.seq,
+                "entidad": row.entidad,
+                "id": row.entidad_id,
+                "operacion": row.operacion,
+                "version": row.version,
+                "creado_en": row.creado_en,
+            }
+            for row in rows
+        ],
+        "next_since": rows[-1].seq if has_more else max(since, latest),
+        "latest": latest,
+        "has_more": has_more,
+    }
+
+
+def release(db: Session) -> None:
+    """
+    Termina la transacción de lectura y devuelve la conexión al pool: una
+    petición en espera (long-poll) no debe ocupar una conexión
+    """
+    db.rollback()
+
+
+# Último seq visto por este worker: las peticiones en espera lo comparten y
+# sólo una de ellas consulta la base de datos cada CHANGES_POLL_SECONDS
+_latest_seen = (0, 0.0)
+
+
+def latest_seq_cached(db: Session) -> int:
+    global _latest_seen
+    seq, checked_at = _latest_seen
+    if time.monotonic() - checked_at < CHANGES_POLL_SECONDS:
+        return seq
+    seq = latest_seq(db)
+    db.rollback()
+    _latest_seen = (seq, time.monotonic())
+    return seq
+
+
+def compact(db: Session) -> Dict[str, int]:
+    """
+    Deja sólo el último cambio de cada entidad modificada desde la última
+    compactación y purga los cambios de más de CHANGES_RETENTION_HOURS.
+    Devuelve cuántas filas borró cada paso.
+    """
+    Change = models.Change
+    assign_sequence(db)
+    last = db.execute(select(func.max(Change.seq))).scalar()
+    if last is None:
+        return {"collapsed": 0, "purged": 0}
+
+    # Un cambio seguido de otro de la misma entidad no aporta nada: quien
+    # lea desde antes verá el posterior. Sólo se revisan las entidades con
+    # cambios nuevos desde la última compactación
+    compacted = _state(db, _COMPACTED)
+    newer, recent = aliased(Change), aliased(Change)
+    touched = select(recent.entidad, recent.entidad_id).where(recent.seq > compacted, recent.seq <= last)
+    superseded = exists().where(
+        newer.entidad == Change.entidad,
+        newer.entidad_id == Change.entidad_id,
+        newer.seq > Change.seq,
+    )
+    collapsed = db.execute(
+        delete(Change)
+        .where(Change.seq <= last, tuple_(Change.entidad, Change.entidad_id).in_(touched), superseded)
+        .execution_options(synchronize_session=False)
+    ).rowcount
+    _set_state(db, _COMPACTED, last)
+
+    purged = 0
+    if CHANGES_RETENTION_HOURS > 0:
+        if db.get_bind().dialect.name == "postgresql":
+            cutoff = func.now() - literal_column(f"interval '{int(CHANGES_RETENTION_HOURS * 3600)} seconds'")
+        else:
+            cutoff = func.datetime("now", f"-{int(CHANGES_RETENTION_HOURS * 3600)} seconds")
+        upto = db.execute(select(func.max(Change.seq)).where(Change.creado_en < cutoff)).scalar()
+        if upto is not None:
+            purged = db.execute(
+                delete(Change).where(Change.seq <= upto).execution_options(synchronize_session=False)
+            ).rowcount
+            _set_state(db, _PURGED, max(upto, _state(db, _PURGED)))
+    db.commit()
+    return {"collapsed": collapsed, "purged": purged}
+
+
+_sequencer: Optional[threading.Thread] = None
+# Se activa al confirmar cualquier sesión del worker: puede haber cambios
+# nuevos que numerar
+_committed = threading.Event()
+
+
+@event.listens_for(Session, "after_commit")
+def _on_commit(session) -> None:
+    if threading.current_thread() is not _sequencer:
+        _committed.set()
+
+
+def start_sequencer() -> None:
+    """
+    Arranca (una vez por proceso, después del fork) el hilo que numera los
+    cambios confirmados: tras cada commit del worker o, como mucho, cada
+    CHANGES_SEQUENCE_SECONDS
+    """
+    global _sequencer
+    if CHANGES_SEQUENCE_SECONDS <= 0 or (_sequencer is not None and _sequencer.is_alive()):
+        return
+
+    def run():
+        while True:
+            _committed.wait(CHANGES_SEQUENCE_SECONDS)
+            _committed.clear()
+            db = SessionLocal()
+            try:
+                assign_sequence(db)
+            except Exception as e:
+                db.rollback()
+                print(f"⚠️ No se pudo numerar el registro de cambios: {e}")
+                time.sleep(CHANGES_SEQUENCE_SECONDS)
+            finally:
+                db.close()
+
+    _sequencer = threading.Thread(target=run, name="changes-sequencer", daemon=True)
+    _sequencer.start()
+
+
+_compactor: Optional[threading.Thread] = None
+
+
+def start_compactor() -> None:
+    """
+    Arranca (una vez por proceso, después del fork) el hilo que numera y
+    compacta el registro cada CHANGES_COMPACT_SECONDS
+    """
+    global _compactor
+    if CHANGES_COMPACT_SECONDS <= 0 or (_compactor is not None and _compactor.is_alive()):
+        return
+
+    def run():
+        while True:
+            time.sleep(CHANGES_COMPACT_SECONDS)
+            db = SessionLocal()
+            try:
+                compact(db)
+            except Exception as e:
+                db.rollback()
+                print(f"⚠️ No se pudo compactar el registro de cambios: {e}")
+            finally:
+                db.close()
+
+    _compactor = threading.Thread(target=run, name="changes-compactor", daemon=True)
+    _compactor.start()
@@ -0,0 +1,113 @@
+# backend-python/app/services/export_service.py
+import csv
+import io
+import json
+import os
+from typing import AsyncIterator, Iterator, List, Sequence
+
+from sqlalchemy import select
+
+from .. import models
+from ..database import AsyncSessionLocal, SessionLocal
+
+# Filas por lote leído del cursor del servidor y por bloque enviado
+EXPORT_CHUNK_ROWS = int(os.getenv("EXPORT_CHUNK_ROWS", "1000"))
+
+EXPORT_FIELDS = [
+    "id",
+    "nombre",
+    "descripcion",
+    "precio",
+    "stock",
+    "categoria_id",
+    "sku",
+    "imagen_url",
+]
+
+MEDIA_TYPES = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv; charset=utf-8",
+}
+
+
+def _export_query(chunk_rows: int):
+    # Sólo columnas: sin hidratar objetos ORM ni pasar por Pydantic.
+    # yield_per activa stream_results, es decir, un cursor del lado del
+    # servidor que entrega `chunk_rows` filas cada vez
+    columns = [getattr(models.Product, field) for field in EXPORT_FIELDS]
+    return (
+        select(*columns)
+        .order_by(models.Product.id)
+        .execution_options(yield_per=chunk_rows)
+    )
+
+
+def _row_values(row: Sequence) -> List:
+    values = list(row)
+    precio = EXPORT_FIELDS.index("precio")
+    if values[precio] is not None:
+        values[precio] = float(values[precio])
+    return values
+
+
+def _encode_ndjson(rows: Sequence[Sequence]) -> bytes:
+    lines = (
+        json.dumps(dict(zip(EXPORT_FIELDS, _row_values(row))), ensure_ascii=False)
+        for row in rows
+    )
+    return ("\n".join(lines) + "\n").encode("utf-8")
+
+
+def _encode_csv(rows: Sequence[Sequence]) -> bytes:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerows(_row_values(row) for row in rows)
+    return buffer.getvalue().encode("utf-8")
+
+
+def _csv_header() -> bytes:
+    buffer = io.StringIO()
+    csv.writer(buffer).writerow(EXPORT_FIELDS)
+    return buffer.getvalue().encode("utf-8")
+
+
+_ENCODERS = {"ndjson": _encode_ndjson, "csv": _encode_csv}
+
+
+def iter_products_export(
+    fmt: str = "ndjson", chunk_rows: int = EXPORT_CHUNK_ROWS, session_factory=SessionLocal
+) -> Iterator[bytes]:
+    """
+    Genera el catálogo completo en bloques de bytes, con memoria constante.
+
+    Abre su propia sesión con `session_factory` (la de una réplica de
+    lectura si la ruta la eligió): la respuesta se sigue enviando después de
+    que la ruta retorna, cuando la sesión de la dependencia ya está cerrada.
+    """
+    encode = _ENCODERS[fmt]
+    if fmt == "csv":
+        yield _csv_header()
+
+    db = session_factory()
+    try:
+        result = db.execute(_export_query(chunk_rows))
+        for partition in result.partitions():
+            yield encode(partition)
+    finally:
+        db.close()
+
+
+async def aiter_products_export(
+    fmt: str = "ndjson", chunk_rows: int = EXPORT_CHUNK_ROWS, session_factory=AsyncSessionLocal
+) -> AsyncIterator[bytes]:
+    """
+    Versión para DB_MODE=async de iter_products_export, sobre AsyncSession.stream
+    """
+    encode = _ENCODERS[fmt]
+    if fmt == "csv":
+        yield _csv_header()
+
+    async with session_factory() as db:
+        result = await db.stream(_export_query(chunk_rows))
+        async for partition in result.partitions():
+            yield encode(partition)
@@ -0,0 +1,107 @@
+# backend-python/app/services/import_service.py
+import csv
+import io
+import json
+import os
+from typing import Any, BinaryIO, Dict, Iterator, Optional, Tuple
+
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import Session
+
+from .product_service import BULK_BATCH_SIZE, ProductBulkWriter
+
+# Filas por commit durante una importación
+IMPORT_CHUNK_ROWS = int(os.getenv("IMPORT_CHUNK_ROWS", "5000"))
+# Máximo de filas rechazadas que se detallan en el reporte
+IMPORT_MAX_REJECTED = int(os.getenv("IMPORT_MAX_REJECTED", "1000"))
+
+
+def detect_format(filename: Optional[str], content_type: Optional[str]) -> Optional[str]:
+    """
+    Deduce "csv" o "ndjson" a partir del nombre del archivo o su content-type
+    """
+    name = (filename or "").lower()
+    kind = (content_type or "").lower()
+    if name.endswith(".csv") or "csv" in kind:
+        return "csv"
+    if name.endswith((".ndjson", ".jsonl")) or "ndjson" in kind or "jsonlines" in kind:
+        return "ndjson"
+    return None
+
+
+def _iter_csv(stream: io.TextIOBase) -> Iterator[Tuple[int, Any]]:
+    # Los campos vacíos se tratan como ausentes (descripcion, sku, ...).
+    # Las columnas extra, como el `id` de la exportación, se ignoran
+    for line, row in enumerate(csv.DictReader(stream), start=1):
+        yield line, {k: (v if v != "" else None) for k, v in row.items() if k}
+
+
+def _iter_ndjson(stream: io.TextIOBase) -> Iterator[Tuple[int, Any]]:
+    for line, text in enumerate(stream, start=1):
+        if not text.strip():
+            continue
+        try:
+            yield line, json.loads(text)
+        except ValueError as e:
+            yield line, e
+
+
+_READERS = {"csv": _iter_csv, "ndjson": _iter_ndjson}
+
+
+def import_products(
+    db: Session,
+    fileobj: BinaryIO,
+    fmt: str,
+    upsert: bool = True,
+    chunk_rows: int = IMPORT_CHUNK_ROWS,
+) -> Dict[str, Any]:
+    """
+    Importa productos desde un archivo CSV o NDJSON leyéndolo de forma
+    incremental: nunca hay más de `chunk_rows` filas en memoria.
+
+    Cada bloque de `chunk_rows` filas válidas se confirma por separado, así
+    que si la base de datos falla a mitad de archivo los bloques anteriores
+    quedan guardados y el reporte indica dónde se detuvo.
+    """
+    writer = ProductBulkWriter(
+        db,
+        upsert,
+        batch_size=min(chunk_rows, BULK_BATCH_SIZE),
+        keep_written=False,
+        max_reported=IMPORT_MAX_REJECTED,
+    )
+    stream = io.TextIOWrapper(fileobj, encoding="utf-8-sig", newline="")
+    chunks = 0
+    pending = 0
+    aborted = None
+
+    try:
+        for line, item in _READERS[fmt](stream):
+            if isinstance(item, Exception):
+                writer.reject(line, f"Línea inválida: {item}")
+                continue
+            writer.add(line, item)
+            pending += 1
+            if pending >= chunk_rows:
+                writer.commit()
+                chunks += 1
+                pending = 0
+        writer.commit()
+        chunks += 1 if pending else 0
+    except (SQLAlchemyError, UnicodeDecodeError, csv.Error) as e:
+        writer.rollback()
+        aborted = str(e)
+    finally:
+        stream.detach()  # No cerrar el archivo del upload
+
+    report = writer.report()
+    rejected = report.pop("results")
+    return {
+        **report,
+        "committed": writer.committed,
+        "chunks_committed": chunks,
+        "rejected": rejected,
+        "rejected_truncated": report["conflict"] + report["error"] > len(rejected),
+        "aborted": aborted,
+    }
@@ -1,52 +1,193 @@
 # backend-python/app/services/product_service.py
 from sqlalchemy.orm import Session
 from .. import models
-from ..schemas import ProductCreate, Product
+from ..schemas import ProductCreate, ProductUpdate, Product
 from ..database import get_db
-from typing import List
+from ..utils.pagination import encode_cursor, decode_cursor
+from ..utils import integrity
+from ..utils.cache import ReadThroughCache
+from ..utils.versioning import shared_versions
+from . import search_service
+from pydantic import ValidationError
+from sqlalchemy import Float, and_, case, cast, func, insert, literal_column, tuple_, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.dialects import postgresql, sqlite
+from fastapi import HTTPException
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional, Tuple
+from types import SimpleNamespace
+from datetime import datetime
+from decimal import Decimal
+import time
 import uuid
-from sqlalchemy import or_
+import os
 
-def create_product(db: Session, product: ProductCreate) -> models.Product:
+# Filas por sentencia INSERT en las cargas masivas
+BULK_BATCH_SIZE = int(os.getenv("BULK_BATCH_SIZE", "1000"))
+
+# Caché de detalle de producto (GET /api/products/{product_id})
+product_cache = ReadThroughCache(
+    maxsize=int(os.getenv("PRODUCT_CACHE_SIZE", "10000")),
+    ttl=float(os.getenv("PRODUCT_CACHE_TTL", "30")),
+    versions=shared_versions("productos"),
+)
+
+# Modo rápido de los listados: tuplas de columnas en lugar de objetos ORM.
+# Las primeras columnas son los campos de schemas.Product en su orden (precio
+# como float para no pasar por Decimal); version y actualizado_en van al
+# final sólo para calcular el ETag
+PRODUCT_ROW_FIELDS = (
+    "nombre", "descripcion", "precio", "stock", "categoria_id", "sku", "imagen_url", "id",
+)
+PRODUCT_ROW_COLUMNS = (
+    models.Product.nombre,
+    models.Product.descripcion,
+    cast(models.Product.precio, Float).label("precio"),
+    models.Product.stock,
+    models.Product.categoria_id,
+    models.Product.sku,
+    models.Product.imagen_url,
+    models.Product.id,
+    models.Product.version,
+    models.Product.actualizado_en,
+)
+
+def _products_query(db: Session, as_rows: bool):
+    if as_rows:
+        return db.query(*PRODUCT_ROW_COLUMNS)
+    return db.query(models.Product)
+
+class ProductSnapshot(NamedTuple):
+    """
+    Entrada de product_cache: el producto ya validado más su versión, con la
+    que la ruta calcula el ETag sin volver a la base de datos
+    """
+    product: Product
+    version: int
+    actualizado_en: Optional[datetime]
+
+def _on_product_changed(db_product: models.Product) -> None:
+    # Se llama después del commit para que ningún lector repueble la caché
+    # con la versión anterior
+    product_cache.invalidate(db_product.id)
+    search_service.index_product(db_product)
+
+def _on_product_deleted(product_id: str) -> None:
+    product_cache.invalidate(product_id)
+    search_service.remove_product(product_id)
+
+def _write_conflict(error: IntegrityError, values: Dict[str, Any]) -> HTTPException:
+    """
+    Traduce la restricción violada por un INSERT/UPDATE de productos
+    """
+    kind = integrity.violation(error)
+    if kind == integrity.UNIQUE:
+        return HTTPException(status_code=409, detail=f"El SKU '{values.get('sku')}' ya existe")
+    if kind == integrity.FOREIGN_KEY:
+        return HTTPException(status_code=400, detail=f"La categoría {values.get('categoria_id')} no existe")
+    # El texto del driver no se devuelve al cliente
+    print(f"⚠️ Restricción no reconocida al escribir un producto: {error.orig}")
+    return HTTPException(status_code=400, detail="Los datos del producto no son válidos")
+
+def _execute_write(db: Session, stmt, values: Dict[str, Any]):
+    """
+    Ejecuta un INSERT/UPDATE ... RETURNING y hace commit: un solo viaje a la
+    base de datos, sin SELECT previo ni refresh. Devuelve la fila escrita
+    (o None si el UPDATE no encontró el producto).
+    """
+    try:
+        row = db.execute(stmt.returning(*models.Product.__table__.c)).first()
+        db.commit()
+    except IntegrityError as e:
+        db.rollback()
+        raise _write_conflict(e, values)
+    return row
+
+def create_product(db: Session, product: ProductCreate):
     """
     Crea un nuevo producto en la base de datos
     """
     # Generar UUID para el producto
-    product_id = str(uuid.uuid4())
-    
-    db_product = models.Product(
-        id=product_id,
-        nombre=product.nombre,
-        descripcion=product.descripcion,
-        precio=product.precio,
-        stock=product.stock,
-        categoria_id=product.categoria_id,
-        sku=product.sku,
-        imagen_url=product.imagen_url
-    )
-    
-    db.add(db_product)
-    db.commit()
-    db.refresh(db_product)
+    values = {"id": str(uuid.uuid4()), **product.dict()}
+    db_product = _execute_write(db, insert(models.Product.__table__).values(**values), values)
+    search_service.index_product(db_product)
     return db_product
 #Obtener  por ID
 
+def _decrement_stock(db: Session, product_id: str, cantidad: int) -> Optional[int]:
+    """
+    Descuenta stock con un UPDATE condicional (WHERE stock >= cantidad).
+    La comprobación y el descuento son atómicos en la base de datos, así que
+    dos workers nunca venden la misma unidad. Devuelve el stock restante o
+    None si no hay producto o no alcanza el stock.
+    """
+    Product = models.Product
+    stmt = (
+        update(Product)
+        .where(Product.id == product_id, Product.stock >= cantidad)
+        .values(stock=Product.stock - cantidad)
+        .returning(Product.stock)
+        .execution_options(synchronize_session=False)
+    )
+    return db.execute(stmt).scalar_one_or_none()
+
 def update_product_stock(db: Session, product_id: str, cantidad: int) -> bool:
     """
     Actualiza el stock de un producto después de una venta.
     """
-    db_product = db.query(models.Product).filter(models.Product.id == product_id).first()
-    
-    if db_product:
-        # Verificamos si hay suficiente stock
-        if db_product.stock < cantidad:
-            return False  # No hay suficiente stock
-        # Reducir el stock
-        db_product.stock -= cantidad
+    remaining = _decrement_stock(db, product_id, cantidad)
+    if remaining is None:
+        db.rollback()
+        return False  # No existe o no hay suficiente stock
+    db.commit()
+    product_cache.invalidate(product_id)
+    return True
+
+def reserve_stock(db: Session, items: Iterable[Tuple[str, int]]) -> List[Dict[str, Any]]:
+    """
+    Reserva el stock de un carrito completo: todo o nada, en una transacción.
+
+    Las cantidades de un mismo producto se suman y los UPDATE se ejecutan en
+    orden de id, de modo que dos carritos concurrentes toman los bloqueos de
+    fila en el mismo orden y no pueden quedar en deadlock.
+
+    Raises:
+        HTTPException: 404 si un producto no existe, 409 si no alcanza el stock
+    """
+    quantities: Dict[str, int] = {}
+    for product_id, cantidad in items:
+        quantities[product_id] = quantities.get(product_id, 0) + cantidad
+    if not quantities:
+        raise HTTPException(status_code=400, detail="La reserva no tiene productos")
+
+    reserved = []
+    try:
+        for product_id in sorted(quantities):
+            cantidad = quantities[product_id]
+            remaining = _decrement_stock(db, product_id, cantidad)
+            if remaining is None:
+                exists = db.query(models.Product.id).filter(models.Product.id == product_id).first()
+                if not exists:
+                    raise HTTPException(
+                        status_code=404,
+                        detail={"message": "Producto no encontrado", "product_id": product_id}
+                    )
+                raise HTTPException(
+                    status_code=409,
+                    detail={
+                        "message": "Stock insuficiente",
+                        "product_id": product_id,
+                        "cantidad": cantidad,
+                    }
+                )
+            reserved.append({"product_id": product_id, "cantidad": cantidad, "stock": remaining})
         db.commit()
-        db.refresh(db_product)
-        return True
-    return False
+    except Exception:
+        db.rollback()
+        raise
+
+    for line in reserved:
+        product_cache.invalidate(line["product_id"])
+    return reserved
 
 def get_product(db: Session, product_id: str) -> models.Product:
     """
@@ -54,27 +195,305 @@ def get_product(db: Session, product_id: str) -> models.Product:
     """
     return db.query(models.Product).filter(models.Product.id == product_id).first()
 
-def get_products(db: Session, skip: int = 0, limit: int = 100) -> List[models.Product]:
+def get_product_cached(db: Session, product_id: str) -> Optional[ProductSnapshot]:
+    """
+    Obtiene un producto por su ID pasando por la caché de lectura.
+    Devuelve una copia inmutable (ProductSnapshot con schemas.Product) y no
+    el objeto ORM, porque se comparte entre peticiones y sesiones.
+    """
+    return product_cache.get_or_load(product_id, lambda: _load_product_snapshot(db, product_id))
+
+async def get_product_cached_async(db, product_id: str) -> Optional[ProductSnapshot]:
+    """
+    Igual que get_product_cached para el modo async: las peticiones
+    concurrentes esperan la misma corrutina sin bloquear el event loop
+    """
+    return await product_cache.aget_or_load(
+        product_id, lambda: db.run_sync(_load_product_snapshot, product_id)
+    )
+
+def _load_product_snapshot(db: Session, product_id: str) -> Optional[ProductSnapshot]:
+    db_product = get_product(db, product_id)
+    return _snapshot(db_product) if db_product else None
+
+def _snapshot(db_product: models.Product) -> ProductSnapshot:
+    return ProductSnapshot(Product.from_orm(db_product), db_product.version, db_product.actualizado_en)
+
+def warm_product_cache(db: Session, limit: int) -> int:
+    """
+    Precarga en product_cache los `limit` productos modificados más
+    recientemente, con pocas consultas en total. Devuelve cuántos cargó.
+    """
+    if limit <= 0:
+        return 0
+    ids = [
+        product_id for (product_id,) in
+        db.query(models.Product.id).order_by(models.Product.actualizado_en.desc()).limit(limit)
+    ]
+    # Versiones leídas antes de cargar: una escritura intermedia deja la
+    # entrada obsoleta en lugar de servir datos viejos
+    versions = {product_id: product_cache.current_version(product_id) for product_id in ids}
+    loaded = 0
+    for start in range(0, len(ids), 500):
+        chunk = ids[start:start + 500]
+        for db_product in db.query(models.Product).filter(models.Product.id.in_(chunk)):
+            product_cache.put(db_product.id, _snapshot(db_product), versions[db_product.id])
+            loaded += 1
+    return loaded
+
+# Claves por consulta IN en las búsquedas por lote (SQLite admite pocas
+# variables por sentencia) y máximo de claves por petición
+BATCH_CHUNK_SIZE = int(os.getenv("BATCH_CHUNK_SIZE", "500"))
+BATCH_MAX_KEYS = int(os.getenv("BATCH_MAX_KEYS", "5000"))
+
+def _find_by(db: Session, column, keys: List[str]) -> Dict[str, models.Product]:
+    found = {}
+    unique = list(dict.fromkeys(keys))
+    for start in range(0, len(unique), BATCH_CHUNK_SIZE):
+        chunk = unique[start:start + BATCH_CHUNK_SIZE]
+        for db_product in db.query(models.Product).filter(column.in_(chunk)):
+            found[getattr(db_product, column.key)] = db_product
+    return found
+
+def get_products_batch(db: Session, ids: List[str], skus: List[str] = ()) -> Dict[str, Any]:
+    """
+    Resuelve varios productos por ID y/o SKU con una consulta IN por cada
+    BATCH_CHUNK_SIZE claves. Devuelve un resultado por clave pedida, en el
+    mismo orden (primero los IDs y luego los SKU, repetidos incluidos), con
+    found=False y product=None para las que no existen
+    """
+    ids, skus = list(ids), list(skus)
+    if len(ids) + len(skus) > BATCH_MAX_KEYS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Se admiten como máximo {BATCH_MAX_KEYS} claves por petición"
+        )
+
+    by_id = _find_by(db, models.Product.id, ids) if ids else {}
+    by_sku = _find_by(db, models.Product.sku, skus) if skus else {}
+    items = []
+    found_count = 0
+    for by, keys, found in (("id", ids, by_id), ("sku", skus, by_sku)):
+        for key in keys:
+            product = found.get(key)
+            found_count += product is not None
+            items.append({"key": key, "by": by, "found": product is not None, "product": product})
+    return {"items": items, "found": found_count, "not_found": len(items) - found_count}
+
+class ProductFilters(NamedTuple):
+    """
+    Filtros combinables de los listados; todos opcionales
+    """
+    categoria_ids: Tuple[int, ...] = ()
+    precio_min: Optional[float] = None
+    precio_max: Optional[float] = None
+    en_stock: Optional[bool] = None  # True: stock > 0; False: sin stock
+    sku_prefix: Optional[str] = None
+
+NO_FILTERS = ProductFilters()
+
+# Claves de orden de los listados ("-" delante para descendente). Todas
+# desempatan por id y tienen un índice compuesto en models.Product
+PRODUCT_SORTS = {
+    "id": models.Product.id,
+    "precio": models.Product.precio,
+    "nombre": models.Product.nombre,
+}
+SORT_PATTERN = "^-?(id|precio|nombre)$"
+
+# Límites de los rangos de precio de las facetas: [0, 25), [25, 50), ... [1000, ∞)
+PRICE_FACET_BUCKETS = tuple(
+    float(edge) for edge in os.getenv("PRICE_FACET_BUCKETS", "0,25,50,100,250,500,1000").split(",")
+)
+
+def _sku_prefix_clause(db: Session, prefix: str):
+    Product = models.Product
+    if db.get_bind().dialect.name == "sqlite":
+        # El LIKE de SQLite no distingue mayúsculas y no usa índices: un rango
+        # sobre el índice único de sku (orden binario) selecciona lo mismo
+        return and_(Product.sku >= prefix, Product.sku < prefix + "\U0010ffff")
+    # PostgreSQL: LIKE 'prefijo%' sobre ix_productos_sku_pattern
+    return Product.sku.startswith(prefix, autoescape=True)
+
+def _price_clauses(filters: ProductFilters) -> list:
+    clauses = []
+    if filters.precio_min is not None:
+        clauses.append(models.Product.precio >= filters.precio_min)
+    if filters.precio_max is not None:
+        clauses.append(models.Product.precio <= filters.precio_max)
+    return clauses
+
+def _filter_clauses(db: Session, filters: ProductFilters, category: bool = True, price: bool = True) -> list:
+    Product = models.Product
+    clauses = []
+    if category and filters.categoria_ids:
+        clauses.append(Product.categoria_id.in_(filters.categoria_ids))
+    if price:
+        clauses.extend(_price_clauses(filters))
+    if filters.en_stock is not None:
+        clauses.append(Product.stock > 0 if filters.en_stock else Product.stock <= 0)
+    if filters.sku_prefix:
+        clauses.append(_sku_prefix_clause(db, filters.sku_prefix))
+    return clauses
+
+def _sort_key(sort: str) -> Tuple[str, bool]:
+    return sort.lstrip("-"), sort.startswith("-")
+
+def _ordered(query, sort: str):
+    key, descending = _sort_key(sort)
+    columns = [PRODUCT_SORTS[key]] if key == "id" else [PRODUCT_SORTS[key], models.Product.id]
+    return query.order_by(*[c.desc() if descending else c.asc() for c in columns])
+
+def _after_clause(sort: str, after: str):
+    """
+    Condición keyset `(clave, id) > último` (o < si es descendente)
+    """
+    Product = models.Product
+    key, descending = _sort_key(sort)
+    if key == "id":
+        (last_id,) = decode_cursor(after)
+        return Product.id < last_id if descending else Product.id > last_id
+
+    name, value, last_id = decode_cursor(after, (str, str, str))
+    if name != key:
+        raise HTTPException(status_code=400, detail="El cursor no corresponde al orden pedido")
+    if key == "precio":
+        try:
+            value = Decimal(value)
+        except ArithmeticError:
+            raise HTTPException(status_code=400, detail="Cursor de paginación inválido")
+    current = tuple_(PRODUCT_SORTS[key], Product.id)
+    return current < (value, last_id) if descending else current > (value, last_id)
+
+def _next_cursor(sort: str, row) -> str:
+    key, _ = _sort_key(sort)
+    if key == "id":
+        return encode_cursor(row.id)
+    return encode_cursor(key, str(getattr(row, key)), row.id)
+
+def _keyset_page(query, sort: str, after: Optional[str], limit: int):
+    if after:
+        query = query.filter(_after_clause(sort, after))
+    items = query.limit(limit + 1).all()
+    next_cursor = None
+    if len(items) > limit:
+        items = items[:limit]
+        next_cursor = _next_cursor(sort, items[-1])
+    return items, next_cursor
+
+def get_products(
+    db: Session, skip: int = 0, limit: int = 100, as_rows: bool = False,
+    filters: ProductFilters = NO_FILTERS, sort: str = "id",
+) -> List[models.Product]:
+    """
+    Obtiene una lista de productos con paginación, filtros y orden. Con
+    `as_rows` devuelve tuplas PRODUCT_ROW_COLUMNS en lugar de objetos ORM.
+    """
+    query = _products_query(db, as_rows).filter(*_filter_clauses(db, filters))
+    return _ordered(query, sort).offset(skip).limit(limit).all()
+
+def get_products_page(
+    db: Session, after: Optional[str] = None, limit: int = 100, as_rows: bool = False,
+    filters: ProductFilters = NO_FILTERS, sort: str = "id",
+) -> Tuple[List[models.Product], Optional[str]]:
+    """
+    Obtiene una página de productos con paginación por cursor (keyset).
+    Filtra por `(clave de orden, id) > última fila` sobre un índice
+    compuesto, así que el costo de cada página no depende de lo profundo
+    que vaya el cliente.
+    """
+    query = _products_query(db, as_rows).filter(*_filter_clauses(db, filters))
+    return _keyset_page(_ordered(query, sort), sort, after, limit)
+
+def get_products_versions(
+    db: Session, skip: int = 0, limit: int = 100, after: Optional[str] = None,
+    filters: ProductFilters = NO_FILTERS, sort: str = "id",
+) -> Tuple[List[Any], Optional[str]]:
+    """
+    (id, version, actualizado_en) de la misma página que devolverían
+    get_products (after=None) o get_products_page, sin cargar las filas
+    completas. Sirve para responder 304 a If-None-Match.
     """
-    Obtiene una lista de productos con paginación
+    Product = models.Product
+    key, _ = _sort_key(sort)
+    columns = [Product.id, Product.version, Product.actualizado_en]
+    if key != "id":
+        columns.append(PRODUCT_SORTS[key])  # Para calcular el cursor siguiente
+    query = _ordered(db.query(*columns).filter(*_filter_clauses(db, filters)), sort)
+    if after is None:
+        return query.offset(skip).limit(limit).all(), None
+    return _keyset_page(query, sort, after, limit)
+
+def get_product_facets(db: Session, filters: ProductFilters = NO_FILTERS) -> Dict[str, Any]:
+    """
+    Conteos por categoría y por rango de precio en una sola consulta
+    agregada (GROUP BY categoría, rango). Como en cualquier búsqueda por
+    facetas, cada faceta ignora su propio filtro y respeta los demás: las
+    otras categorías siguen apareciendo con lo que tendrían.
     """
-    return db.query(models.Product).offset(skip).limit(limit).all()
+    Product = models.Product
+    edges = PRICE_FACET_BUCKETS
+    bucket = case(
+        *[(Product.precio < edge, index) for index, edge in enumerate(edges[1:])],
+        else_=len(edges) - 1,
+    ).label("rango")
+    price = _price_clauses(filters)
+    in_price = func.sum(case((and_(*price), 1), else_=0)) if price else func.count()
+    rows = (
+        db.query(Product.categoria_id, bucket, func.count().label("productos"), in_price.label("en_rango"))
+        .filter(*_filter_clauses(db, filters, category=False, price=False))
+        # Se agrupa por el alias: repetir el CASE con sus parámetros no sería
+        # la misma expresión para PostgreSQL
+        .group_by(Product.categoria_id, literal_column("rango"))
+        .all()
+    )
+
+    selected = set(filters.categoria_ids)
+    categories: Dict[int, int] = {}
+    buckets = [0] * len(edges)
+    total = 0
+    for row in rows:
+        categories[row.categoria_id] = categories.get(row.categoria_id, 0) + int(row.en_rango)
+        if not selected or row.categoria_id in selected:
+            buckets[row.rango] += row.productos
+            total += int(row.en_rango)
+    return {
+        "total": total,
+        "categorias": [
+            {"categoria_id": category_id, "productos": count}
+            for category_id, count in sorted(categories.items())
+        ],
+        "precios": [
+            {"desde": edge, "hasta": edges[i + 1] if i + 1 < len(edges) else None, "productos": buckets[i]}
+            for i, edge in enumerate(edges)
+        ],
+    }
 
 #Actualiza
 
-def update_product(db: Session, product_id: str, product_update: ProductCreate) -> models.Product:
+def update_product(db: Session, product_id: str, product_update: ProductCreate):
     """
-    Actualiza un producto existente
+    Reemplaza todos los campos de un producto existente (PUT)
     """
-    db_product = db.query(models.Product).filter(models.Product.id == product_id).first()
-    
-    if db_product:
-        for key, value in product_update.dict().items():
-            setattr(db_product, key, value)
-        
-        db.commit()
-        db.refresh(db_product)
-    
+    return _update_product_columns(db, product_id, product_update.dict())
+
+def patch_product(db: Session, product_id: str, product_update: ProductUpdate):
+    """
+    Actualiza sólo los campos enviados (PATCH); el UPDATE escribe únicamente
+    esas columnas
+    """
+    changes = product_update.dict(exclude_unset=True)
+    if not changes:
+        return get_product(db, product_id)  # Nada que escribir: no cambia la versión
+    return _update_product_columns(db, product_id, changes)
+
+def _update_product_columns(db: Session, product_id: str, changes: Dict[str, Any]):
+    # version y actualizado_en se calculan en el propio UPDATE (onupdate)
+    table = models.Product.__table__
+    stmt = update(table).where(table.c.id == product_id).values(**changes)
+    db_product = _execute_write(db, stmt, changes)
+    if db_product is not None:
+        _on_product_changed(db_product)
     return db_product
 #Eliminar productos
 
@@ -87,25 +506,281 @@ def delete_product(db: Session, product_id: str) -> bool:
     if db_product:
         db.delete(db_product)
         db.commit()
+        _on_product_deleted(product_id)
         return True
     return False
 #Obtiene Productos
-def get_products_by_category(db: Session, category_id: int) -> List[models.Product]:
+def get_products_by_category(
+    db: Session, category_id: int, as_rows: bool = False, skip: int = 0, limit: Optional[int] = None
+) -> List[models.Product]:
     """
-    Obtiene productos por categoría
+    Obtiene productos por categoría, en orden de id (índice
+    ix_productos_categoria_id). Sin `limit` devuelve todos.
     """
-    return db.query(models.Product).filter(models.Product.categoria_id == category_id).all()
+    query = _products_query(db, as_rows).filter(models.Product.categoria_id == category_id)
+    return query.order_by(models.Product.id).offset(skip).limit(limit).all()
 
 #Buscar productos o producto
 
-def search_products(db: Session, query: str, skip: int = 0, limit: int = 100) -> List[models.Product]:
+def search_products(
+    db: Session, query: str, skip: int = 0, limit: int = 100, as_rows: bool = False
+) -> List[models.Product]:
     """
-    Busca productos por nombre o descripción
+    Busca productos por nombre, descripción o SKU ordenados por relevancia
+    (ver search_service)
     """
-    return db.query(models.Product).filter(
-        or_(
-            models.Product.nombre.ilike(f"%{query}%"),
-            models.Product.descripcion.ilike(f"%{query}%"),
-            models.Product.sku.ilike(f"%{query}%")
+    columns = PRODUCT_ROW_COLUMNS if as_rows else None
+    return search_service.search_products(db, query, skip, limit, columns)
+
+#Carga masiva
+
+def _describe_error(error: Exception) -> str:
+    if isinstance(error, ValidationError):
+        return "; ".join(
+            f"{'.'.join(str(loc) for loc in err['loc'])}: {err['msg']}" for err in error.errors()
         )
-    ).offset(skip).limit(limit).all()
+    return str(error)
+
+def _upsert_statement(db: Session):
+    """
+    INSERT con ON CONFLICT del motor, o None si no lo tiene
+    """
+    dialect = db.get_bind().dialect.name
+    if dialect == "postgresql":
+        return postgresql.insert(models.Product.__table__)
+    if dialect == "sqlite":
+        return sqlite.insert(models.Product.__table__)
+    return None
+
+def _write_products_batch_generic(
+    db: Session, batch: List[Tuple[int, ProductCreate]], upsert: bool
+) -> List[Dict[str, Any]]:
+    """
+    Igual que _write_products_batch para motores sin ON CONFLICT: busca los
+    SKU existentes, inserta los nuevos en un executemany y actualiza los
+    existentes uno a uno
+    """
+    table = models.Product.__table__
+    skus = [p.sku for _, p in batch if p.sku]
+    existing: Dict[str, str] = {}
+    if skus:
+        existing = dict(db.query(models.Product.sku, models.Product.id).filter(models.Product.sku.in_(skus)))
+
+    results, new_rows = [], []
+    for index, product in batch:
+        row = product.dict()
+        product_id = existing.get(product.sku) if product.sku else None
+        if product_id is None:
+            row["id"] = str(uuid.uuid4())
+            new_rows.append(row)
+            results.append({"index": index, "status": "created", "id": row["id"], "sku": product.sku})
+        elif upsert:
+            db.execute(
+                update(table).where(table.c.id == product_id)
+                .values(**row, version=table.c.version + 1, actualizado_en=func.now())
+            )
+            results.append({"index": index, "status": "updated", "id": product_id, "sku": product.sku})
+        else:
+            results.append({"index": index, "status": "conflict", "id": None, "sku": product.sku})
+    if new_rows:
+        db.execute(insert(table), new_rows)
+    return results
+
+def _write_products_batch(
+    db: Session, batch: List[Tuple[int, ProductCreate]], upsert: bool
+) -> List[Dict[str, Any]]:
+    """
+    Escribe un lote con INSERT multi-fila (ON CONFLICT sobre sku) y
+    devuelve el resultado de cada elemento
+    """
+    stmt = _upsert_statement(db)
+    if stmt is None:
+        return _write_products_batch_generic(db, batch, upsert)
+
+    table = models.Product.__table__
+    skus = [p.sku for _, p in batch if p.sku]
+    existing = set()
+    if skus:
+        existing = {
+            sku for (sku,) in db.query(models.Product.sku).filter(models.Product.sku.in_(skus))
+        }
+
+    rows = []
+    for _, product in batch:
+        row = product.dict()
+        row["id"] = str(uuid.uuid4())
+        rows.append(row)
+
+    # executemany: SQLAlchemy agrupa las filas en INSERT multi-fila
+    # ("insertmanyvalues") sin recompilar la sentencia por cada lote
+    if upsert:
+        # Los onupdate de las columnas no aplican a ON CONFLICT: la versión
+        # se incrementa aquí para que cambie el ETag
+        set_ = {c.name: stmt.excluded[c.name] for c in table.c
+                if c.name not in ("id", "version", "actualizado_en")}
+        set_["version"] = table.c.version + 1
+        set_["actualizado_en"] = func.now()
+        stmt = stmt.on_conflict_do_update(index_elements=[table.c.sku], set_=set_)
+    else:
+        stmt = stmt.on_conflict_do_nothing(index_elements=[table.c.sku])
+    written = db.execute(stmt.returning(table.c.id, table.c.sku), rows).all()
+
+    ids_by_sku = {sku: product_id for product_id, sku in written if sku is not None}
+    new_ids = {product_id for product_id, sku in written if sku is None}
+
+    results = []
+    for (index, product), row in zip(batch, rows):
+        if product.sku is None:
+            status = "created" if row["id"] in new_ids else "error"
+            product_id = row["id"]
+        elif product.sku in ids_by_sku:
+            status = "updated" if product.sku in existing else "created"
+            product_id = ids_by_sku[product.sku]
+        else:
+            status = "conflict"
+            product_id = None
+        results.append({"index": index, "status": status, "id": product_id, "sku": product.sku})
+    return results
+
+class ProductBulkWriter:
+    """
+    Valida productos y los escribe por lotes de `batch_size` filas.
+
+    Lo usan la carga masiva (una sola transacción) y la importación de
+    archivos (commit cada N filas). Las categorías se validan contra un
+    conjunto precargado una sola vez. Sólo se guardan en `results` los
+    elementos rechazados y, si `keep_written`, también los escritos; así la
+    memoria no crece con el tamaño de una importación.
+    """
+
+    def __init__(
+        self,
+        db: Session,
+        upsert: bool = True,
+        batch_size: int = BULK_BATCH_SIZE,
+        keep_written: bool = True,
+        max_reported: Optional[int] = None,
+    ):
+        self.db = db
+        self.upsert = upsert
+        self.batch_size = batch_size
+        self.keep_written = keep_written
+        self.max_reported = max_reported
+        self.category_ids = {category_id for (category_id,) in db.query(models.Category.id)}
+        self.counts = {status: 0 for status in ("created", "updated", "conflict", "error")}
+        self.total = 0
+        self.committed = 0
+        self.results: List[Dict[str, Any]] = []
+        self._batch: List[Tuple[int, ProductCreate]] = []
+        self._seen_skus = set()
+        self._pending: List[Tuple[Dict[str, Any], ProductCreate]] = []
+        self._started = time.perf_counter()
+
+    def _record(self, result: Dict[str, Any]) -> None:
+        self.counts[result["status"]] += 1
+        written = result["status"] in ("created", "updated")
+        if written and not self.keep_written:
+            return
+        if self.max_reported is None or len(self.results) < self.max_reported:
+            self.results.append(result)
+
+    def reject(self, index: int, error: Any, sku: Optional[str] = None) -> None:
+        self.total += 1
+        message = error if isinstance(error, str) else _describe_error(error)
+        self._record({"index": index, "status": "error", "sku": sku, "error": message})
+
+    def add(self, index: int, raw: Any) -> None:
+        """
+        Valida un elemento (dict o ProductCreate) y lo encola para escritura
+        """
+        try:
+            product = raw if isinstance(raw, ProductCreate) else ProductCreate(**raw)
+        except (ValidationError, TypeError) as e:
+            self.reject(index, e)
+            return
+
+        if product.categoria_id not in self.category_ids:
+            self.reject(index, f"La categoría {product.categoria_id} no existe", product.sku)
+            return
+        if product.sku is not None:
+            if product.sku in self._seen_skus:
+                self.reject(index, f"SKU '{product.sku}' repetido en la carga", product.sku)
+                return
+            self._seen_skus.add(product.sku)
+
+        self.total += 1
+        self._batch.append((index, product))
+        if len(self._batch) >= self.batch_size:
+            self.flush()
+
+    def flush(self) -> None:
+        if not self._batch:
+            return
+        batch, self._batch = self._batch, []
+        products = dict(batch)
+        for result in _write_products_batch(self.db, batch, self.upsert):
+            self._record(result)
+            if result["status"] in ("created", "updated"):
+                self._pending.append((result, products[result["index"]]))
+
+    def commit(self) -> None:
+        """
+        Escribe lo pendiente, confirma la transacción y después actualiza
+        caché e índice de búsqueda con los datos que ya están en memoria
+        """
+        self.flush()
+        self.db.commit()
+        pending, self._pending = self._pending, []
+        self.committed += len(pending)
+        # Dentro de un mismo commit no puede repetirse un SKU; entre commits
+        # el upsert simplemente actualiza la fila ya escrita
+        self._seen_skus.clear()
+        for result, product in pending:
+            written = SimpleNamespace(
+                id=result["id"], nombre=product.nombre, descripcion=product.descripcion, sku=product.sku
+            )
+            if result["status"] == "updated":
+                _on_product_changed(written)
+            else:
+                search_service.index_product(written)
+
+    def rollback(self) -> None:
+        self._batch = []
+        self._pending = []
+        self.db.rollback()
+
+    def report(self) -> Dict[str, Any]:
+        elapsed = time.perf_counter() - self._started
+        written = self.counts["created"] + self.counts["updated"]
+        self.results.sort(key=lambda r: r["index"])
+        return {
+            "total": self.total,
+            **self.counts,
+            "elapsed_ms": round(elapsed * 1000, 2),
+            "rows_per_second": round(written / elapsed, 1) if elapsed else 0.0,
+            "results": self.results,
+        }
+
+def bulk_upsert_products(
+    db: Session,
+    items: Iterable[Any],
+    upsert: bool = True,
+    batch_size: int = BULK_BATCH_SIZE,
+) -> Dict[str, Any]:
+    """
+    Crea (o actualiza por sku si `upsert`) muchos productos en una sola
+    transacción, con INSERT multi-fila por lotes de `batch_size`.
+
+    Los elementos inválidos, con categoría inexistente o con sku repetido
+    dentro de la misma carga se rechazan sin abortar el resto; cualquier
+    error de base de datos revierte la carga completa.
+    """
+    writer = ProductBulkWriter(db, upsert, batch_size)
+    try:
+        for index, raw in enumerate(items):
+            writer.add(index, raw)
+        writer.commit()
+    except Exception:
+        writer.rollback()
+        raise
+    return writer.report()
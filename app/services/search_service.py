@@ -0,0 +1,407 @@
+# backend-python/app/services/search_service.py
+"""
+Motor de búsqueda de productos.
+
+- PostgreSQL: índices GIN de trigramas (pg_trgm) sobre nombre, descripción y
+  SKU más un índice de texto completo; el filtrado y el ranking se hacen en SQL.
+- Otros motores (SQLite, pruebas): índice invertido de trigramas en memoria,
+  uno por proceso. Las escrituras de este worker lo actualizan al instante e
+  incrementan una versión compartida (utils/versioning.py); los demás workers
+  la ven en su siguiente búsqueda y aplican los productos tocados desde el
+  último `seq` leído del registro `cambios` (ver change_service), más los
+  cambios confirmados que aún no tienen seq. Se sigue el seq y no el id:
+  en PostgreSQL un id menor puede confirmarse después. Cada
+  SEARCH_INDEX_STALENESS segundos se comprueba además el registro, para ver
+  cambios hechos por fuera de la API.
+
+En ambos casos los SKU idénticos a la consulta aparecen primero.
+"""
+import heapq
+import logging
+import os
+import threading
+import time
+import unicodedata
+from collections import defaultdict
+from typing import Dict, List, Optional, Set, Tuple
+
+from sqlalchemy import case, func, literal_column, or_, select, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+
+from .. import models
+from ..database import engine
+from ..utils.versioning import shared_versions
+from .change_service import CHANGES_RETENTION_HOURS, latest_seq
+
+logger = logging.getLogger(__name__)
+
+# "auto" usa PostgreSQL si la base lo es y el índice en memoria en otro caso
+SEARCH_BACKEND = os.getenv("SEARCH_BACKEND", "auto")
+# Máximo desfase (segundos) del índice en memoria frente a cambios hechos por
+# fuera de la API; los de los workers de esta máquina se ven al instante
+SEARCH_INDEX_STALENESS = float(os.getenv("SEARCH_INDEX_STALENESS", "5"))
+# Productos por consulta al aplicar cambios de otros workers
+_REFRESH_CHUNK = 500
+
+# Debe coincidir exactamente con la expresión del índice ix_productos_fts
+_FTS_DOCUMENT = (
+    "to_tsvector('spanish', coalesce(nombre, '') || ' ' || coalesce(descripcion, ''))"
+)
+
+_POSTGRES_INDEXES = [
+    "CREATE INDEX IF NOT EXISTS ix_productos_nombre_trgm "
+    "ON productos USING gin (nombre gin_trgm_ops)",
+    "CREATE INDEX IF NOT EXISTS ix_productos_descripcion_trgm "
+    "ON productos USING gin (descripcion gin_trgm_ops)",
+    "CREATE INDEX IF NOT EXISTS ix_productos_sku_trgm "
+    "ON productos USING gin (sku gin_trgm_ops)",
+]
+_POSTGRES_FTS_INDEX = (
+    f"CREATE INDEX IF NOT EXISTS ix_productos_fts ON productos USING gin (({_FTS_DOCUMENT}))"
+)
+
+
+def _normalize(value: Optional[str]) -> str:
+    """
+    Pasa a minúsculas y elimina acentos para comparar sin distinguirlos
+    """
+    if not value:
+        return ""
+    decomposed = unicodedata.normalize("NFKD", value.casefold())
+    return "".join(c for c in decomposed if not unicodedata.combining(c))
+
+
+def _trigrams(value: str) -> Set[str]:
+    padded = f" {value} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class InMemorySearchIndex:
+    """
+    Índice invertido de trigramas para bases sin pg_trgm.
+
+    Cada documento guarda sus campos normalizados y cada trigrama apunta al
+    conjunto de ids que lo contienen. Una consulta sólo verifica los
+    candidatos de la intersección de sus trigramas, así que el costo depende
+    del número de coincidencias y no del tamaño del catálogo.
+    """
+
+    def __init__(self, versions=None, staleness: float = SEARCH_INDEX_STALENESS):
+        self._lock = threading.RLock()
+        self._docs: Dict[str, Tuple[str, str, str]] = {}
+        self._postings: Dict[str, Set[str]] = defaultdict(set)
+        self._loaded = False
+        self.versions = versions
+        self.staleness = staleness
+        self._cursor = 0          # Último cambios.seq aplicado
+        self._version = 0         # Versión compartida al sincronizar
+        self._checked_at = 0.0
+
+    def _shared_version(self) -> int:
+        return self.versions.current("productos") if self.versions is not None else 0
+
+    def _add(self, product_id: str, nombre, descripcion, sku) -> None:
+        doc = (_normalize(nombre), _normalize(descripcion), _normalize(sku))
+        self._docs[product_id] = doc
+        for gram in _trigrams(" ".join(doc)):
+            self._postings[gram].add(product_id)
+
+    def _remove(self, product_id: str) -> None:
+        doc = self._docs.pop(product_id, None)
+        if doc is None:
+            return
+        for gram in _trigrams(" ".join(doc)):
+            ids = self._postings.get(gram)
+            if ids is not None:
+                ids.discard(product_id)
+                if not ids:
+                    del self._postings[gram]
+
+    def ensure_loaded(self, db: Session) -> None:
+        """
+        Construye el índice con todos los productos la primera vez que se usa
+        """
+        if self._loaded:
+            return
+        with self._lock:
+            if self._loaded:
+                return
+            self._rebuild(db)
+
+    def _rebuild(self, db: Session) -> None:
+        # Versión y cursor se leen antes de cargar: un cambio intermedio se
+        # vuelve a aplicar en la siguiente sincronización (es idempotente)
+        version = self._shared_version()
+        cursor = latest_seq(db)
+        self._docs.clear()
+        self._postings.clear()
+        rows = db.query(
+            models.Product.id,
+            models.Product.nombre,
+            models.Product.descripcion,
+            models.Product.sku,
+        ).yield_per(1000)
+        for row in rows:
+            self._add(*row)
+        self._cursor, self._version, self._checked_at = cursor, version, time.monotonic()
+        self._loaded = True
+
+    def ensure_current(self, db: Session) -> None:
+        """
+        Carga el índice o le aplica los cambios de otros workers si la
+        versión compartida avanzó o venció SEARCH_INDEX_STALENESS
+        """
+        if not self._loaded:
+            self.ensure_loaded(db)
+            return
+        if (
+            self._version == self._shared_version()
+            and time.monotonic() - self._checked_at <= self.staleness
+        ):
+            return
+        with self._lock:
+            version = self._shared_version()
+            elapsed = time.monotonic() - self._checked_at
+            if self._version == version and elapsed <= self.staleness:
+                return  # Otro hilo sincronizó mientras esperábamos
+            if CHANGES_RETENTION_HOURS > 0 and elapsed > CHANGES_RETENTION_HOURS * 3600:
+                # Los cambios pendientes pudieron purgarse del registro
+                self._rebuild(db)
+                return
+            self._apply_changes(db, version)
+
+    def _apply_changes(self, db: Session, version: int) -> None:
+        Change = models.Change
+        # Los cambios todavía sin numerar también se aplican (reindexar el
+        # estado actual es idempotente); cuando reciban su seq, mayor que el
+        # cursor, se vuelven a aplicar
+        changes = db.execute(
+            select(Change.seq, Change.entidad_id)
+            .where(Change.entidad == "producto", or_(Change.seq > self._cursor, Change.seq.is_(None)))
+            .order_by(Change.id)
+        ).all()
+        cursor = max((change.seq for change in changes if change.seq is not None), default=self._cursor)
+        ids = list(dict.fromkeys(change.entidad_id for change in changes))
+        for start in range(0, len(ids), _REFRESH_CHUNK):
+            chunk = ids[start:start + _REFRESH_CHUNK]
+            current = {
+                row.id: row for row in db.query(
+                    models.Product.id, models.Product.nombre, models.Product.descripcion, models.Product.sku
+                ).filter(models.Product.id.in_(chunk))
+            }
+            # Se indexa el estado actual de cada producto tocado: las bajas
+            # ya no están en la tabla
+            for product_id in chunk:
+                self._remove(product_id)
+                if product_id in current:
+                    self._add(*current[product_id])
+        self._cursor, self._version, self._checked_at = cursor, version, time.monotonic()
+
+    def _changed(self) -> None:
+        if self.versions is not None:
+            self.versions.bump("productos")
+
+    def index(self, product: models.Product) -> None:
+        with self._lock:
+            self._changed()
+            if not self._loaded:
+                return  # Se indexará completo en la primera búsqueda
+            self._remove(product.id)
+            self._add(product.id, product.nombre, product.descripcion, product.sku)
+
+    def remove(self, product_id: str) -> None:
+        with self._lock:
+            self._changed()
+            if self._loaded:
+                self._remove(product_id)
+
+    def _candidates(self, term: str) -> Set[str]:
+        if len(term) >= 3:
+            grams = sorted(_trigrams(term) - {f" {term[:2]}", f"{term[-2:]} "},
+                           key=lambda g: len(self._postings.get(g, ())))
+            if not grams:
+                return set()
+            result = set(self._postings.get(grams[0], ()))
+            for gram in grams[1:]:
+                if not result:
+                    break
+                result &= self._postings.get(gram, set())
+            return result
+        # Términos cortos: unión de los trigramas que los contienen
+        result: Set[str] = set()
+        for gram, ids in self._postings.items():
+            if term in gram:
+                result |= ids
+        return result
+
+    def search(self, query: str, skip: int = 0, limit: int = 100) -> List[str]:
+        """
+        Devuelve los ids de los productos que contienen todos los términos
+        de la consulta, ordenados por relevancia
+        """
+        phrase = _normalize(query).strip()
+        terms = phrase.split()
+        if not terms:
+            return []
+
+        with self._lock:
+            candidates: Optional[Set[str]] = None
+            for term in sorted(set(terms), key=len, reverse=True):
+                ids = self._candidates(term)
+                candidates = ids if candidates is None else candidates & ids
+                if not candidates:
+                    return []
+
+            ranked = []
+            for product_id in candidates:
+                nombre, descripcion, sku = self._docs[product_id]
+                if not all(t in nombre or t in descripcion or t in sku for t in terms):
+                    continue
+                ranked.append((self._rank(phrase, terms, nombre, descripcion, sku), product_id))
+
+        best = heapq.nsmallest(skip + limit, ranked)
+        return [product_id for _, product_id in best[skip:]]
+
+    @staticmethod
+    def _rank(phrase, terms, nombre, descripcion, sku) -> Tuple[int, float]:
+        if sku and sku == phrase:
+            tier = 0
+        elif sku and sku.startswith(phrase):
+            tier = 1
+        else:
+            tier = 2
+
+        score = 0.0
+        if phrase in nombre:
+            score += 4 + (2 if nombre == phrase else 0)
+            score += 1 if nombre.startswith(phrase) or f" {phrase}" in nombre else 0
+        elif phrase in descripcion:
+            score += 1
+        for term in terms:
+            score += 2 if term in nombre else 0
+            score += 1 if term in sku else 0
+            score += 0.5 if term in descripcion else 0
+        return tier, -score
+
+
+_memory_index = InMemorySearchIndex(versions=shared_versions("busqueda"))
+_trigram_available = True
+
+
+def _use_postgres(db: Optional[Session] = None) -> bool:
+    if SEARCH_BACKEND != "auto":
+        return SEARCH_BACKEND == "postgres"
+    bind = db.get_bind() if db is not None else engine
+    return bind.dialect.name == "postgresql"
+
+
+def ensure_indexes(bind: Engine = engine) -> None:
+    """
+    Crea la extensión pg_trgm y los índices de búsqueda si no existen.
+    En otros motores no hace nada: el índice en memoria se crea bajo demanda.
+    """
+    global _trigram_available
+    if not _use_postgres():
+        return
+
+    with bind.connect() as conn:
+        try:
+            conn.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+            for statement in _POSTGRES_INDEXES:
+                conn.execute(text(statement))
+            conn.commit()
+        except Exception as e:
+            conn.rollback()
+            _trigram_available = False
+            logger.warning("Búsqueda sin índices de trigramas (pg_trgm no disponible): %s", e)
+
+        conn.execute(text(_POSTGRES_FTS_INDEX))
+        conn.commit()
+
+
+def schema_ddl() -> List[str]:
+    """
+    DDL que aplica ensure_indexes; forma parte de la huella del esquema para
+    que cambiarlo vuelva a ejecutar la migración
+    """
+    if not _use_postgres():
+        return []
+    return ["CREATE EXTENSION IF NOT EXISTS pg_trgm", *_POSTGRES_INDEXES, _POSTGRES_FTS_INDEX]
+
+
+def warm_index(db: Session) -> None:
+    """
+    Construye el índice en memoria por adelantado (antes del fork con
+    gunicorn --preload, así los workers lo comparten en copy-on-write)
+    """
+    if not _use_postgres(db):
+        _memory_index.ensure_loaded(db)
+
+
+def _search_postgres(db: Session, query: str, skip: int, limit: int, columns) -> List[models.Product]:
+    Product = models.Product
+    document = literal_column(_FTS_DOCUMENT)
+    ts_query = func.plainto_tsquery("spanish", query)
+
+    predicates = [
+        document.op("@@")(ts_query),
+        Product.nombre.icontains(query, autoescape=True),
+        Product.descripcion.icontains(query, autoescape=True),
+        Product.sku.icontains(query, autoescape=True),
+    ]
+    relevance = func.ts_rank(document, ts_query)
+    if _trigram_available:
+        relevance = relevance + func.similarity(Product.nombre, query)
+    exact_sku = case((func.lower(Product.sku) == query.lower(), 0), else_=1)
+
+    return (
+        db.query(*(columns or (Product,)))
+        .filter(or_(*predicates))
+        .order_by(exact_sku, relevance.desc(), Product.id)
+        .offset(skip)
+        .limit(limit)
+        .all()
+    )
+
+
+def _search_memory(db: Session, query: str, skip: int, limit: int, columns) -> List[models.Product]:
+    _memory_index.ensure_current(db)
+    ids = _memory_index.search(query, skip, limit)
+    if not ids:
+        return []
+    rows = db.query(*(columns or (models.Product,))).filter(models.Product.id.in_(ids))
+    products = {p.id: p for p in rows}
+    return [products[i] for i in ids if i in products]
+
+
+def search_products(
+    db: Session, query: str, skip: int = 0, limit: int = 100, columns: Optional[tuple] = None
+) -> List[models.Product]:
+    """
+    Busca productos por nombre, descripción o SKU, ordenados por relevancia.
+    Con `columns` devuelve esas columnas (tuplas) en lugar de objetos ORM.
+    """
+    query = query.strip()
+    if not query:
+        return []
+    if _use_postgres(db):
+        return _search_postgres(db, query, skip, limit, columns)
+    return _search_memory(db, query, skip, limit, columns)
+
+
+def index_product(product: models.Product) -> None:
+    """
+    Actualiza el índice en memoria tras crear o modificar un producto.
+    En PostgreSQL los índices GIN se mantienen solos.
+    """
+    if not _use_postgres():
+        _memory_index.index(product)
+
+
+def remove_product(product_id: str) -> None:
+    """
+    Quita un producto eliminado del índice en memoria
+    """
+    if not _use_postgres():
+        _memory_index.remove(product_id)
@@ -0,0 +1,279 @@
+# backend-python/app/services/stats_service.py
+"""
+Estadísticas por categoría mantenidas incrementalmente.
+
+- Triggers sobre `productos` anotan en `categoria_stats_delta` lo que suma o
+  resta cada escritura (productos, stock, productos con stock, suma de
+  precios). Cubren todas las rutas de escritura (alta, cambio, baja, stock,
+  reservas, carga masiva, importación) y también lo que se inserta por
+  fuera de la API, como seed_products. En PostgreSQL son triggers por
+  sentencia con tablas de transición: una carga masiva anota una fila por
+  categoría, no una por producto.
+- Las escrituras sólo insertan deltas: dos reservas de la misma categoría no
+  compiten por la fila de sus contadores.
+- compact() suma los deltas a `categoria_stats` y los borra; cada worker la
+  ejecuta cada STATS_COMPACT_SECONDS. Las lecturas suman además los deltas
+  pendientes, así que nunca ven datos atrasados.
+- El mínimo y el máximo de precio no se pueden mantener restando: salen del
+  índice (categoria_id, precio, id), con dos búsquedas en el índice por categoría.
+"""
+import logging
+import os
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import case, delete, func, insert, select, text
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.orm import Session
+
+from .. import models
+from ..database import SessionLocal, engine
+
+logger = logging.getLogger(__name__)
+
+# Cada cuántos segundos compacta los deltas cada worker (0 = nunca)
+STATS_COMPACT_SECONDS = float(os.getenv("STATS_COMPACT_SECONDS", "5"))
+
+_COUNTERS = ("productos", "stock_total", "con_stock", "precio_total")
+_DELTA_INSERT = (
+    "INSERT INTO categoria_stats_delta (categoria_id, productos, stock_total, con_stock, precio_total) VALUES "
+)
+
+# SQLite sólo tiene triggers por fila
+_SQLITE_TRIGGERS = [
+    "CREATE TRIGGER IF NOT EXISTS trg_productos_stats_ins AFTER INSERT ON productos BEGIN "
+    f"{_DELTA_INSERT}(NEW.categoria_id, 1, NEW.stock, NEW.stock > 0, NEW.precio); END",
+    "CREATE TRIGGER IF NOT EXISTS trg_productos_stats_del AFTER DELETE ON productos BEGIN "
+    f"{_DELTA_INSERT}(OLD.categoria_id, -1, -OLD.stock, -(OLD.stock > 0), -OLD.precio); END",
+    "CREATE TRIGGER IF NOT EXISTS trg_productos_stats_upd AFTER UPDATE OF stock, precio ON productos "
+    "WHEN OLD.categoria_id = NEW.categoria_id "
+    "AND (OLD.stock IS NOT NEW.stock OR OLD.precio IS NOT NEW.precio) BEGIN "
+    f"{_DELTA_INSERT}(NEW.categoria_id, 0, NEW.stock - OLD.stock, "
+    "(NEW.stock > 0) - (OLD.stock > 0), NEW.precio - OLD.precio); END",
+    "CREATE TRIGGER IF NOT EXISTS trg_productos_stats_mov AFTER UPDATE OF categoria_id ON productos "
+    "WHEN OLD.categoria_id IS NOT NEW.categoria_id BEGIN "
+    f"{_DELTA_INSERT}(OLD.categoria_id, -1, -OLD.stock, -(OLD.stock > 0), -OLD.precio), "
+    "(NEW.categoria_id, 1, NEW.stock, NEW.stock > 0, NEW.precio); END",
+]
+
+_POSTGRES_FUNCTION = """
+CREATE OR REPLACE FUNCTION productos_stats_delta() RETURNS trigger LANGUAGE plpgsql AS $$
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        INSERT INTO categoria_stats_delta (categoria_id, productos, stock_total, con_stock, precio_total)
+        SELECT categoria_id, count(*), sum(stock), count(*) FILTER (WHERE stock > 0), sum(precio)
+        FROM nuevas GROUP BY categoria_id;
+    ELSIF TG_OP = 'DELETE' THEN
+        INSERT INTO categoria_stats_delta (categoria_id, productos, stock_total, con_stock, precio_total)
+        SELECT categoria_id, -count(*), -sum(stock), -count(*) FILTER (WHERE stock > 0), -sum(precio)
+        FROM viejas GROUP BY categoria_id;
+    ELSE
+        INSERT INTO categoria_stats_delta (categoria_id, productos, stock_total, con_stock, precio_total)
+        SELECT categoria_id, sum(productos), sum(stock_total), sum(con_stock), sum(precio_total)
+        FROM (
+            SELECT categoria_id, 1 AS productos, stock AS stock_total,
+                   (stock > 0)::int AS con_stock, precio AS precio_total FROM nuevas
+            UNION ALL
+            SELECT categoria_id, -1, -stock, -(stock > 0)::int, -precio FROM viejas
+        ) cambios
+        GROUP BY categoria_id
+        HAVING sum(productos) <> 0 OR sum(stock_total) <> 0
+            OR sum(con_stock) <> 0 OR sum(precio_total) <> 0;
+    END IF;
+    RETURN NULL;
+END
+$$
+"""
+
+# Las tablas de transición no admiten UPDATE OF <columnas>: el trigger de
+# UPDATE corre en todos y la cláusula HAVING descarta los que no cambian nada
+_POSTGRES_TRIGGERS = [
+    _POSTGRES_FUNCTION,
+    "DROP TRIGGER IF EXISTS trg_productos_stats_ins ON productos",
+    "CREATE TRIGGER trg_productos_stats_ins AFTER INSERT ON productos "
+    "REFERENCING NEW TABLE AS nuevas FOR EACH STATEMENT EXECUTE FUNCTION productos_stats_delta()",
+    "DROP TRIGGER IF EXISTS trg_productos_stats_del ON productos",
+    "CREATE TRIGGER trg_productos_stats_del AFTER DELETE ON productos "
+    "REFERENCING OLD TABLE AS viejas FOR EACH STATEMENT EXECUTE FUNCTION productos_stats_delta()",
+    "DROP TRIGGER IF EXISTS trg_productos_stats_upd ON productos",
+    "CREATE TRIGGER trg_productos_stats_upd AFTER UPDATE ON productos "
+    "REFERENCING OLD TABLE AS viejas NEW TABLE AS nuevas "
+    "FOR EACH STATEMENT EXECUTE FUNCTION productos_stats_delta()",
+]
+
+
+def schema_ddl(bind: Engine = engine) -> List[str]:
+    """
+    DDL de los triggers del motor; forma parte de la huella del esquema
+    """
+    dialect = bind.dialect.name
+    if dialect == "postgresql":
+        return _POSTGRES_TRIGGERS
+    if dialect == "sqlite":
+        return _SQLITE_TRIGGERS
+    return []
+
+
+def _rebuild(conn: Connection) -> None:
+    Product, Stats, Delta = models.Product, models.CategoryStats, models.CategoryStatsDelta
+    conn.execute(delete(Delta))
+    conn.execute(delete(Stats))
+    totals = select(
+        Product.categoria_id,
+        func.count(Product.id),
+        func.coalesce(func.sum(Product.stock), 0),
+        func.sum(case((Product.stock > 0, 1), else_=0)),
+        func.coalesce(func.sum(Product.precio), 0),
+    ).group_by(Product.categoria_id)
+    conn.execute(insert(Stats).from_select(["categoria_id", *_COUNTERS], totals))
+
+
+def ensure_triggers(bind: Engine = engine) -> None:
+    """
+    Crea los triggers y reconstruye los agregados desde `productos` (un
+    recorrido completo, sólo al migrar el esquema). Triggers y reconstrucción
+    van en la misma transacción para no perder escrituras intermedias.
+    """
+    statements = schema_ddl(bind)
+    if not statements:
+        logger.warning("Estadísticas por categoría no disponibles para %s", bind.dialect.name)
+        return
+    with bind.begin() as conn:
+        if bind.dialect.name == "postgresql":
+            conn.execute(text("LOCK TABLE productos IN SHARE MODE"))
+        for statement in statements:
+            conn.execute(text(statement))
+        _rebuild(conn)
+
+
+def compact(db: Session) -> int:
+    """
+    Suma los deltas pendientes a categoria_stats y los borra. Devuelve el
+    número de categorías actualizadas.
+    """
+    Stats, Delta = models.CategoryStats, models.CategoryStatsDelta
+    if db.query(Delta.id).first() is None:
+        return 0  # Sin pendientes no se toma ningún bloqueo
+
+    dialect = db.get_bind().dialect.name
+    if dialect == "postgresql":
+        # DELETE ... RETURNING en un CTE: dos compactaciones simultáneas nunca
+        # suman el mismo delta (la segunda no ve las filas ya borradas)
+        columns = [Delta.categoria_id, *[Delta.__table__.c[c] for c in _COUNTERS]]
+        moved = delete(Delta).returning(*columns).cte("movidos")
+        source, stmt = moved, postgresql.insert(Stats)
+    elif dialect == "sqlite":
+        # SQLite serializa las escrituras: nadie agrega deltas entre el
+        # INSERT y el DELETE de esta transacción
+        source, stmt = Delta.__table__, sqlite.insert(Stats)
+    else:
+        # Sin DELETE ... RETURNING ni serialización de escrituras no hay forma
+        # portable de mover los deltas sin sumarlos dos veces: se quedan
+        # pendientes, y get_category_stats los sigue sumando al leer
+        logger.warning("Compactación de estadísticas no disponible para %s", dialect)
+        return 0
+
+    summed = select(source.c.categoria_id, *[func.sum(source.c[c]) for c in _COUNTERS])
+    stmt = stmt.from_select(["categoria_id", *_COUNTERS], summed.group_by(source.c.categoria_id))
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[Stats.categoria_id],
+        set_={c: Stats.__table__.c[c] + stmt.excluded[c] for c in _COUNTERS},
+    )
+    updated = db.execute(stmt).rowcount
+    if dialect != "postgresql":
+        db.execute(delete(Delta))
+    db.commit()
+    return updated
+
+
+def _pending():
+    Delta = models.CategoryStatsDelta
+    return (
+        select(Delta.categoria_id, *[func.sum(Delta.__table__.c[c]).label(c) for c in _COUNTERS])
+        .group_by(Delta.categoria_id)
+        .subquery("pendientes")
+    )
+
+
+def get_category_stats(db: Session) -> List[Dict[str, Any]]:
+    """
+    Estadísticas de todas las categorías: contadores compactados más los
+    deltas pendientes, y mínimo/máximo de precio desde el índice
+    """
+    Category, Product, Stats = models.Category, models.Product, models.CategoryStats
+    pending = _pending()
+    counters = [
+        (func.coalesce(Stats.__table__.c[c], 0) + func.coalesce(pending.c[c], 0)).label(c)
+        for c in _COUNTERS
+    ]
+    price_min = select(func.min(Product.precio)).where(Product.categoria_id == Category.id).scalar_subquery()
+    price_max = select(func.max(Product.precio)).where(Product.categoria_id == Category.id).scalar_subquery()
+    rows = (
+        db.query(Category.id, Category.nombre, *counters, price_min.label("precio_min"), price_max.label("precio_max"))
+        .outerjoin(Stats, Stats.categoria_id == Category.id)
+        .outerjoin(pending, pending.c.categoria_id == Category.id)
+        .order_by(Category.id)
+        .all()
+    )
+    return [
+        {
+            "categoria_id": row.id,
+            "nombre": row.nombre,
+            "productos": int(row.productos),
+            "stock_total": int(row.stock_total),
+            "con_stock": int(row.con_stock),
+            "precio_min": float(row.precio_min) if row.precio_min is not None else None,
+            "precio_max": float(row.precio_max) if row.precio_max is not None else None,
+            "precio_promedio": round(float(row.precio_total) / row.productos, 2) if row.productos else None,
+        }
+        for row in rows
+    ]
+
+
+def product_count(db: Session, category_id: int) -> int:
+    """
+    Productos de una categoría según los contadores (sin recorrer productos)
+    """
+    Stats, Delta = models.CategoryStats, models.CategoryStatsDelta
+    stored = select(Stats.productos).where(Stats.categoria_id == category_id).scalar_subquery()
+    pending = select(func.sum(Delta.productos)).where(Delta.categoria_id == category_id).scalar_subquery()
+    return int(db.execute(select(func.coalesce(stored, 0) + func.coalesce(pending, 0))).scalar())
+
+
+def forget_category(db: Session, category_id: int) -> None:
+    """
+    Borra los contadores de una categoría vacía (en la transacción del llamador)
+    """
+    Stats, Delta = models.CategoryStats, models.CategoryStatsDelta
+    db.query(Delta).filter(Delta.categoria_id == category_id).delete(synchronize_session=False)
+    db.query(Stats).filter(Stats.categoria_id == category_id).delete(synchronize_session=False)
+
+
+_compactor: Optional[threading.Thread] = None
+
+
+def start_compactor() -> None:
+    """
+    Arranca (una vez por proceso, después del fork) el hilo que compacta
+    los deltas cada STATS_COMPACT_SECONDS
+    """
+    global _compactor
+    if STATS_COMPACT_SECONDS <= 0 or (_compactor is not None and _compactor.is_alive()):
+        return
+
+    def run():
+        while True:
+            time.sleep(STATS_COMPACT_SECONDS)
+            db = SessionLocal()
+            try:
+                compact(db)
+            except Exception as e:
+                db.rollback()
+                print(f"⚠️ No se pudieron compactar las estadísticas: {e}")
+            finally:
+                db.close()
+
+    _compactor = threading.Thread(target=run, name="stats-compactor", daemon=True)
+    _compactor.start()
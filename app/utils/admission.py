@@ -0,0 +1,268 @@
+# backend-python/app/utils/admission.py
+"""
+Control de admisión (ASGI puro): limita cuántas peticiones de cada clase de
+ruta se atienden a la vez en este worker y rechaza el exceso pronto.
+
+- Cada clase (read, search, write, upload, priority) tiene un límite de
+  concurrencia, una cola acotada y un plazo máximo de espera en la cola.
+  Con la cola llena o vencido el plazo se responde 503 con Retry-After sin
+  tocar el threadpool ni el pool de conexiones: bajo un pico la latencia de
+  lo admitido se mantiene y no se trabaja para clientes que ya se fueron.
+- Los límites por defecto salen de la capacidad del pool de conexiones del
+  worker (DB_POOL_SIZE + DB_MAX_OVERFLOW): `priority` (reservas de stock del
+  checkout) tiene su propia parte reservada y el resto se reparte entre
+  lecturas, búsquedas, escrituras y cargas, así que la navegación saturada
+  no deja sin conexión al checkout.
+- Cada clase se configura con ADMISSION_<CLASE>_LIMIT, _QUEUE y _TIMEOUT.
+- Una ruta que espera sin usar la base (el long-poll de /api/changes) puede
+  ceder su lugar mientras duerme con admission_slot(request).
+"""
+import asyncio
+import math
+import os
+from collections import deque
+from typing import Deque, Dict, Optional
+
+from starlette.responses import JSONResponse
+
+from ..database import DB_MAX_OVERFLOW, DB_POOL_SIZE
+from .metrics import REGISTRY
+
+ADMISSION_CONTROL = os.getenv("ADMISSION_CONTROL", "true").lower() in ("1", "true", "yes")
+# Segundos sugeridos al cliente en Retry-After
+ADMISSION_RETRY_AFTER = float(os.getenv("ADMISSION_RETRY_AFTER", "1"))
+# Rutas del carril prioritario ("MÉTODO /ruta", separadas por comas)
+ADMISSION_PRIORITY_ROUTES = {
+    route.strip() for route in
+    os.getenv("ADMISSION_PRIORITY_ROUTES", "POST /api/products/reservations").split(",")
+    if route.strip()
+}
+
+ADMISSION_ACTIVE = REGISTRY.gauge(
+    "admission_in_flight", "Peticiones admitidas en curso", ("class",)
+)
+ADMISSION_QUEUED = REGISTRY.gauge(
+    "admission_queued", "Peticiones esperando admisión", ("class",)
+)
+ADMISSION_REJECTED = REGISTRY.counter(
+    "admission_rejected_total", "Peticiones rechazadas con 503", ("class", "reason")
+)
+ADMISSION_WAIT = REGISTRY.histogram(
+    "admission_wait_seconds", "Espera en la cola de admisión", ("class",)
+)
+
+
+class ConcurrencyLimiter:
+    """
+    Semáforo FIFO con cola acotada y plazo de espera. Sólo se usa desde el
+    event loop del worker, así que no necesita locks.
+    """
+
+    def __init__(self, name: str, limit: int, queue: int, timeout: float):
+        self.name = name
+        self.limit = max(1, limit)
+        self.queue = max(0, queue)
+        self.timeout = timeout
+        self.active = 0
+        self._waiters: Deque[asyncio.Future] = deque()
+
+    @property
+    def queued(self) -> int:
+        return sum(1 for waiter in self._waiters if not waiter.done())
+
+    async def acquire(self) -> Optional[str]:
+        """
+        Ocupa un lugar. Devuelve None si se admitió o el motivo del rechazo
+        ("queue_full" o "timeout").
+        """
+        if self.active < self.limit and not self._waiters:
+            self.active += 1
+            return None
+        if self.queued >= self.queue:
+            return "queue_full"
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        try:
+            # release() pasa el lugar directamente al primero de la cola
+            await asyncio.wait_for(waiter, self.timeout)
+        except asyncio.TimeoutError:
+            # Con wait_for sobre asyncio.timeout (3.12+) el plazo puede vencer
+            # justo después de que release() cediera el lugar
+            if waiter.done() and not waiter.cancelled():
+                self.release()
+            return "timeout"
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                self.release()  # Se le había cedido un lugar que ya no usará
+            raise
+        finally:
+            try:
+                self._waiters.remove(waiter)
+            except ValueError:
+                pass
+        return None
+
+    def release(self) -> None:
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)  # El lugar pasa sin liberarse
+                return
+        self.active -= 1
+
+    def status(self) -> Dict:
+        return {
+            "limit": self.limit,
+            "queue": self.queue,
+            "timeout": self.timeout,
+            "active": self.active,
+            "queued": self.queued,
+        }
+
+
+def _setting(name: str, key: str, default: float) -> float:
+    return float(os.getenv(f"ADMISSION_{name.upper()}_{key}", str(default)))
+
+
+def default_limiters(capacity: int = DB_POOL_SIZE + DB_MAX_OVERFLOW) -> Dict[str, ConcurrencyLimiter]:
+    """
+    Límites por clase a partir de las conexiones que puede abrir el worker.
+    Las clases de navegación suman como mucho `capacity - priority` (con
+    menos de 5 conexiones no cabe el mínimo de una por clase).
+    """
+    priority = max(1, capacity // 5)
+    browse = capacity - priority
+    search = max(1, browse // 4)
+    write = max(1, browse // 4)
+    # Cargas masivas, importaciones y subidas de imágenes: pocas a la vez
+    upload = max(1, browse // 8)
+    # Las lecturas se quedan con lo que sobra del reparto
+    read = max(1, browse - search - write - upload)
+    defaults = {
+        # límite, cola, plazo (s)
+        "read": (read, max(2, browse), 1.0),
+        "search": (search, max(2, browse // 2), 1.0),
+        "write": (write, max(2, browse // 2), 2.0),
+        "upload": (upload, max(2, browse // 8), 5.0),
+        "priority": (priority, 4 * priority, 5.0),
+    }
+    return {
+        name: ConcurrencyLimiter(
+            name,
+            int(_setting(name, "LIMIT", limit)),
+            int(_setting(name, "QUEUE", queue)),
+            _setting(name, "TIMEOUT", timeout),
+        )
+        for name, (limit, queue, timeout) in defaults.items()
+    }
+
+
+LIMITERS = default_limiters()
+
+
+def route_class(method: str, path: str) -> Optional[str]:
+    """
+    Clase de admisión de una petición, o None si no se limita (métricas,
+    rutas internas y estáticos)
+    """
+    if not path.startswith("/api/"):
+        return None
+    if f"{method} {path.rstrip('/')}" in ADMISSION_PRIORITY_ROUTES:
+        return "priority"
+    if path.startswith("/api/upload") or path.rstrip("/") in ("/api/products/import", "/api/products/bulk"):
+        return "upload"
+    if path.startswith("/api/products/search"):
+        return "search"
+    if method in ("GET", "HEAD") or path.rstrip("/") == "/api/products/batch":
+        return "read"
+    return "write"
+
+
+class AdmissionSlot:
+    """
+    Lugar admitido de una petición. La ruta puede cederlo mientras espera
+    sin usar la base y recuperarlo antes de volver a consultarla.
+    """
+
+    def __init__(self, name: str, limiter: ConcurrencyLimiter):
+        self.name = name
+        self.limiter = limiter
+        self.held = True
+
+    def release(self) -> None:
+        if self.held:
+            self.held = False
+            ADMISSION_ACTIVE.dec(self.name)
+            self.limiter.release()
+
+    async def reacquire(self) -> bool:
+        """
+        Vuelve a ocupar el lugar; False si se rechaza (cola llena o plazo
+        vencido) y la ruta debe responder con lo que ya tiene
+        """
+        if self.held:
+            return True
+        rejected = await self.limiter.acquire()
+        if rejected:
+            ADMISSION_REJECTED.inc(self.name, rejected)
+            return False
+        self.held = True
+        ADMISSION_ACTIVE.inc(self.name)
+        return True
+
+
+def admission_slot(request) -> Optional[AdmissionSlot]:
+    """
+    Lugar de la petición en curso, o None si su ruta no pasa por admisión
+    """
+    return request.scope.get("state", {}).get("admission")
+
+
+class AdmissionMiddleware:
+    def __init__(self, app, limiters: Optional[Dict[str, ConcurrencyLimiter]] = None):
+        self.app = app
+        self.limiters = limiters if limiters is not None else LIMITERS
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not ADMISSION_CONTROL:
+            await self.app(scope, receive, send)
+            return
+        name = route_class(scope["method"], scope["path"])
+        limiter = self.limiters.get(name) if name else None
+        if limiter is None:
+            await self.app(scope, receive, send)
+            return
+
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        ADMISSION_QUEUED.inc(name)
+        try:
+            rejected = await limiter.acquire()
+        finally:
+            ADMISSION_QUEUED.dec(name)
+        ADMISSION_WAIT.observe(name, value=loop.time() - started)
+        if rejected:
+            ADMISSION_REJECTED.inc(name, rejected)
+            response = JSONResponse(
+                {"detail": "Servidor saturado; reintente más tarde", "class": name, "reason": rejected},
+                status_code=503,
+                headers={"Retry-After": str(max(1, math.ceil(ADMISSION_RETRY_AFTER)))},
+            )
+            await response(scope, receive, send)
+            return
+
+        ADMISSION_ACTIVE.inc(name)
+        slot = AdmissionSlot(name, limiter)
+        scope.setdefault("state", {})["admission"] = slot
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            slot.release()
+
+
+def status() -> Dict[str, Dict]:
+    """
+    Estado de los limitadores de este worker (para /internal/admission)
+    """
+    return {name: limiter.status() for name, limiter in LIMITERS.items()}
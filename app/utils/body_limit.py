@@ -0,0 +1,54 @@
+# backend-python/app/utils/body_limit.py
+"""
+Límite de tamaño del cuerpo (ASGI puro) para rutas que reciben archivos.
+
+- Con Content-Length mayor que el límite responde 413 sin leer el cuerpo:
+  Starlette no llega a volcar el multipart a disco.
+- Sin Content-Length (chunked) cuenta los bytes a medida que llegan y corta
+  con 413 en cuanto se supera, en lugar de al terminar de recibirlo.
+"""
+from typing import Iterable
+
+from fastapi import HTTPException
+from starlette.responses import JSONResponse
+
+
+class BodySizeLimitMiddleware:
+    def __init__(
+        self, app, max_bytes: int, paths: Iterable[str],
+        detail: str = "El cuerpo de la petición es demasiado grande",
+    ):
+        self.app = app
+        self.max_bytes = max_bytes
+        self.paths = tuple(paths)
+        self.detail = detail
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not scope["path"].startswith(self.paths):
+            await self.app(scope, receive, send)
+            return
+
+        length = dict(scope["headers"]).get(b"content-length")
+        if length is not None:
+            try:
+                too_large = int(length) > self.max_bytes
+            except ValueError:
+                too_large = False  # Lo rechaza el servidor o el parser
+            if too_large:
+                response = JSONResponse({"detail": self.detail}, status_code=413, headers={"Connection": "close"})
+                await response(scope, receive, send)
+                return
+
+        received = 0
+
+        async def limited_receive():
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > self.max_bytes:
+                    # FastAPI deja pasar HTTPException al leer el formulario
+                    raise HTTPException(status_code=413, detail=self.detail)
+            return message
+
+        await self.app(scope, limited_receive, send)
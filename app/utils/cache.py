@@ -0,0 +1,203 @@
+# backend-python/app/utils/cache.py
+import asyncio
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+
+class _Flight:
+    """Carga en curso de una clave, compartida por todas las peticiones que la esperan"""
+
+    __slots__ = ("event", "value", "error")
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.value = None
+        self.error: Optional[BaseException] = None
+
+
+# Resultado de una carga asíncrona cancelada: quien la esperaba vuelve a intentar
+_RETRY = object()
+
+
+class ReadThroughCache:
+    """
+    Caché LRU con TTL delante de una función de carga.
+
+    - Las cargas concurrentes de una misma clave se agrupan en una sola
+      (single-flight): la primera petición consulta y las demás esperan.
+    - Cada entrada guarda la versión de su clave en `versions` al momento de
+      cargarse; si otro worker incrementa la versión, la entrada se descarta.
+    - Los valores None no se guardan.
+
+    get_or_load sirve a código síncrono (hilos del threadpool) y aget_or_load
+    a corrutinas; ambos comparten entradas y contadores.
+    """
+
+    def __init__(self, maxsize: int = 10000, ttl: float = 30.0, versions=None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.versions = versions
+        self._lock = threading.Lock()
+        self._data: "OrderedDict[str, tuple]" = OrderedDict()
+        self._flights: Dict[str, _Flight] = {}
+        self._async_flights: Dict[str, asyncio.Future] = {}
+        self._counters = {
+            "hits": 0,
+            "misses": 0,
+            "coalesced": 0,
+            "evictions": 0,
+            "stale": 0,
+            "invalidations": 0,
+        }
+
+    def _version(self, key: str) -> int:
+        return self.versions.current(key) if self.versions is not None else 0
+
+    def _lookup(self, key: str, version: int) -> Tuple[bool, Any]:
+        # Debe llamarse con self._lock tomado
+        entry = self._data.get(key)
+        if entry is not None:
+            value, expires_at, entry_version = entry
+            if entry_version == version and expires_at > time.monotonic():
+                self._data.move_to_end(key)
+                self._counters["hits"] += 1
+                return True, value
+            del self._data[key]
+            self._counters["stale"] += 1
+
+        self._counters["misses"] += 1
+        return False, None
+
+    def get_or_load(self, key: str, loader: Callable[[], Any]) -> Any:
+        """
+        Devuelve el valor en caché o lo carga con `loader` una sola vez
+        aunque haya varias peticiones simultáneas por la misma clave
+        """
+        version = self._version(key)
+
+        with self._lock:
+            found, value = self._lookup(key, version)
+            if found:
+                return value
+
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+            else:
+                self._counters["coalesced"] += 1
+
+        if not leader:
+            flight.event.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.value
+
+        try:
+            flight.value = loader()
+        except BaseException as e:
+            flight.error = e
+            raise
+        else:
+            if flight.value is not None:
+                self._store(key, flight.value, version)
+            return flight.value
+        finally:
+            with self._lock:
+                self._flights.pop(key, None)
+            flight.event.set()
+
+    async def aget_or_load(self, key: str, loader: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Versión asíncrona de get_or_load: las corrutinas que piden la misma
+        clave esperan el mismo Future en lugar de bloquear el event loop.
+
+        Si se cancela la petición que carga (el cliente se desconectó), las
+        que esperaban no se cancelan: reintentan y una de ellas carga con su
+        propio `loader`.
+        """
+        while True:
+            version = self._version(key)
+
+            with self._lock:
+                found, value = self._lookup(key, version)
+                if found:
+                    return value
+
+                flight = self._async_flights.get(key)
+                if flight is not None:
+                    self._counters["coalesced"] += 1
+
+            if flight is None:
+                return await self._aload(key, loader, version)
+            value = await asyncio.shield(flight)
+            if value is not _RETRY:
+                return value
+
+    async def _aload(self, key: str, loader: Callable[[], Awaitable[Any]], version: int) -> Any:
+        flight = asyncio.get_running_loop().create_future()
+        self._async_flights[key] = flight
+        try:
+            value = await loader()
+        except asyncio.CancelledError:
+            # Nunca se cancela el Future compartido: los demás reintentan
+            flight.set_result(_RETRY)
+            raise
+        except BaseException as e:
+            flight.set_exception(e)
+            flight.exception()  # Evita el aviso si nadie más lo esperaba
+            raise
+        else:
+            flight.set_result(value)
+            if value is not None:
+                self._store(key, value, version)
+            return value
+        finally:
+            if self._async_flights.get(key) is flight:
+                del self._async_flights[key]
+
+    def _store(self, key: str, value: Any, version: int) -> None:
+        with self._lock:
+            self._data[key] = (value, time.monotonic() + self.ttl, version)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self._counters["evictions"] += 1
+
+    def put(self, key: str, value: Any, version: Optional[int] = None) -> None:
+        """
+        Guarda un valor cargado por fuera (precalentamiento). `version` debe
+        leerse con current_version() antes de consultar la base de datos;
+        así una escritura intermedia deja la entrada ya obsoleta.
+        """
+        if value is not None:
+            self._store(key, value, self._version(key) if version is None else version)
+
+    def current_version(self, key: str) -> int:
+        return self._version(key)
+
+    def invalidate(self, key: str) -> None:
+        """
+        Descarta la clave en este proceso y en todos los que comparten `versions`
+        """
+        if self.versions is not None:
+            self.versions.bump(key)
+        with self._lock:
+            self._data.pop(key, None)
+            self._counters["invalidations"] += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self._counters)
+            stats["size"] = len(self._data)
+        stats["maxsize"] = self.maxsize
+        stats["ttl"] = self.ttl
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_ratio"] = round(stats["hits"] / lookups, 4) if lookups else 0.0
+        return stats
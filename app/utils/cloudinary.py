@@ -3,19 +3,29 @@ import cloudinary.uploader
 from dotenv import load_dotenv
 import os
 
-load_dotenv()
+_configured = False
 
-cloudinary.config(
-    cloud_name=os.getenv('CLOUDINARY_CLOUD_NAME'),
-    api_key=os.getenv('CLOUDINARY_API_KEY'),
-    api_secret=os.getenv('CLOUDINARY_API_SECRET'),
-    secure=True
-)
+
+def _configure():
+    # Se configura en la primera subida y no al importar: los workers que
+    # nunca suben imágenes no leen .env ni inicializan el SDK
+    global _configured
+    if _configured:
+        return
+    load_dotenv()
+    cloudinary.config(
+        cloud_name=os.getenv('CLOUDINARY_CLOUD_NAME'),
+        api_key=os.getenv('CLOUDINARY_API_KEY'),
+        api_secret=os.getenv('CLOUDINARY_API_SECRET'),
+        secure=True
+    )
+    _configured = True
 
 def upload_image(file_path: str):
+    _configure()
     try:
         response = cloudinary.uploader.upload(file_path)
         return response['secure_url']
     except Exception as e:
         print(f"Error uploading image: {e}")
-        return None
\ No newline at end of file
+        return None
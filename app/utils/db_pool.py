@@ -0,0 +1,108 @@
+# backend-python/app/utils/db_pool.py
+import threading
+import time
+from typing import Dict
+
+from sqlalchemy import exc
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+from .metrics import Histogram, summarize
+
+# Espera para obtener una conexión: de microsegundos (pool libre) a
+# segundos (pool agotado, hasta pool_timeout)
+CHECKOUT_BUCKETS = (
+    0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0,
+)
+
+
+class PoolStats:
+    """
+    Contadores de un pool: peticiones esperando conexión, tiempo total de
+    espera, timeouts e histograma de latencia de checkout
+    """
+
+    def __init__(self):
+        self.checkout_latency = Histogram(CHECKOUT_BUCKETS)
+        self._lock = threading.Lock()
+        self.waiting = 0
+        self.timeouts = 0
+        self.wait_seconds_total = 0.0
+
+    def enter(self) -> None:
+        with self._lock:
+            self.waiting += 1
+
+    def exit(self, elapsed: float, timed_out: bool) -> None:
+        self.checkout_latency.observe(elapsed)
+        with self._lock:
+            self.waiting -= 1
+            self.wait_seconds_total += elapsed
+            if timed_out:
+                self.timeouts += 1
+
+
+class _InstrumentedMixin:
+    """
+    Mide cuánto tarda cada checkout de conexión (incluida la espera en la
+    cola del pool cuando está agotado)
+    """
+
+    stats: PoolStats
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.stats = PoolStats()
+
+    def _do_get(self):
+        started = time.perf_counter()
+        timed_out = False
+        self.stats.enter()
+        try:
+            return super()._do_get()
+        except exc.TimeoutError:
+            timed_out = True
+            raise
+        finally:
+            self.stats.exit(time.perf_counter() - started, timed_out)
+
+    def recreate(self):
+        # engine.dispose() crea un pool nuevo: conservar las estadísticas
+        pool = super().recreate()
+        pool.stats = self.stats
+        return pool
+
+
+class InstrumentedQueuePool(_InstrumentedMixin, QueuePool):
+    pass
+
+
+class InstrumentedAsyncQueuePool(_InstrumentedMixin, AsyncAdaptedQueuePool):
+    pass
+
+
+def pool_status(pool) -> Dict:
+    """
+    Estado actual del pool en un diccionario serializable
+    """
+    status = {"class": type(pool).__name__}
+    if isinstance(pool, QueuePool):
+        status.update({
+            "size": pool.size(),
+            "checked_out": pool.checkedout(),
+            "checked_in": pool.checkedin(),
+            "overflow": max(pool.overflow(), 0),
+            "max_overflow": pool._max_overflow,
+            "timeout": pool.timeout(),
+        })
+    stats = getattr(pool, "stats", None)
+    if stats is not None:
+        status.update({
+            "waiting": stats.waiting,
+            "timeouts": stats.timeouts,
+            "wait_seconds_total": round(stats.wait_seconds_total, 6),
+            "checkout_latency": {
+                **summarize(stats.checkout_latency.snapshot()),
+                "histogram": stats.checkout_latency.snapshot(),
+            },
+        })
+    return status
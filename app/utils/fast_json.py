@@ -0,0 +1,36 @@
+# backend-python/app/utils/fast_json.py
+import json
+from typing import Any, Iterable, List, Sequence
+
+from fastapi import Response
+
+try:
+    import orjson
+except ImportError:  # orjson es opcional: sin él se usa json de la stdlib
+    orjson = None
+
+
+def dumps(content: Any) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(content)
+    return json.dumps(content, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+class FastJSONResponse(Response):
+    """
+    Respuesta JSON que codifica con orjson. El contenido debe ser ya de
+    tipos básicos (dict, list, str, int, float, None): no se valida.
+    """
+
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+def records(fields: Sequence[str], rows: Iterable[Sequence[Any]]) -> List[dict]:
+    """
+    Convierte tuplas de columnas en diccionarios con las primeras
+    len(fields) columnas de cada fila
+    """
+    return [dict(zip(fields, row)) for row in rows]
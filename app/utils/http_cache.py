@@ -0,0 +1,120 @@
+# backend-python/app/utils/http_cache.py
+"""
+Validadores HTTP (ETag / Last-Modified) y Cache-Control para las lecturas.
+
+Los ETag se derivan de la versión de cada fila (columna `version`), no del
+cuerpo de la respuesta: comprobar If-None-Match no requiere serializar nada.
+El de una colección resume los (id, version) de las filas de la página, así
+que cambia con cualquier alta, baja o modificación que la afecte.
+"""
+import hashlib
+import json
+import os
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Any, Iterable, Optional, Tuple
+
+from fastapi import Request, Response
+
+# max-age para navegadores (0: revalidan siempre, con 304 es barato) y
+# s-maxage / stale-while-revalidate para caches compartidas (CDN)
+HTTP_CACHE_MAX_AGE = int(os.getenv("HTTP_CACHE_MAX_AGE", "0"))
+HTTP_CACHE_S_MAXAGE = int(os.getenv("HTTP_CACHE_S_MAXAGE", "5"))
+HTTP_CACHE_SWR = int(os.getenv("HTTP_CACHE_SWR", "30"))
+
+CACHE_CONTROL = (
+    f"public, max-age={HTTP_CACHE_MAX_AGE}, s-maxage={HTTP_CACHE_S_MAXAGE}, "
+    f"stale-while-revalidate={HTTP_CACHE_SWR}"
+)
+
+Validators = Tuple[str, Optional[datetime]]
+
+
+def _as_utc(value: Optional[datetime]) -> Optional[datetime]:
+    if value is None:
+        return None
+    # SQLite devuelve fechas sin zona: se guardan en UTC
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value.astimezone(timezone.utc).replace(microsecond=0)
+
+
+def _etag(*parts: Any) -> str:
+    digest = hashlib.blake2b("\x1f".join(str(p) for p in parts).encode(), digest_size=12)
+    return f'"{digest.hexdigest()}"'
+
+
+def resource_validators(kind: str, id: Any, version: int, actualizado_en: Optional[datetime]) -> Validators:
+    """
+    ETag y Last-Modified de una fila
+    """
+    return _etag(kind, id, version), _as_utc(actualizado_en)
+
+
+def collection_validators(
+    kind: str, rows: Iterable[Any], next_cursor: Optional[str] = None, extra: Any = None
+) -> Validators:
+    """
+    ETag y Last-Modified de una página de filas (en el orden en que se envían).
+    `extra` es el resto de la respuesta que no sale de las filas (p. ej. las
+    facetas) y también forma parte del ETag.
+    """
+    digest = hashlib.blake2b(f"{kind}\x1f{next_cursor or ''}".encode(), digest_size=12)
+    if extra is not None:
+        digest.update(json.dumps(extra, sort_keys=True, default=str).encode())
+    last_modified = None
+    for row in rows:
+        digest.update(f"\x1e{row.id}:{row.version}".encode())
+        modified = _as_utc(row.actualizado_en)
+        if modified is not None and (last_modified is None or modified > last_modified):
+            last_modified = modified
+    return f'"{digest.hexdigest()}"', last_modified
+
+
+def has_validators(request: Request, use_last_modified: bool = True) -> bool:
+    if "if-none-match" in request.headers:
+        return True
+    return use_last_modified and "if-modified-since" in request.headers
+
+
+def is_not_modified(request: Request, validators: Validators, use_last_modified: bool = True) -> bool:
+    """
+    Evalúa If-None-Match (comparación débil, RFC 9110) y, sólo si no viene,
+    If-Modified-Since. En colecciones no se usa Last-Modified: una baja no
+    lo cambia, sólo el ETag la refleja.
+    """
+    etag, last_modified = validators
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        if if_none_match.strip() == "*":
+            return True
+        candidates = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+        return etag in candidates
+
+    if_modified_since = request.headers.get("if-modified-since")
+    if not use_last_modified or if_modified_since is None or last_modified is None:
+        return False
+    try:
+        since = parsedate_to_datetime(if_modified_since)
+    except (TypeError, ValueError):
+        return False
+    return last_modified <= _as_utc(since)
+
+
+def cache_headers(validators: Validators) -> dict:
+    etag, last_modified = validators
+    headers = {"ETag": etag, "Cache-Control": CACHE_CONTROL}
+    if last_modified is not None:
+        headers["Last-Modified"] = format_datetime(last_modified, usegmt=True)
+    return headers
+
+
+def apply(response: Response, validators: Validators) -> None:
+    """
+    Agrega los validadores a la respuesta que FastAPI va a serializar
+    """
+    response.headers.update(cache_headers(validators))
+
+
+def not_modified(validators: Validators) -> Response:
+    return Response(status_code=304, headers=cache_headers(validators))
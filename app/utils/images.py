@@ -0,0 +1,153 @@
+# backend-python/app/utils/images.py
+"""
+Etapa de procesamiento de imágenes previa al almacenamiento:
+
+1. Calcula el SHA-256 del archivo original y lo busca en el índice de
+   contenido (tabla `imagenes`); si ya se subió, devuelve esas URLs sin
+   decodificar ni subir nada.
+2. Decodifica de forma diferida (Image.draft reduce JPEG al decodificar),
+   limita las dimensiones y recodifica a un formato compacto (WebP).
+3. Genera miniaturas y sube todas las variantes al backend de storage.
+"""
+import hashlib
+import io
+import json
+import os
+import tempfile
+from typing import Any, Dict, List, Optional, Tuple
+
+from PIL import Image, ImageOps, UnidentifiedImageError, features
+from sqlalchemy.exc import IntegrityError
+
+from ..database import SessionLocal
+from ..models import ImageAsset
+from .cache import ReadThroughCache
+from .storage import StorageBackend, get_storage
+
+IMAGE_MAX_SIZE = int(os.getenv("IMAGE_MAX_SIZE", "1600"))
+IMAGE_THUMB_SIZES = [
+    int(size) for size in os.getenv("IMAGE_THUMB_SIZES", "320,640").split(",") if size.strip()
+]
+IMAGE_QUALITY = int(os.getenv("IMAGE_QUALITY", "80"))
+IMAGE_FORMAT = os.getenv("IMAGE_FORMAT", "WEBP" if features.check("webp") else "JPEG").upper()
+
+_EXTENSIONS = {"WEBP": ".webp", "JPEG": ".jpg", "PNG": ".png"}
+_HASH_CHUNK = 1024 * 1024
+
+# Caché en proceso del índice de contenido. Además agrupa subidas
+# simultáneas del mismo archivo en una sola (single-flight)
+_known_images = ReadThroughCache(maxsize=4096, ttl=24 * 3600)
+
+
+class ImageError(Exception):
+    """El archivo no es una imagen que se pueda procesar"""
+
+
+def file_digest(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(_HASH_CHUNK), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _encode(image: Image.Image) -> bytes:
+    if IMAGE_FORMAT == "JPEG" or image.mode not in ("RGB", "RGBA"):
+        has_alpha = image.mode in ("RGBA", "LA", "PA") or "transparency" in image.info
+        image = image.convert("RGBA" if has_alpha and IMAGE_FORMAT != "JPEG" else "RGB")
+    buffer = io.BytesIO()
+    image.save(buffer, IMAGE_FORMAT, quality=IMAGE_QUALITY, optimize=True)
+    return buffer.getvalue()
+
+
+def render_variants(path: str) -> List[Tuple[str, bytes]]:
+    """
+    Devuelve [("original", bytes), ("320", bytes), ...] ya recodificadas.
+    La variante "original" queda limitada a IMAGE_MAX_SIZE px de lado.
+    """
+    try:
+        with Image.open(path) as image:
+            # Para JPEG decodifica directamente a una escala reducida
+            image.draft("RGB", (IMAGE_MAX_SIZE, IMAGE_MAX_SIZE))
+            image = ImageOps.exif_transpose(image)
+            image.thumbnail((IMAGE_MAX_SIZE, IMAGE_MAX_SIZE))
+
+            variants = [("original", _encode(image))]
+            for size in sorted(IMAGE_THUMB_SIZES, reverse=True):
+                if size >= max(image.size):
+                    continue
+                thumb = image.copy()
+                thumb.thumbnail((size, size))
+                variants.append((str(size), _encode(thumb)))
+            return variants
+    except (UnidentifiedImageError, OSError, Image.DecompressionBombError) as e:
+        raise ImageError("El archivo no es una imagen válida") from e
+
+
+def _lookup(digest: str) -> Optional[Dict[str, Any]]:
+    db = SessionLocal()
+    try:
+        asset = db.get(ImageAsset, digest)
+        if asset is None:
+            return None
+        return {"url": asset.url, "thumbnails": json.loads(asset.variantes or "{}")}
+    finally:
+        db.close()
+
+
+def _record(digest: str, url: str, thumbnails: Dict[str, str]) -> None:
+    db = SessionLocal()
+    try:
+        db.add(ImageAsset(hash=digest, url=url, variantes=json.dumps(thumbnails)))
+        db.commit()
+    except IntegrityError:
+        db.rollback()  # Otro worker la registró primero; ambas URLs sirven
+    finally:
+        db.close()
+
+
+def _upload_variants(path: str, storage: StorageBackend) -> Dict[str, Any]:
+    extension = _EXTENSIONS.get(IMAGE_FORMAT, ".img")
+    urls = {}
+    bytes_out = 0
+    for label, data in render_variants(path):
+        with tempfile.NamedTemporaryFile(delete=False, suffix=extension) as temp:
+            temp.write(data)
+        try:
+            urls[label] = storage.save(temp.name, f"{label}{extension}")
+        finally:
+            os.unlink(temp.name)
+        bytes_out += len(data)
+    url = urls.pop("original")
+    return {"url": url, "thumbnails": urls, "bytes_out": bytes_out}
+
+
+def store_image(path: str, storage: Optional[StorageBackend] = None) -> Dict[str, Any]:
+    """
+    Procesa y guarda la imagen en `path`, o reutiliza la ya guardada si su
+    contenido es idéntico. Bloqueante: llamar desde un hilo, no del event loop.
+
+    Returns:
+        {"url", "thumbnails", "hash", "deduplicated", "bytes_in", "bytes_out"}
+    """
+    storage = storage or get_storage()
+    digest = file_digest(path)
+    uploaded = []
+
+    def load() -> Dict[str, Any]:
+        known = _lookup(digest)
+        if known is not None:
+            return known
+        result = _upload_variants(path, storage)
+        _record(digest, result["url"], result["thumbnails"])
+        uploaded.append(result["bytes_out"])
+        return {"url": result["url"], "thumbnails": result["thumbnails"]}
+
+    stored = _known_images.get_or_load(digest, load)
+    return {
+        **stored,
+        "hash": digest,
+        "deduplicated": not uploaded,
+        "bytes_in": os.path.getsize(path),
+        "bytes_out": uploaded[0] if uploaded else 0,
+    }
@@ -0,0 +1,39 @@
+# backend-python/app/utils/integrity.py
+"""
+Clasificación de las violaciones de restricciones que devuelve la base de
+datos, para que los servicios escriban directamente (INSERT/UPDATE ...
+RETURNING) y traduzcan el IntegrityError en lugar de consultar antes.
+"""
+from typing import Optional
+
+from sqlalchemy.exc import IntegrityError
+
+UNIQUE = "unique"
+FOREIGN_KEY = "foreign_key"
+NOT_NULL = "not_null"
+
+# Códigos SQLSTATE de PostgreSQL (psycopg2: pgcode; psycopg 3 y asyncpg: sqlstate)
+_PG_CODES = {"23505": UNIQUE, "23503": FOREIGN_KEY, "23502": NOT_NULL}
+# Mensajes de SQLite ("UNIQUE constraint failed: categorias.nombre")
+_SQLITE_MESSAGES = {
+    "UNIQUE constraint failed": UNIQUE,
+    "FOREIGN KEY constraint failed": FOREIGN_KEY,
+    "NOT NULL constraint failed": NOT_NULL,
+}
+
+
+def violation(error: IntegrityError) -> Optional[str]:
+    """
+    Tipo de restricción violada (UNIQUE, FOREIGN_KEY, NOT_NULL) o None si
+    no se reconoce
+    """
+    orig = error.orig
+    code = getattr(orig, "pgcode", None) or getattr(orig, "sqlstate", None)
+    if code:
+        return _PG_CODES.get(code)
+    message = str(orig)
+    for prefix, kind in _SQLITE_MESSAGES.items():
+        if message.startswith(prefix):
+            return kind
+    return None
+
@@ -0,0 +1,468 @@
+# backend-python/app/utils/metrics.py
+"""
+Métricas en proceso con exposición en formato texto de Prometheus.
+
+Cada worker de gunicorn tiene su propio registro. Con METRICS_DIR definido
+(gunicorn.conf.py lo define y lo vacía al arrancar el master), cada worker
+vuelca periódicamente un snapshot a METRICS_DIR/<pid>.json y /metrics
+fusiona todos los archivos: contadores e histogramas se suman y los gauges
+sólo se suman para los workers vivos.
+
+Los contadores de un worker terminado se pasan a METRICS_DIR/retired.json
+antes de borrar su archivo, para que los totales no retrocedan. Un worker
+nuevo que recibe el pid de uno terminado hace lo mismo con el archivo
+anterior antes de sobrescribirlo.
+"""
+import bisect
+import fcntl
+import glob
+import json
+import os
+import threading
+import time
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+METRICS_DIR = os.getenv("METRICS_DIR", "")
+METRICS_FLUSH_SECONDS = float(os.getenv("METRICS_FLUSH_SECONDS", "1"))
+
+# Límites superiores (en segundos) de los buckets de latencia por defecto
+DEFAULT_BUCKETS = (
+    0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+    0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0,
+)
+
+
+class Histogram:
+    """
+    Histograma de buckets fijos (estilo Prometheus), seguro entre hilos
+    """
+
+    def __init__(self, buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        self._counts = [0] * (len(self.buckets) + 1)  # el último es +Inf
+        self._sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float) -> None:
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self._counts[index] += 1
+            self._sum += value
+
+    def snapshot(self) -> Dict:
+        with self._lock:
+            counts = list(self._counts)
+            total = self._sum
+        return {"buckets": list(self.buckets), "counts": counts, "sum": total, "count": sum(counts)}
+
+
+def quantile(buckets: Sequence[float], counts: List[int], q: float) -> float:
+    """
+    Estima el cuantil q (0-1) interpolando dentro del bucket, como
+    histogram_quantile de Prometheus
+    """
+    total = sum(counts)
+    if not total:
+        return 0.0
+    rank = q * total
+    seen = 0
+    for i, count in enumerate(counts):
+        if seen + count >= rank and count:
+            if i >= len(buckets):
+                return buckets[-1]
+            lower = buckets[i - 1] if i else 0.0
+            return lower + (buckets[i] - lower) * (rank - seen) / count
+        seen += count
+    return buckets[-1]
+
+
+def summarize(snapshot: Dict) -> Dict:
+    """
+    Agrega p50/p95/p99 y media (en milisegundos) a un snapshot de Histogram
+    """
+    buckets, counts = snapshot["buckets"], snapshot["counts"]
+    count = snapshot["count"]
+    return {
+        "count": count,
+        "mean_ms": round(snapshot["sum"] / count * 1000, 3) if count else 0.0,
+        "p50_ms": round(quantile(buckets, counts, 0.50) * 1000, 3),
+        "p95_ms": round(quantile(buckets, counts, 0.95) * 1000, 3),
+        "p99_ms": round(quantile(buckets, counts, 0.99) * 1000, 3),
+    }
+
+
+# --- Familias con etiquetas ---
+
+class _Family:
+    type = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[Tuple[str, ...], object] = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Sequence[str]) -> Tuple[str, ...]:
+        if len(labels) != len(self.labelnames):
+            raise ValueError(f"{self.name} espera etiquetas {self.labelnames}")
+        return tuple(str(v) for v in labels)
+
+    def _sample_value(self, value):
+        return value
+
+    def reset(self) -> None:
+        with self._lock:
+            self._values.clear()
+
+    def snapshot(self) -> Dict:
+        with self._lock:
+            items = list(self._values.items())
+        return {
+            "type": self.type,
+            "help": self.documentation,
+            "labels": list(self.labelnames),
+            "samples": [[list(k), self._sample_value(v)] for k, v in items],
+        }
+
+
+class Counter(_Family):
+    type = "counter"
+
+    def inc(self, *labels: str, amount: float = 1.0) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+
+class Gauge(_Family):
+    type = "gauge"
+
+    def inc(self, *labels: str, amount: float = 1.0) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def dec(self, *labels: str, amount: float = 1.0) -> None:
+        self.inc(*labels, amount=-amount)
+
+    def set(self, *labels: str, value: float) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+
+class HistogramFamily(_Family):
+    type = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def labels(self, *labels: str) -> Histogram:
+        key = self._key(labels)
+        histogram = self._values.get(key)
+        if histogram is None:
+            with self._lock:
+                histogram = self._values.setdefault(key, Histogram(self.buckets))
+        return histogram
+
+    def observe(self, *labels: str, value: float) -> None:
+        self.labels(*labels).observe(value)
+
+    def _sample_value(self, value):
+        return value.snapshot()
+
+
+class Registry:
+    """
+    Conjunto de familias de este proceso más colectores que generan
+    familias al momento del snapshot (estado del pool, de la caché...)
+    """
+
+    def __init__(self):
+        self._families: Dict[str, _Family] = {}
+        self._collectors: List[Callable[[], Dict[str, Dict]]] = []
+        self._lock = threading.Lock()
+
+    def _register(self, family: _Family) -> _Family:
+        with self._lock:
+            existing = self._families.get(family.name)
+            if existing is not None:
+                return existing
+            self._families[family.name] = family
+            return family
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self._register(Gauge(name, documentation, labelnames))
+
+    def histogram(
+        self, name: str, documentation: str, labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ) -> HistogramFamily:
+        return self._register(HistogramFamily(name, documentation, labelnames, buckets))
+
+    def add_collector(self, collector: Callable[[], Dict[str, Dict]]) -> None:
+        """
+        `collector()` devuelve {nombre: familia} con el mismo formato que
+        _Family.snapshot()
+        """
+        self._collectors.append(collector)
+
+    def snapshot(self) -> Dict[str, Dict]:
+        families = {name: family.snapshot() for name, family in list(self._families.items())}
+        for collector in self._collectors:
+            try:
+                families.update(collector())
+            except Exception as e:  # Un colector roto no debe tumbar /metrics
+                print(f"⚠️ Error en colector de métricas: {e}")
+        return families
+
+    def reset(self) -> None:
+        for family in list(self._families.values()):
+            family.reset()
+
+
+REGISTRY = Registry()
+
+# Un worker creado por fork (gunicorn --preload) no debe heredar lo que midió
+# el master: se sumaría una vez por worker al agregar
+os.register_at_fork(after_in_child=REGISTRY.reset)
+
+
+def family(kind: str, documentation: str, samples: Iterable, labels: Sequence[str] = ()) -> Dict:
+    """
+    Construye una familia para colectores: samples = [(valores_etiquetas, valor)]
+    """
+    return {
+        "type": kind,
+        "help": documentation,
+        "labels": list(labels),
+        "samples": [[list(values), value] for values, value in samples],
+    }
+
+
+# --- Agregación entre workers ---
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+RETIRED_FILE = "retired.json"
+# pid para el que este proceso ya reclamó su archivo (cambia tras un fork)
+_owned_pid: Optional[int] = None
+
+
+class _DirectoryLock:
+    """
+    Lock entre procesos (flock) para mover contadores a retired.json
+    """
+
+    def __init__(self, directory: str):
+        self.path = os.path.join(directory, ".lock")
+
+    def __enter__(self):
+        self._file = open(self.path, "a")
+        fcntl.flock(self._file, fcntl.LOCK_EX)
+        return self
+
+    def __exit__(self, *exc):
+        fcntl.flock(self._file, fcntl.LOCK_UN)
+        self._file.close()
+
+
+def _read(path: str) -> Optional[Dict]:
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _write_atomic(path: str, data: Dict) -> None:
+    # El hilo exportador y /metrics pueden escribir a la vez
+    temp = f"{path}.{threading.get_ident()}.tmp"
+    with open(temp, "w") as f:
+        json.dump(data, f)
+    os.replace(temp, path)  # Los lectores nunca ven un archivo a medias
+
+
+def _as_families(merged: Dict[str, Dict]) -> Dict[str, Dict]:
+    # Inverso de _merge_into: muestras de dict por etiquetas a lista
+    return {
+        name: {**data, "samples": [[list(key), value] for key, value in data["samples"].items()]}
+        for name, data in merged.items()
+    }
+
+
+def _retire(directory: str, path: str) -> None:
+    """
+    Suma los contadores e histogramas de `path` (un worker terminado) a
+    retired.json y borra el archivo. Debe llamarse con _DirectoryLock tomado.
+    """
+    data = _read(path)
+    if data is not None:
+        retired_path = os.path.join(directory, RETIRED_FILE)
+        merged: Dict[str, Dict] = {}
+        retired = _read(retired_path)
+        if retired is not None:
+            _merge_into(merged, retired["families"], alive=False)
+        _merge_into(merged, data["families"], alive=False)
+        _write_atomic(retired_path, {"retired": True, "families": _as_families(merged)})
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+def _claim(directory: str, path: str) -> None:
+    """
+    Primera escritura de este proceso: un archivo con el mismo pid es de un
+    worker anterior que ya terminó, así que sus contadores se retiran antes
+    de sobrescribirlo
+    """
+    global _owned_pid
+    if os.path.exists(path):
+        with _DirectoryLock(directory):
+            _retire(directory, path)
+    _owned_pid = os.getpid()
+
+
+def write_snapshot(registry: Registry = REGISTRY, directory: str = METRICS_DIR) -> None:
+    if not directory:
+        return
+    pid = os.getpid()
+    path = os.path.join(directory, f"{pid}.json")
+    if _owned_pid != pid:
+        _claim(directory, path)
+    _write_atomic(path, {"pid": pid, "families": registry.snapshot()})
+
+
+def _merge_into(merged: Dict[str, Dict], families: Dict[str, Dict], alive: bool) -> None:
+    for name, data in families.items():
+        if data["type"] == "gauge" and not alive:
+            continue
+        target = merged.setdefault(
+            name, {"type": data["type"], "help": data["help"], "labels": data["labels"], "samples": {}}
+        )
+        samples = target["samples"]
+        for labels, value in data["samples"]:
+            key = tuple(labels)
+            if data["type"] != "histogram":
+                samples[key] = samples.get(key, 0.0) + value
+                continue
+            current = samples.get(key)
+            if current is None or current["buckets"] != value["buckets"]:
+                samples[key] = {**value, "counts": list(value["counts"])}
+            else:
+                current["counts"] = [a + b for a, b in zip(current["counts"], value["counts"])]
+                current["sum"] += value["sum"]
+                current["count"] += value["count"]
+
+
+def collect(registry: Registry = REGISTRY, directory: str = METRICS_DIR) -> Dict[str, Dict]:
+    """
+    Familias agregadas de todos los workers (o sólo de este proceso si no
+    hay METRICS_DIR)
+    """
+    merged: Dict[str, Dict] = {}
+    if not directory:
+        _merge_into(merged, registry.snapshot(), alive=True)
+        return merged
+
+    write_snapshot(registry, directory)
+    snapshots = []
+    for path in glob.glob(os.path.join(directory, "*.json")):
+        data = _read(path)
+        if data is None:
+            continue
+        if data.get("retired"):
+            continue
+        if _pid_alive(int(data["pid"])):
+            snapshots.append(data)
+            continue
+        with _DirectoryLock(directory):
+            # Otro proceso pudo retirarlo ya, o un worker nuevo con el mismo
+            # pid reclamarlo (y retirarlo él mismo) mientras tanto
+            if not _pid_alive(int(data["pid"])):
+                _retire(directory, path)
+
+    for data in snapshots:
+        _merge_into(merged, data["families"], alive=True)
+    retired = _read(os.path.join(directory, RETIRED_FILE))
+    if retired is not None:
+        _merge_into(merged, retired["families"], alive=False)
+    return merged
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels_text(names: Sequence[str], values: Sequence[str], extra: Optional[Tuple[str, str]] = None) -> str:
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(f'{extra[0]}="{extra[1]}"')
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _number(value: float) -> str:
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+
+def render_text(families: Dict[str, Dict]) -> str:
+    """
+    Formato de exposición de texto de Prometheus 0.0.4
+    """
+    lines = []
+    for name in sorted(families):
+        data = families[name]
+        lines.append(f"# HELP {name} {_escape(data['help'])}")
+        lines.append(f"# TYPE {name} {data['type']}")
+        names = data["labels"]
+        for labels, value in sorted(data["samples"].items()):
+            if data["type"] != "histogram":
+                lines.append(f"{name}{_labels_text(names, labels)} {_number(value)}")
+                continue
+            cumulative = 0
+            for bound, count in zip(value["buckets"] + ["+Inf"], value["counts"]):
+                cumulative += count
+                le = bound if isinstance(bound, str) else _number(bound)
+                lines.append(f"{name}_bucket{_labels_text(names, labels, ('le', le))} {cumulative}")
+            lines.append(f"{name}_sum{_labels_text(names, labels)} {repr(float(value['sum']))}")
+            lines.append(f"{name}_count{_labels_text(names, labels)} {value['count']}")
+    return "\n".join(lines) + "\n"
+
+
+_exporter: Optional[threading.Thread] = None
+
+
+def start_exporter(registry: Registry = REGISTRY, directory: str = METRICS_DIR) -> None:
+    """
+    Arranca (una vez por proceso) el hilo que vuelca el snapshot de este
+    worker a METRICS_DIR. Llamar después del fork, en el startup de la app.
+    """
+    global _exporter
+    if not directory or (_exporter is not None and _exporter.is_alive()):
+        return
+    os.makedirs(directory, exist_ok=True)
+
+    def run():
+        while True:
+            try:
+                write_snapshot(registry, directory)
+            except Exception as e:
+                print(f"⚠️ No se pudieron volcar las métricas: {e}")
+            time.sleep(METRICS_FLUSH_SECONDS)
+
+    _exporter = threading.Thread(target=run, name="metrics-exporter", daemon=True)
+    _exporter.start()
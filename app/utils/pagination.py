@@ -0,0 +1,71 @@
+# backend-python/app/utils/pagination.py
+import base64
+import json
+from typing import Any, List, Sequence
+
+from fastapi import HTTPException, status
+
+# Tamaño máximo de página con `after`. La paginación por skip/limit conserva
+# su `limit` sin tope para no romper a los clientes existentes
+CURSOR_MAX_LIMIT = 1000
+
+
+def check_cursor_limit(limit: int) -> int:
+    """
+    Valida `limit` en modo cursor (entre 1 y CURSOR_MAX_LIMIT)
+
+    Raises:
+        HTTPException: 422 si está fuera de rango
+    """
+    if not 1 <= limit <= CURSOR_MAX_LIMIT:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail=f"Con 'after', limit debe estar entre 1 y {CURSOR_MAX_LIMIT}",
+        )
+    return limit
+
+
+def encode_cursor(*values: Any) -> str:
+    """
+    Codifica la clave de la última fila de una página en un cursor opaco
+
+    Args:
+        values: Valores de la clave de ordenamiento de la última fila
+
+    Returns:
+        Cursor en base64 url-safe, sin relleno
+    """
+    raw = json.dumps(list(values), separators=(",", ":"), default=str).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, types: Sequence[type] = (str,)) -> List[Any]:
+    """
+    Decodifica un cursor generado por encode_cursor
+
+    Args:
+        cursor: Cursor recibido del cliente
+        types: Tipo esperado de cada valor de la clave
+
+    Returns:
+        Lista con los valores de la clave
+
+    Raises:
+        HTTPException: Si el cursor está mal formado
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except (ValueError, TypeError):
+        values = None
+
+    if (
+        not isinstance(values, list)
+        or len(values) != len(types)
+        or not all(isinstance(v, t) for v, t in zip(values, types))
+    ):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Cursor de paginación inválido"
+        )
+    return values
@@ -0,0 +1,236 @@
+# backend-python/app/utils/replicas.py
+"""
+Réplicas de lectura (DATABASE_READ_URLS): reparto round-robin entre las
+sanas, comprobación periódica de salud y retraso, y cookie de
+read-your-writes para que un cliente lea de la primaria justo después de
+escribir.
+"""
+import itertools
+import threading
+import time
+from typing import Callable, Dict, List, Optional
+
+from sqlalchemy import event, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import sessionmaker
+
+from .db_pool import PoolStats
+from .metrics import REGISTRY
+
+READ_ROUTING = REGISTRY.counter(
+    "db_read_routing_total", "Destino de las sesiones de lectura", ("target", "reason")
+)
+
+# Retraso de réplica en PostgreSQL; 0 si ya aplicó todo lo recibido (con la
+# primaria sin escrituras pg_last_xact_replay_timestamp no avanza) y NULL si
+# el servidor no es una réplica
+_PG_LAG = text(
+    "SELECT CASE WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0 "
+    "ELSE extract(epoch FROM now() - pg_last_xact_replay_timestamp()) END"
+)
+
+
+class Replica:
+    def __init__(self, name: str, url: str, engine: Engine, async_engine_factory: Callable[[str], object]):
+        self.name = name
+        self.url = url
+        self.engine = engine
+        self._session_factory = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+        self._async_engine_factory = async_engine_factory
+        self.async_engine = None
+        self._async_session_factory = None
+        self.healthy = True  # Hasta la primera comprobación
+        self.lag: Optional[float] = None
+        self.last_error: Optional[str] = None
+        self.checked_at: Optional[float] = None
+        event.listen(engine, "handle_error", self._on_error)
+
+    def session(self):
+        return self._session_factory()
+
+    def async_session(self):
+        if self.async_engine is None:
+            from sqlalchemy.ext.asyncio import async_sessionmaker
+
+            self.async_engine = self._async_engine_factory(self.url)
+            event.listen(self.async_engine.sync_engine, "handle_error", self._on_error)
+            self._async_session_factory = async_sessionmaker(
+                self.async_engine, autoflush=False, expire_on_commit=False
+            )
+        return self._async_session_factory()
+
+    def mark_down(self, error) -> None:
+        if self.healthy:
+            print(f"⚠️ Réplica {self.name} fuera de servicio: {error}")
+        self.healthy = False
+        self.last_error = str(error)
+
+    def _on_error(self, context) -> None:
+        # Caída de conexión o fallo al conectar: se deja de elegir hasta que
+        # la comprobación periódica vuelva a darla por sana
+        if context.is_pre_ping:
+            return
+        if context.is_disconnect or context.connection is None:
+            self.mark_down(context.original_exception)
+
+    def check(self, max_lag: float) -> None:
+        try:
+            with self.engine.connect() as conn:
+                if conn.dialect.name == "postgresql":
+                    lag = conn.execute(_PG_LAG).scalar()
+                else:
+                    conn.execute(text("SELECT 1"))
+                    lag = 0
+        except Exception as e:
+            self.mark_down(e)
+            self.checked_at = time.time()
+            return
+        self.lag = float(lag) if lag is not None else None
+        self.checked_at = time.time()
+        if self.lag is not None and self.lag > max_lag:
+            self.mark_down(f"retraso de {self.lag:.1f}s (máximo {max_lag}s)")
+            return
+        if not self.healthy:
+            print(f"✅ Réplica {self.name} de nuevo en servicio")
+        self.healthy = True
+        self.last_error = None
+
+    def dispose_after_fork(self) -> None:
+        self.engine.dispose(close=False)
+        if hasattr(self.engine.pool, "stats"):
+            self.engine.pool.stats = PoolStats()
+
+    def status(self) -> Dict:
+        return {
+            "healthy": self.healthy,
+            "lag_s": self.lag,
+            "last_error": self.last_error,
+            "checked_at": self.checked_at,
+        }
+
+
+class ReplicaSet:
+    """
+    Conjunto de réplicas de lectura. Vacío (falso) si no hay ninguna
+    configurada: todas las lecturas van a la primaria.
+    """
+
+    def __init__(
+        self,
+        urls: List[str],
+        engine_factory: Callable[[str], Engine],
+        async_engine_factory: Callable[[str], object],
+        check_seconds: float = 5.0,
+        max_lag: float = 10.0,
+    ):
+        self.replicas = [
+            Replica(f"read-{i}", url, engine_factory(url), async_engine_factory)
+            for i, url in enumerate(urls)
+        ]
+        self.check_seconds = check_seconds
+        self.max_lag = max_lag
+        self._turn = itertools.count()
+        self._checker: Optional[threading.Thread] = None
+
+    def __bool__(self) -> bool:
+        return bool(self.replicas)
+
+    def choose(self, sticky: bool = False) -> Optional[Replica]:
+        """
+        Réplica para la siguiente lectura, o None para leer de la primaria
+        (el cliente escribió hace poco o no hay réplicas sanas)
+        """
+        if sticky:
+            READ_ROUTING.inc("primary", "sticky")
+            return None
+        healthy = [replica for replica in self.replicas if replica.healthy]
+        if not healthy:
+            READ_ROUTING.inc("primary", "fallback")
+            return None
+        replica = healthy[next(self._turn) % len(healthy)]
+        READ_ROUTING.inc(replica.name, "replica")
+        return replica
+
+    def check_all(self) -> None:
+        for replica in self.replicas:
+            replica.check(self.max_lag)
+
+    def start_health_checks(self) -> None:
+        """
+        Arranca (una vez por proceso, después del fork) el hilo que comprueba
+        las réplicas cada `check_seconds`
+        """
+        if not self.replicas or self.check_seconds <= 0 or (
+            self._checker is not None and self._checker.is_alive()
+        ):
+            return
+
+        def run():
+            while True:
+                self.check_all()
+                time.sleep(self.check_seconds)
+
+        self._checker = threading.Thread(target=run, name="replica-health", daemon=True)
+        self._checker.start()
+
+    def dispose_after_fork(self) -> None:
+        for replica in self.replicas:
+            replica.dispose_after_fork()
+
+    def engines(self) -> Dict[str, object]:
+        created = {}
+        for replica in self.replicas:
+            created[replica.name] = replica.engine
+            if replica.async_engine is not None:
+                created[f"{replica.name}-async"] = replica.async_engine
+        return created
+
+    def status(self) -> Dict[str, Dict]:
+        return {replica.name: replica.status() for replica in self.replicas}
+
+
+class ReadYourWritesMiddleware:
+    """
+    ASGI puro: tras una escritura correcta pone una cookie con el instante
+    hasta el que ese cliente debe leer de la primaria, para que vea su propio
+    cambio aunque las réplicas vayan con retraso. `is_write(method, path)`
+    decide qué peticiones cuentan como escritura.
+    """
+
+    def __init__(self, app, cookie: str, seconds: float, is_write: Callable[[str, str], bool]):
+        self.app = app
+        self.cookie = cookie
+        self.seconds = seconds
+        self.is_write = is_write
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not self.is_write(scope["method"], scope["path"]):
+            await self.app(scope, receive, send)
+            return
+
+        async def send_with_cookie(message):
+            if message["type"] == "http.response.start" and message["status"] < 400:
+                until = time.time() + self.seconds
+                cookie = (
+                    f"{self.cookie}={until:.3f}; Max-Age={max(1, int(self.seconds))}; "
+                    "Path=/; HttpOnly; SameSite=Lax"
+                )
+                message["headers"] = list(message.get("headers", [])) + [
+                    (b"set-cookie", cookie.encode("latin-1"))
+                ]
+            await send(message)
+
+        await self.app(scope, receive, send_with_cookie)
+
+
+def is_sticky(cookies: Dict[str, str], cookie: str) -> bool:
+    """
+    Si el cliente escribió hace menos de la ventana de read-your-writes
+    """
+    value = cookies.get(cookie)
+    if not value:
+        return False
+    try:
+        return float(value) > time.time()
+    except ValueError:
+        return False
@@ -0,0 +1,208 @@
+# backend-python/app/utils/request_metrics.py
+"""
+Instrumentación de la API:
+
+- MetricsMiddleware (ASGI puro): latencia por ruta, respuestas por código,
+  peticiones en curso y consultas SQL / tiempo de base de datos por petición.
+- Eventos de SQLAlchemy sobre todos los Engine (también el síncrono que hay
+  debajo de cada AsyncEngine) que suman cada sentencia a la petición actual.
+- Colectores del estado de los pools de conexiones y de las cachés.
+"""
+import time
+from contextvars import ContextVar
+from typing import Dict, List, Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from starlette.datastructures import MutableHeaders
+
+from ..database import engines
+from .metrics import REGISTRY, family
+
+HTTP_REQUESTS = REGISTRY.counter(
+    "http_requests_total", "Peticiones HTTP atendidas", ("method", "route", "status")
+)
+HTTP_LATENCY = REGISTRY.histogram(
+    "http_request_duration_seconds", "Latencia de las peticiones HTTP", ("method", "route")
+)
+HTTP_IN_FLIGHT = REGISTRY.gauge(
+    "http_requests_in_flight", "Peticiones HTTP en curso", ("method",)
+)
+REQUEST_DB_QUERIES = REGISTRY.histogram(
+    "http_request_db_queries", "Sentencias SQL por petición", ("method", "route"),
+    buckets=(0, 1, 2, 3, 4, 5, 8, 13, 21, 50, 100),
+)
+REQUEST_DB_SECONDS = REGISTRY.counter(
+    "http_request_db_seconds_total", "Tiempo en base de datos por ruta", ("method", "route")
+)
+DB_QUERY_LATENCY = REGISTRY.histogram(
+    "db_query_duration_seconds", "Duración de cada sentencia SQL"
+)
+
+# [consultas, segundos] de la petición en curso. Se comparte por referencia:
+# run_in_threadpool y run_sync copian el contexto pero no la lista
+_request_db: ContextVar[Optional[List]] = ContextVar("request_db", default=None)
+
+_UNMATCHED = "unmatched"
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = conn.info.get("query_started")
+    if not started:
+        return
+    elapsed = time.perf_counter() - started.pop()
+    DB_QUERY_LATENCY.observe(value=elapsed)
+    usage = _request_db.get()
+    if usage is not None:
+        usage[0] += 1
+        usage[1] += elapsed
+
+
+def _handle_error(exception_context):
+    # La sentencia falló: no habrá after_cursor_execute que cierre su inicio
+    connection = exception_context.connection
+    if connection is not None and connection.info.get("query_started"):
+        connection.info["query_started"].pop()
+
+
+_instrumented = False
+
+
+def instrument_sqlalchemy() -> None:
+    """
+    Registra los eventos en la clase Engine: aplica a todos los motores,
+    incluidos los creados después
+    """
+    global _instrumented
+    if _instrumented:
+        return
+    event.listen(Engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(Engine, "after_cursor_execute", _after_cursor_execute)
+    event.listen(Engine, "handle_error", _handle_error)
+    _instrumented = True
+
+
+def _route_template(scope) -> str:
+    # El router de Starlette deja la ruta resuelta en el scope; usar su
+    # plantilla ("/api/products/{product_id}") mantiene acotadas las etiquetas
+    route = scope.get("route")
+    template = getattr(route, "path", None)
+    if not template:
+        return _UNMATCHED
+    path = scope.get("path", "")
+    regex = getattr(route, "path_regex", None)
+    if regex is None or regex.match(path):
+        return template
+    # Según la versión de FastAPI, la ruta de un router incluido no lleva el
+    # prefijo: se recupera buscando el sufijo de la URL que encaja
+    index = path.find("/", 1)
+    while index != -1:
+        if regex.match(path[index:]):
+            return path[:index] + template
+        index = path.find("/", index + 1)
+    return template
+
+
+class MetricsMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        usage = [0, 0.0]
+        token = _request_db.set(usage)
+        response_status = [500]
+        started = time.perf_counter()
+        HTTP_IN_FLIGHT.inc(method)
+
+        async def send_with_timing(message):
+            if message["type"] == "http.response.start":
+                response_status[0] = message["status"]
+                headers = MutableHeaders(scope=message)
+                headers.append(
+                    "Server-Timing",
+                    f'db;dur={usage[1] * 1000:.2f};desc="{usage[0]} queries", '
+                    f"app;dur={(time.perf_counter() - started) * 1000:.2f}",
+                )
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            elapsed = time.perf_counter() - started
+            _request_db.reset(token)
+            HTTP_IN_FLIGHT.dec(method)
+            route = _route_template(scope)
+            HTTP_REQUESTS.inc(method, route, str(response_status[0]))
+            HTTP_LATENCY.observe(method, route, value=elapsed)
+            REQUEST_DB_QUERIES.observe(method, route, value=usage[0])
+            REQUEST_DB_SECONDS.inc(method, route, amount=usage[1])
+
+
+# --- Colectores ---
+
+def _collect_pools() -> Dict[str, Dict]:
+    gauges = {"checked_out": [], "overflow": [], "size": [], "waiting": []}
+    timeouts, latency = [], []
+    for name, engine in engines().items():
+        pool = engine.pool
+        if not hasattr(pool, "checkedout"):
+            continue
+        gauges["checked_out"].append(((name,), pool.checkedout()))
+        gauges["overflow"].append(((name,), max(pool.overflow(), 0)))
+        gauges["size"].append(((name,), pool.size()))
+        stats = getattr(pool, "stats", None)
+        if stats is not None:
+            gauges["waiting"].append(((name,), stats.waiting))
+            timeouts.append(((name,), stats.timeouts))
+            latency.append(((name,), stats.checkout_latency.snapshot()))
+
+    families = {
+        f"db_pool_{key}": family("gauge", f"Pool de conexiones: {key}", samples, ("engine",))
+        for key, samples in gauges.items()
+    }
+    families["db_pool_timeouts_total"] = family(
+        "counter", "Checkouts que agotaron pool_timeout", timeouts, ("engine",)
+    )
+    families["db_pool_checkout_seconds"] = family(
+        "histogram", "Espera para obtener una conexión del pool", latency, ("engine",)
+    )
+    return families
+
+
+_caches: Dict[str, object] = {}
+_CACHE_COUNTERS = ("hits", "misses", "coalesced", "evictions", "stale", "invalidations")
+
+
+def register_cache(name: str, cache) -> None:
+    """
+    Expone los contadores de un ReadThroughCache bajo la etiqueta `cache`
+    """
+    _caches[name] = cache
+
+
+def _collect_caches() -> Dict[str, Dict]:
+    stats = {name: cache.stats() for name, cache in _caches.items()}
+    families = {
+        f"cache_{key}_total": family(
+            "counter", f"Caché en proceso: {key}",
+            [((name,), s.get(key, 0)) for name, s in stats.items()], ("cache",),
+        )
+        for key in _CACHE_COUNTERS
+    }
+    families["cache_entries"] = family(
+        "gauge", "Entradas en la caché", [((name,), s["size"]) for name, s in stats.items()], ("cache",)
+    )
+    return families
+
+
+REGISTRY.add_collector(_collect_pools)
+REGISTRY.add_collector(_collect_caches)
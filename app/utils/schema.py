@@ -0,0 +1,207 @@
+# backend-python/app/utils/schema.py
+"""
+Creación y actualización del esquema al arrancar.
+
+ensure_schema compara una huella del esquema esperado (tablas, columnas,
+índices de los modelos más el DDL extra, p. ej. los índices de búsqueda) con
+la guardada en la tabla `schema_meta`. Si coinciden, el arranque hace una
+sola consulta; si no, crea lo que falte y guarda la nueva huella.
+"""
+import hashlib
+from typing import Callable, Iterable, List, Optional, Set
+
+from sqlalchemy import Column, MetaData, String, Table, delete, exc, func, insert, inspect, select, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.sql.elements import TextClause
+
+_meta = MetaData()
+schema_meta = Table(
+    "schema_meta",
+    _meta,
+    Column("clave", String(50), primary_key=True),
+    Column("valor", String(128), nullable=False),
+)
+
+# Clave del advisory lock de PostgreSQL que serializa las migraciones de
+# varios procesos que arrancan a la vez
+_MIGRATION_LOCK_KEY = 0x70726F64
+
+
+def _column_ddl(engine: Engine, column) -> str:
+    dialect = engine.dialect
+    preparer = dialect.identifier_preparer
+    ddl = f"{preparer.format_column(column)} {column.type.compile(dialect=dialect)}"
+
+    default = column.server_default.arg if column.server_default is not None else None
+    if isinstance(default, str):
+        ddl += f" DEFAULT '{default}'"
+    elif isinstance(default, TextClause):
+        ddl += f" DEFAULT {default.text}"
+    elif default is not None and dialect.name != "sqlite":
+        # SQLite no admite defaults no constantes (now()) en ADD COLUMN: las
+        # filas existentes quedan en NULL y las nuevas usan el default del ORM
+        ddl += f" DEFAULT {default.compile(dialect=dialect)}"
+    else:
+        default = None
+
+    if not column.nullable and default is not None:
+        ddl += " NOT NULL"
+    return ddl
+
+
+def add_missing_columns(engine: Engine, metadata: MetaData) -> List[str]:
+    """
+    Agrega a las tablas existentes las columnas nuevas de los modelos
+    (create_all sólo crea tablas). Devuelve las columnas agregadas.
+    """
+    inspector = inspect(engine)
+    added = []
+    with engine.begin() as conn:
+        for table in metadata.sorted_tables:
+            if not inspector.has_table(table.name):
+                continue
+            existing = {c["name"] for c in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name in existing:
+                    continue
+                table_name = engine.dialect.identifier_preparer.format_table(table)
+                conn.execute(text(f"ALTER TABLE {table_name} ADD COLUMN {_column_ddl(engine, column)}"))
+                added.append(f"{table.name}.{column.name}")
+    return added
+
+
+def _index_names(engine: Engine, table_name: str) -> Set[str]:
+    if engine.dialect.name == "sqlite":
+        # El inspector de SQLite omite los índices sobre expresiones (lower(nombre))
+        with engine.connect() as conn:
+            return set(conn.execute(
+                text("SELECT name FROM sqlite_master WHERE type = 'index' AND tbl_name = :t"),
+                {"t": table_name},
+            ).scalars())
+    return {i["name"] for i in inspect(engine).get_indexes(table_name)}
+
+
+def _duplicate_key(engine: Engine, index) -> Optional[tuple]:
+    """
+    Una clave repetida que impediría crear el índice único `index` sobre
+    las filas existentes, o None si no hay
+    """
+    columns = list(index.expressions)
+    query = select(*columns).select_from(index.table).group_by(*columns).having(func.count() > 1).limit(1)
+    dialect = engine.dialect.name
+    where = index.dialect_options[dialect].get("where") if dialect in index.dialect_options else None
+    if where is not None:
+        query = query.where(where)
+    with engine.connect() as conn:
+        row = conn.execute(query).first()
+    return tuple(row) if row is not None else None
+
+
+def add_missing_indexes(engine: Engine, metadata: MetaData, skipped: Optional[List[str]] = None) -> List[str]:
+    """
+    Crea en las tablas existentes los índices nuevos de los modelos
+    (create_all sólo los crea junto con la tabla). Devuelve los creados.
+
+    Un índice único que las filas existentes violan no se crea: se avisa con
+    un ejemplo de clave repetida, se agrega a `skipped` y el arranque sigue
+    (los datos duplicados deben resolverse a mano antes de reintentarlo).
+    """
+    inspector = inspect(engine)
+    added = []
+    for table in metadata.sorted_tables:
+        if not inspector.has_table(table.name):
+            continue
+        existing = _index_names(engine, table.name)
+        missing = [index for index in table.indexes if index.name not in existing]
+        for index in missing:
+            duplicate = _duplicate_key(engine, index) if index.unique else None
+            if duplicate is None:
+                try:
+                    index.create(bind=engine)
+                    continue
+                except exc.IntegrityError as e:
+                    duplicate = e.orig
+            print(
+                f"⚠️ No se creó el índice único {index.name}: hay filas repetidas en "
+                f"{table.name} (p. ej. {duplicate!r}). Resuélvalas y reinicie para crearlo."
+            )
+            if skipped is not None:
+                skipped.append(index.name)
+        if missing:
+            # Los índices con ddl_if de otro motor no se crean
+            created = _index_names(engine, table.name)
+            added.extend(index.name for index in missing if index.name in created)
+    return added
+
+
+def schema_fingerprint(metadata: MetaData, extra: Iterable[str] = ()) -> str:
+    digest = hashlib.blake2b(digest_size=16)
+    for table in metadata.sorted_tables:
+        digest.update(f"T {table.name}\n".encode())
+        for column in table.columns:
+            default = column.server_default.arg if column.server_default is not None else None
+            digest.update(
+                f"C {column.name} {column.type!r} {column.nullable} {column.primary_key} "
+                f"{column.unique} {column.index} {default}\n".encode()
+            )
+        for index in sorted(table.indexes, key=lambda i: i.name or ""):
+            digest.update(f"I {index.name} {[str(e) for e in index.expressions]} {index.unique}\n".encode())
+    for statement in extra:
+        digest.update(f"X {statement}\n".encode())
+    return digest.hexdigest()
+
+
+def _stored_fingerprint(engine: Engine):
+    try:
+        with engine.connect() as conn:
+            return conn.execute(
+                select(schema_meta.c.valor).where(schema_meta.c.clave == "schema")
+            ).scalar()
+    except exc.DBAPIError:
+        return None  # Base de datos nueva: todavía no existe schema_meta
+
+
+def ensure_schema(
+    engine: Engine,
+    metadata: MetaData,
+    steps: Iterable[Callable[[Engine], None]] = (),
+    extra: Iterable[str] = (),
+) -> bool:
+    """
+    Deja el esquema al día. Devuelve True si tuvo que migrar.
+
+    `steps` son funciones extra (engine) -> None que se ejecutan sólo al
+    migrar; `extra` es el DDL que generan, para que cambiarlo cambie la huella.
+    """
+    extra = list(extra)
+    fingerprint = schema_fingerprint(metadata, extra)
+    if _stored_fingerprint(engine) == fingerprint:
+        return False
+
+    with engine.connect() as lock:
+        postgres = engine.dialect.name == "postgresql"
+        if postgres:
+            lock.execute(text("SELECT pg_advisory_lock(:key)"), {"key": _MIGRATION_LOCK_KEY})
+        try:
+            # Otro proceso pudo migrar mientras esperábamos el lock
+            if _stored_fingerprint(engine) == fingerprint:
+                return False
+            metadata.create_all(bind=engine)
+            schema_meta.create(bind=engine, checkfirst=True)
+            for column in add_missing_columns(engine, metadata):
+                print(f"🛠️ Columna agregada: {column}")
+            skipped: List[str] = []
+            for index in add_missing_indexes(engine, metadata, skipped):
+                print(f"🛠️ Índice creado: {index}")
+            for step in steps:
+                step(engine)
+            if skipped:
+                # Sin guardar la huella: el próximo arranque vuelve a intentarlo
+                return True
+            with engine.begin() as conn:
+                conn.execute(delete(schema_meta).where(schema_meta.c.clave == "schema"))
+                conn.execute(insert(schema_meta).values(clave="schema", valor=fingerprint))
+            return True
+        finally:
+            if postgres:
+                lock.execute(text("SELECT pg_advisory_unlock(:key)"), {"key": _MIGRATION_LOCK_KEY})
@@ -1,142 +1,214 @@
 # backend-python/app/utils/seed_products.py
+"""
+Carga categorías y productos de prueba.
+
+    python -m app.utils.seed_products --count 1000000 --offline
+
+- Las imágenes se obtienen (descarga de Picsum o, con --offline, generadas
+  localmente con Pillow) y se suben una sola vez cada una, en paralelo con
+  --workers hilos; después se reparten entre los productos.
+- Los productos se insertan con INSERT multi-fila y se confirman cada
+  --batch-size filas, sin pausas ni consultas por producto.
+"""
+import argparse
+import io
+import os
 import random
-from sqlalchemy.orm import Session
-from ..database import SessionLocal
-from ..models import Product, Category
-from faker import Faker
-from ..utils.cloudinary import upload_image  # Añadir
 import tempfile
-import requests
-import os
 import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import List, Optional
+
+import requests
+from sqlalchemy import insert
+
+from ..database import SessionLocal
+from ..models import Product, Category
+from ..services import category_service
+from ..services.stats_service import get_category_stats
+from ..utils.images import store_image
+from ..utils.storage import MEDIA_ROOT, MEDIA_URL, LocalStorage, set_storage
+
+DEFAULT_CATEGORIES = [
+    {"nombre": "Electrónicos", "descripcion": "Dispositivos electrónicos de consumo"},
+    {"nombre": "Ropa", "descripcion": "Prendas de vestir para hombres, mujeres y niños"},
+    {"nombre": "Alimentos", "descripcion": "Productos alimenticios y bebidas"},
+    {"nombre": "Hogar", "descripcion": "Artículos para el hogar y decoración"},
+    {"nombre": "Deportes", "descripcion": "Equipamiento deportivo y actividades al aire libre"}
+]
+
+# Lista de imágenes de prueba (URLs públicas de Picsum)
+SAMPLE_IMAGE_IDS = [1, 10, 100, 1000, 1001, 1002, 1003, 1004, 1005, 1006]
+
+_FALLBACK_WORDS = (
+    "mesa silla lámpara camisa balón libro reloj taza botella mochila cable "
+    "teclado zapato gorra toalla cuaderno vaso plato sartén manta cojín "
+    "raqueta pelota guante chaqueta pantalón falda vestido café arroz aceite"
+).split()
+
+
+def _vocabulary(size: int = 500) -> List[str]:
+    # Faker es opcional: se usa sólo para construir el vocabulario una vez
+    try:
+        from faker import Faker
+    except ImportError:
+        return _FALLBACK_WORDS
+    return list(set(Faker().words(size)))
+
+
+def _ensure_categories(db) -> List[Category]:
+    existing = {c.nombre for c in db.query(Category.nombre)}
+    missing = [Category(**data) for data in DEFAULT_CATEGORIES if data["nombre"] not in existing]
+    if missing:
+        db.add_all(missing)
+        db.commit()
+        category_service.category_snapshot.invalidate()  # Workers en marcha
+        for category in missing:
+            print(f"✅ Categoría creada: {category.nombre}")
+    return db.query(Category).all()
+
+
+def _download_image(index: int, max_retries: int = 3) -> bytes:
+    url = f"https://picsum.photos/id/{SAMPLE_IMAGE_IDS[index % len(SAMPLE_IMAGE_IDS)]}/200/300"
+    for attempt in range(max_retries):
+        try:
+            response = requests.get(url, timeout=10)
+            response.raise_for_status()
+            if response.content:
+                return response.content
+            print(f"⚠️ Contenido vacío en: {url}")
+        except Exception as e:
+            print(f"❌ Error en intento {attempt+1}/{max_retries} ({url}): {e}")
+        if attempt < max_retries - 1:
+            time.sleep(2 ** attempt)  # Espera exponencial: 1s, 2s
+    raise RuntimeError(f"Fallo definitivo con la imagen: {url}")
+
 
-def seed_products():
+def _generate_image(index: int) -> bytes:
+    from PIL import Image, ImageDraw
+
+    rng = random.Random(index)
+    start = tuple(rng.randint(0, 255) for _ in range(3))
+    end = tuple(rng.randint(0, 255) for _ in range(3))
+    image = Image.new("RGB", (200, 300))
+    draw = ImageDraw.Draw(image)
+    for y in range(300):
+        t = y / 299
+        draw.line([(0, y), (199, y)], fill=tuple(int(a + (b - a) * t) for a, b in zip(start, end)))
+    draw.text((10, 10), f"Producto {index}", fill=(255, 255, 255))
+    buffer = io.BytesIO()
+    image.save(buffer, "JPEG", quality=85)
+    return buffer.getvalue()
+
+
+def _fetch_and_store(index: int, offline: bool) -> Optional[str]:
+    content = _generate_image(index) if offline else _download_image(index)
+    with tempfile.NamedTemporaryFile(delete=False, suffix=".jpg") as temp:
+        temp.write(content)
+    try:
+        # Las imágenes repetidas se reutilizan por hash
+        return store_image(temp.name)["url"]
+    finally:
+        os.unlink(temp.name)
+
+
+def build_image_pool(count: int, workers: int, offline: bool) -> List[str]:
     """
-    Genera y carga categorías y 200 productos de prueba en la base de datos
+    Obtiene y sube `count` imágenes distintas con `workers` hilos
     """
-    fake = Faker()
-    db = SessionLocal()
-    
-    # Crear categorías predeterminadas si no existen
-    default_categories = [
-        {"nombre": "Electrónicos", "descripcion": "Dispositivos electrónicos de consumo"},
-        {"nombre": "Ropa", "descripcion": "Prendas de vestir para hombres, mujeres y niños"},
-        {"nombre": "Alimentos", "descripcion": "Productos alimenticios y bebidas"},
-        {"nombre": "Hogar", "descripcion": "Artículos para el hogar y decoración"},
-        {"nombre": "Deportes", "descripcion": "Equipamiento deportivo y actividades al aire libre"}
-    ]
-    
-    created_categories = []
-    for cat_data in default_categories:
-        existing_category = db.query(Category).filter_by(nombre=cat_data["nombre"]).first()
-        if not existing_category:
-            new_category = Category(**cat_data)
-            db.add(new_category)
-            db.commit()
-            db.refresh(new_category)
-            created_categories.append(new_category)
-            print(f"✅ Categoría creada: {new_category.nombre}")
-    
-    # Obtener todas las categorías existentes
-    categories = db.query(Category).all()
-    
-    if not categories:
-        print("❌ No hay categorías disponibles después de intentar crearlas.")
-        db.close()
-        return
-    
-    # Lista de imágenes de prueba (URLs públicas)
-    # Reemplazar con URLs funcionales de Picsum
-    sample_images = [
-        "https://picsum.photos/id/1/200/300",
-        "https://picsum.photos/id/10/200/300",
-        "https://picsum.photos/id/100/200/300",
-        "https://picsum.photos/id/1000/200/300",
-        "https://picsum.photos/id/1001/200/300",
-        "https://picsum.photos/id/1002/200/300",
-        "https://picsum.photos/id/1003/200/300",
-        "https://picsum.photos/id/1004/200/300",
-        "https://picsum.photos/id/1005/200/300",
-        "https://picsum.photos/id/1006/200/300",
-    ]
-
-    # Generar 200 productos de prueba
-    for i in range(1, 201):
-        # Seleccionar una categoría aleatoria
-        category = random.choice(categories)
-        
-        # Generar datos ficticios para el producto
-        product_name = f"Producto {i} - {fake.word().capitalize()}"
-        sku_prefix = ''.join([c[0] for c in category.nombre.split()]).upper()
-        
-        random_image_url = random.choice(sample_images)
-        imagen_url = None
-
-        max_retries = 3
-
-        for attempt in range(max_retries):
+    urls = []
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(_fetch_and_store, i, offline) for i in range(count)]
+        for future in as_completed(futures):
             try:
-                # Descargar imagen con timeout
-                response = requests.get(random_image_url, timeout=10)
-                response.raise_for_status()
-                
-                if response.content:
-                    with tempfile.NamedTemporaryFile(delete=False, suffix=".jpg") as temp:
-                        temp.write(response.content)
-                        temp_path = temp.name
-                    
-                    if os.path.getsize(temp_path) > 0:
-                        imagen_url = upload_image(temp_path)
-                    else:
-                        print(f"⚠️ Archivo vacío: {random_image_url}")
-                    os.unlink(temp_path)
-                    break  # Salir del bucle si tiene éxito
-                else:
-                    print(f"⚠️ Contenido vacío en: {random_image_url}")
-                    
+                urls.append(future.result())
             except Exception as e:
-                print(f"❌ Error en intento {attempt+1}/{max_retries}: {e}")
-                if attempt < max_retries - 1:
-                    # Espera exponencial: 1s, 2s, 4s
-                    sleep_time = 2 ** attempt
-                    print(f"⏳ Esperando {sleep_time}s antes de reintentar...")
-                    time.sleep(sleep_time)
-                else:
-                    print(f"❌ Fallo definitivo con la imagen: {random_image_url}")
-        
-        # Pequeña pausa entre productos para no saturar
-        time.sleep(0.1)
-
-        # Crear producto
-        new_product = Product(
-            nombre=product_name,
-            descripcion=fake.sentence(),
-            precio=round(random.uniform(10.0, 1000.0), 2),
-            stock=random.randint(0, 100),
-            categoria_id=category.id,
-            sku=f"{sku_prefix}-{fake.unique.bothify(text='####-####')}",
-            imagen_url=imagen_url
-        )
-        
-        db.add(new_product)
-        
-        # Mostrar progreso cada 50 productos
-        if i % 10 == 0:
-            print(f"🔄 Generados {i} productos...")
-    
+                print(f"❌ {e}")
+    return urls
+
+
+def seed_products(
+    count: int = 200,
+    batch_size: int = 5000,
+    workers: int = 8,
+    images: int = 10,
+    offline: bool = False,
+    seed: Optional[int] = None,
+):
+    """
+    Genera y carga categorías y `count` productos de prueba en la base de datos
+    """
+    rng = random.Random(seed)
+    db = SessionLocal()
+    started = time.perf_counter()
+
     try:
-        db.commit()
-        print("✅ 200 productos creados exitosamente")
-        print(f"📊 Distribución por categorías:")
-        for cat in categories:
-            count = db.query(Product).filter_by(categoria_id=cat.id).count()
-            print(f"   - {cat.nombre}: {count} productos")
+        categories = _ensure_categories(db)
+        if not categories:
+            print("❌ No hay categorías disponibles después de intentar crearlas.")
+            return
+
+        if offline:
+            set_storage(LocalStorage(MEDIA_ROOT, MEDIA_URL))
+        image_urls = build_image_pool(images, workers, offline) if images else []
+        print(f"🖼️ {len(image_urls)} imágenes listas en {time.perf_counter() - started:.1f}s")
+
+        words = _vocabulary()
+        # Con --seed también los ids y SKU son reproducibles
+        if seed is not None:
+            new_id = lambda: str(uuid.UUID(int=rng.getrandbits(128), version=4))  # noqa: E731
+        else:
+            new_id = lambda: str(uuid.uuid4())  # noqa: E731
+        run_id = new_id().replace("-", "")[:6].upper()
+        prefixes = {
+            c.id: ''.join(part[0] for part in c.nombre.split()).upper() for c in categories
+        }
+        category_ids = list(prefixes)
+        table = Product.__table__
+        inserted = 0
+
+        while inserted < count:
+            rows = []
+            for i in range(inserted + 1, min(inserted + batch_size, count) + 1):
+                category_id = rng.choice(category_ids)
+                rows.append({
+                    "id": new_id(),
+                    "nombre": f"Producto {i} - {rng.choice(words).capitalize()}",
+                    "descripcion": " ".join(rng.choices(words, k=8)).capitalize() + ".",
+                    "precio": round(rng.uniform(10.0, 1000.0), 2),
+                    "stock": rng.randint(0, 100),
+                    "categoria_id": category_id,
+                    "sku": f"{prefixes[category_id]}-{run_id}-{i:07d}",
+                    "imagen_url": rng.choice(image_urls) if image_urls else None,
+                })
+            db.execute(insert(table), rows)
+            db.commit()
+            inserted += len(rows)
+            elapsed = time.perf_counter() - started
+            print(f"🔄 Generados {inserted} productos ({inserted / elapsed:.0f} filas/s)...")
+
+        print(f"✅ {inserted} productos creados en {time.perf_counter() - started:.1f}s")
+        # Los triggers de estadísticas ya contaron los productos insertados
+        print("📊 Distribución por categorías:")
+        for stats in get_category_stats(db):
+            print(f"   - {stats['nombre']}: {stats['productos']} productos")
     except Exception as e:
         db.rollback()
         print(f"❌ Error al crear productos: {e}")
+        raise
     finally:
         db.close()
 
+
 # Ejecutar el script solo si se llama directamente
 if __name__ == "__main__":
-    seed_products()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Carga productos de prueba")
+    parser.add_argument("--count", type=int, default=200, help="Número de productos")
+    parser.add_argument("--batch-size", type=int, default=5000, help="Filas por commit")
+    parser.add_argument("--workers", type=int, default=8, help="Hilos para descargar y subir imágenes")
+    parser.add_argument("--images", type=int, default=10, help="Imágenes distintas (0 para ninguna)")
+    parser.add_argument("--offline", action="store_true", help="Generar imágenes localmente y guardarlas en MEDIA_ROOT")
+    parser.add_argument("--seed", type=int, default=None, help="Semilla para datos reproducibles")
+    args = parser.parse_args()
+    seed_products(args.count, args.batch_size, args.workers, args.images, args.offline, args.seed)
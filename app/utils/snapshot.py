@@ -0,0 +1,121 @@
+# backend-python/app/utils/snapshot.py
+import threading
+import time
+from typing import Any, Callable, Dict, Hashable, NamedTuple, Optional, Tuple
+
+
+class _State(NamedTuple):
+    value: Any
+    marker: Hashable        # Marca de la base de datos con la que se construyó
+    local_version: int      # Versión compartida entre workers al cargar
+    checked_at: float       # Última vez que se confirmó la marca
+
+
+class VersionedSnapshot:
+    """
+    Copia completa e inmutable de una tabla pequeña, una por proceso, que se
+    sirve sin consultar la base de datos.
+
+    - Las escrituras de este servidor llaman a invalidate(), que incrementa
+      la versión en `versions` (memoria compartida entre workers): todos los
+      procesos de la máquina reconstruyen en la siguiente lectura.
+    - Cada `max_staleness` segundos una lectura compara además una marca
+      barata de la base de datos (`marker(db)`), para ver cambios hechos por
+      otras máquinas o por fuera de la API. Ese es el máximo desfase posible.
+    - La reconstrucción arma una copia nueva y la publica con una sola
+      asignación: los lectores ven la copia anterior o la nueva, nunca una
+      a medias. No toma locks (en modo async corre dentro del event loop);
+      dos reconstrucciones simultáneas sólo repiten trabajo.
+
+    `load(db)` devuelve (valor, marca) y `size(valor)` el número de filas
+    para stats().
+    """
+
+    def __init__(
+        self,
+        name: str,
+        load: Callable[[Any], Tuple[Any, Hashable]],
+        marker: Callable[[Any], Hashable],
+        max_staleness: float = 5.0,
+        versions=None,
+        size: Callable[[Any], int] = len,
+    ):
+        self.name = name
+        self.max_staleness = max_staleness
+        self.versions = versions
+        self._load = load
+        self._marker = marker
+        self._size = size
+        self._state: Optional[_State] = None
+        self._lock = threading.Lock()  # Sólo protege los contadores
+        self._counters = {"hits": 0, "misses": 0, "stale": 0, "invalidations": 0, "checks": 0}
+
+    def _version(self) -> int:
+        return self.versions.current(self.name) if self.versions is not None else 0
+
+    def _count(self, key: str) -> None:
+        with self._lock:
+            self._counters[key] += 1
+
+    def peek(self) -> Optional[Any]:
+        """
+        La copia vigente si no hace falta consultar la base de datos; None si
+        no hay copia, otro worker la invalidó o toca comprobar la marca
+        """
+        state = self._state
+        if (
+            state is None
+            or state.local_version != self._version()
+            or time.monotonic() - state.checked_at > self.max_staleness
+        ):
+            return None
+        self._count("hits")
+        return state.value
+
+    def get(self, db) -> Any:
+        """
+        La copia vigente; la comprueba o reconstruye con `db` si hace falta
+        """
+        value = self.peek()
+        if value is not None:
+            return value
+
+        state = self._state
+        version = self._version()
+        if state is not None and state.local_version == version:
+            # Sólo venció el plazo: una consulta de la marca y, si no cambió,
+            # se sigue usando la misma copia
+            self._count("checks")
+            if self._marker(db) == state.marker:
+                self._state = state._replace(checked_at=time.monotonic())
+                return state.value
+            self._count("stale")
+        return self.reload(db, version)
+
+    def reload(self, db, version: Optional[int] = None) -> Any:
+        # La versión se lee antes de cargar: una escritura intermedia deja la
+        # copia nueva ya obsoleta en lugar de ocultar el cambio
+        if version is None:
+            version = self._version()
+        self._count("misses")
+        value, marker = self._load(db)
+        self._state = _State(value, marker, version, time.monotonic())
+        return value
+
+    def invalidate(self) -> None:
+        """
+        Descarta la copia en este proceso y en todos los que comparten `versions`
+        """
+        if self.versions is not None:
+            self.versions.bump(self.name)
+        self._state = None
+        self._count("invalidations")
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self._counters)
+        state = self._state
+        stats["size"] = self._size(state.value) if state is not None else 0
+        stats["max_staleness"] = self.max_staleness
+        stats["age_s"] = round(time.monotonic() - state.checked_at, 3) if state is not None else None
+        return stats
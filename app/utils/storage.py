@@ -0,0 +1,109 @@
+# backend-python/app/utils/storage.py
+import os
+import shutil
+import uuid
+from typing import Optional
+
+
+class StorageError(Exception):
+    """El backend no pudo guardar el archivo"""
+
+
+class StorageBackend:
+    """
+    Destino de las imágenes subidas. `save` es bloqueante: se llama desde
+    el pool de hilos de subidas, nunca desde el event loop.
+    """
+
+    name = "base"
+
+    def save(self, path: str, filename: Optional[str] = None) -> str:
+        """
+        Guarda el archivo local `path` y devuelve su URL pública
+        """
+        raise NotImplementedError
+
+
+class CloudinaryStorage(StorageBackend):
+    name = "cloudinary"
+
+    def save(self, path: str, filename: Optional[str] = None) -> str:
+        # Importación diferida: el SDK sólo se carga si alguien sube algo
+        from .cloudinary import upload_image
+
+        url = upload_image(path)
+        if not url:
+            raise StorageError("Cloudinary rechazó la imagen")
+        return url
+
+
+class LocalStorage(StorageBackend):
+    """
+    Guarda las imágenes en un directorio servido por la propia API en
+    `base_url` (ver app.main). Útil para desarrollo y pruebas sin red.
+    """
+
+    name = "local"
+
+    def __init__(self, root: str, base_url: str = "/media"):
+        self.root = root
+        self.base_url = base_url.rstrip("/")
+        os.makedirs(root, exist_ok=True)
+
+    def save(self, path: str, filename: Optional[str] = None) -> str:
+        suffix = os.path.splitext(filename or path)[1].lower()
+        name = f"{uuid.uuid4().hex}{suffix}"
+        try:
+            shutil.copyfile(path, os.path.join(self.root, name))
+        except OSError as e:
+            raise StorageError(str(e)) from e
+        return f"{self.base_url}/{name}"
+
+
+class NullStorage(StorageBackend):
+    """
+    Descarta los archivos y devuelve una URL ficticia. Sirve para medir
+    /api/upload (procesado, deduplicación, base de datos) sin red ni disco;
+    lo usa bench/load_test.py con STORAGE_BACKEND=null.
+    """
+
+    name = "null"
+
+    def __init__(self, base_url: str = "/media/null"):
+        self.base_url = base_url.rstrip("/")
+
+    def save(self, path: str, filename: Optional[str] = None) -> str:
+        suffix = os.path.splitext(filename or path)[1].lower()
+        return f"{self.base_url}/{uuid.uuid4().hex}{suffix}"
+
+
+STORAGE_BACKEND = os.getenv("STORAGE_BACKEND", "cloudinary")
+MEDIA_ROOT = os.getenv("MEDIA_ROOT", os.path.abspath("media"))
+MEDIA_URL = os.getenv("MEDIA_URL", "/media")
+
+_storage: Optional[StorageBackend] = None
+
+
+def get_storage() -> StorageBackend:
+    """
+    Devuelve el backend configurado con STORAGE_BACKEND (cloudinary | local | null)
+    """
+    global _storage
+    if _storage is None:
+        if STORAGE_BACKEND == "local":
+            _storage = LocalStorage(MEDIA_ROOT, MEDIA_URL)
+        elif STORAGE_BACKEND == "null":
+            _storage = NullStorage(f"{MEDIA_URL.rstrip('/')}/null")
+        elif STORAGE_BACKEND == "cloudinary":
+            _storage = CloudinaryStorage()
+        else:
+            raise ValueError(f"STORAGE_BACKEND desconocido: {STORAGE_BACKEND}")
+    return _storage
+
+
+def set_storage(backend: StorageBackend) -> None:
+    """
+    Reemplaza el backend (p. ej. uno falso en pruebas o benchmarks)
+    """
+    global _storage
+    _storage = backend
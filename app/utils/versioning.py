@@ -0,0 +1,116 @@
+# backend-python/app/utils/versioning.py
+import fcntl
+import mmap
+import os
+import struct
+import tempfile
+import zlib
+from typing import Dict
+
+_SLOT = struct.Struct("<Q")
+
+# Archivo compartido por todos los workers de gunicorn de la misma máquina
+VERSION_FILE = os.getenv(
+    "CACHE_VERSION_FILE",
+    os.path.join(tempfile.gettempdir(), "productos_api_versions.bin")
+)
+VERSION_SLOTS = int(os.getenv("CACHE_VERSION_SLOTS", "65536"))
+
+
+class SharedVersionTable:
+    """
+    Tabla de contadores de versión en memoria compartida (mmap).
+
+    Cada clave se asigna a una ranura por crc32; una escritura incrementa la
+    ranura y los lectores de cualquier proceso ven el cambio al instante, sin
+    consultar la base de datos. Dos claves pueden compartir ranura: eso sólo
+    provoca una invalidación de más, nunca una lectura obsoleta.
+    """
+
+    def __init__(self, path: str = VERSION_FILE, slots: int = VERSION_SLOTS):
+        self.path = path
+        self.slots = slots
+        size = slots * _SLOT.size
+        fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o600)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX)
+            try:
+                if os.fstat(fd).st_size < size:
+                    os.ftruncate(fd, size)
+            finally:
+                fcntl.flock(fd, fcntl.LOCK_UN)
+            self._map = mmap.mmap(fd, size)
+        except BaseException:
+            os.close(fd)
+            raise
+        self._fd = fd
+
+    def _offset(self, key: str) -> int:
+        return (zlib.crc32(key.encode()) % self.slots) * _SLOT.size
+
+    def current(self, key: str) -> int:
+        return _SLOT.unpack_from(self._map, self._offset(key))[0]
+
+    def reopen(self) -> None:
+        """
+        Abre un descriptor propio tras un fork. flock bloquea por descripción
+        de archivo abierto: si los workers heredan la del master (gunicorn
+        --preload), sus bump dejan de excluirse entre sí. El mmap se conserva.
+        """
+        fd = os.open(self.path, os.O_RDWR)
+        os.close(self._fd)
+        self._fd = fd
+
+    def bump(self, key: str) -> int:
+        offset = self._offset(key)
+        fcntl.flock(self._fd, fcntl.LOCK_EX)
+        try:
+            version = _SLOT.unpack_from(self._map, offset)[0] + 1
+            _SLOT.pack_into(self._map, offset, version)
+        finally:
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+        return version
+
+
+class LocalVersionTable:
+    """
+    Variante sólo de proceso, para cuando CACHE_VERSION_FILE está vacío
+    """
+
+    def __init__(self):
+        self._versions: Dict[str, int] = {}
+
+    def current(self, key: str) -> int:
+        return self._versions.get(key, 0)
+
+    def bump(self, key: str) -> int:
+        version = self._versions.get(key, 0) + 1
+        self._versions[key] = version
+        return version
+
+
+_tables: Dict[str, object] = {}
+
+
+def shared_versions(namespace: str):
+    """
+    Devuelve la tabla de versiones de un espacio de nombres (p. ej. "productos").
+    Cada espacio usa su propio archivo para no competir por las ranuras.
+    """
+    table = _tables.get(namespace)
+    if table is None:
+        if VERSION_FILE:
+            table = SharedVersionTable(f"{VERSION_FILE}.{namespace}")
+        else:
+            table = LocalVersionTable()
+        _tables[namespace] = table
+    return table
+
+
+def _reopen_after_fork() -> None:
+    for table in _tables.values():
+        if isinstance(table, SharedVersionTable):
+            table.reopen()
+
+
+os.register_at_fork(after_in_child=_reopen_after_fork)
@@ -0,0 +1,3 @@
+# backend-python/bench/__init__.py
+
+# Pruebas de carga y micro-benchmarks; no forman parte de la app desplegada
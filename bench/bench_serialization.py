@@ -0,0 +1,105 @@
+# backend-python/bench/bench_serialization.py
+"""
+Costo por fila de serializar listados de productos: ruta estándar (objetos
+ORM + validación de schemas.Product + json) contra el modo rápido (tuplas
+de columnas + orjson, `?fast=true`).
+
+Mide por separado la consulta y la serialización y, además, la petición
+completa a través de la app. Necesita productos cargados
+(python -m app.utils.seed_products --offline).
+
+Uso:
+    python -m bench.bench_serialization --rows 100 --repeat 200
+"""
+import argparse
+import json
+import statistics
+import time
+from typing import Callable, List
+
+from pydantic import TypeAdapter
+
+from app.database import SessionLocal
+from app.schemas import Product
+from app.services import product_service
+from app.utils.fast_json import dumps, orjson, records
+
+_products_adapter = TypeAdapter(List[Product])
+
+
+def _standard_encode(items) -> bytes:
+    # Lo que hace FastAPI con response_model: validar desde atributos,
+    # volcar a tipos JSON y codificar con json de la stdlib
+    validated = _products_adapter.validate_python(items, from_attributes=True)
+    content = _products_adapter.dump_python(validated, mode="json")
+    return json.dumps(content, ensure_ascii=False, allow_nan=False, separators=(",", ":")).encode("utf-8")
+
+
+def _fast_encode(rows) -> bytes:
+    return dumps(records(product_service.PRODUCT_ROW_FIELDS, rows))
+
+
+def _timeit(fn: Callable, repeat: int) -> float:
+    """Mediana en segundos de `repeat` ejecuciones"""
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - started)
+    return statistics.median(samples)
+
+
+def _per_row_us(seconds: float, rows: int) -> str:
+    return f"{seconds / rows * 1e6:8.2f} µs/fila"
+
+
+def run(rows: int, repeat: int, http: bool) -> None:
+    db = SessionLocal()
+    try:
+        items = product_service.get_products(db, 0, rows)
+        tuples = product_service.get_products(db, 0, rows, as_rows=True)
+        count = len(items)
+        if not count:
+            print("❌ No hay productos; cargue datos con app.utils.seed_products")
+            return
+        print(f"📦 {count} filas por página, mediana de {repeat} repeticiones, "
+              f"encoder rápido: {'orjson' if orjson else 'json (orjson no instalado)'}")
+
+        query_orm = _timeit(lambda: (db.expire_all(), product_service.get_products(db, 0, rows)), repeat)
+        query_rows = _timeit(lambda: product_service.get_products(db, 0, rows, as_rows=True), repeat)
+        encode_std = _timeit(lambda: _standard_encode(items), repeat)
+        encode_fast = _timeit(lambda: _fast_encode(tuples), repeat)
+    finally:
+        db.close()
+
+    print("\nConsulta + hidratación")
+    print(f"   estándar (ORM):     {_per_row_us(query_orm, count)}")
+    print(f"   rápido (tuplas):    {_per_row_us(query_rows, count)}")
+    print("Validación + codificación JSON")
+    print(f"   estándar:           {_per_row_us(encode_std, count)}")
+    print(f"   rápido:             {_per_row_us(encode_fast, count)}  (x{encode_std / encode_fast:.1f})")
+    print("Total sin HTTP")
+    total_std, total_fast = query_orm + encode_std, query_rows + encode_fast
+    print(f"   estándar:           {_per_row_us(total_std, count)}")
+    print(f"   rápido:             {_per_row_us(total_fast, count)}  (x{total_std / total_fast:.1f})")
+
+    if http:
+        from fastapi.testclient import TestClient
+        from app.main import app
+
+        with TestClient(app) as client:
+            url = f"/api/products/?limit={rows}"
+            standard = _timeit(lambda: client.get(url), repeat)
+            fast = _timeit(lambda: client.get(url + "&fast=true"), repeat)
+        print(f"Petición completa GET {url}")
+        print(f"   estándar:           {standard * 1000:8.2f} ms ({_per_row_us(standard, count).strip()})")
+        print(f"   fast=true:          {fast * 1000:8.2f} ms ({_per_row_us(fast, count).strip()})  (x{standard / fast:.1f})")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark de serialización de listados")
+    parser.add_argument("--rows", type=int, default=100, help="Filas por página")
+    parser.add_argument("--repeat", type=int, default=200, help="Repeticiones por medición")
+    parser.add_argument("--no-http", action="store_true", help="No medir la petición completa")
+    args = parser.parse_args()
+    run(args.rows, args.repeat, not args.no_http)
@@ -0,0 +1,56 @@
+# backend-python/gunicorn.conf.py
+"""
+Configuración de gunicorn (start.sh).
+
+preload_app importa la app en el master y when_ready la prepara (esquema,
+categorías, índice de búsqueda y caché) antes de crear los workers: cada
+worker nace ya caliente y un reinicio de worker no repite ese trabajo.
+"""
+import os
+import shutil
+import tempfile
+import time
+
+_started = time.perf_counter()
+
+# Cada worker vuelca sus métricas aquí y /metrics las agrega (ver
+# app/utils/metrics.py). Se define antes de importar la app, que lo lee al
+# cargarse, y on_starting lo vacía para no sumar un despliegue anterior
+os.environ.setdefault(
+    "METRICS_DIR",
+    os.path.join(tempfile.gettempdir(), f"productos-metrics-{os.getenv('PORT', '8000')}"),
+)
+
+bind = f"0.0.0.0:{os.getenv('PORT', '8000')}"
+workers = int(os.getenv("WEB_CONCURRENCY", "4"))
+worker_class = "uvicorn.workers.UvicornWorker"
+preload_app = os.getenv("GUNICORN_PRELOAD", "true").lower() in ("1", "true", "yes")
+graceful_timeout = int(os.getenv("GUNICORN_GRACEFUL_TIMEOUT", "30"))
+
+
+def on_starting(server):
+    directory = os.environ["METRICS_DIR"]
+    shutil.rmtree(directory, ignore_errors=True)
+    os.makedirs(directory, exist_ok=True)
+
+
+def when_ready(server):
+    if not preload_app:
+        return
+    from app import bootstrap
+
+    timings = bootstrap.prepare(warm=True)
+    server.log.info(
+        "Master listo en %.3fs (importar app %.3fs, preparar %.3fs)",
+        time.perf_counter() - _started, timings["import_s"], timings["prepare_s"],
+    )
+
+
+def post_fork(server, worker):
+    worker._forked_at = time.perf_counter()
+
+
+def post_worker_init(worker):
+    # Tiempo del fork hasta que el worker cargó la app (sin el startup ASGI,
+    # que registra bootstrap.worker_ready)
+    worker.log.info("Worker %s inicializado en %.3fs", worker.pid, time.perf_counter() - worker._forked_at)
@@ -1,2 +1,4 @@
 #!/bin/bash
-gunicorn -w 4 -k uvicorn.workers.UvicornWorker app.main:app --bind 0.0.0.0:$PORT
\ No newline at end of file
+# gunicorn.conf.py: workers, preload de la app, preparación antes del fork
+# y directorio de métricas compartido entre workers
+exec gunicorn -c gunicorn.conf.py app.main:app
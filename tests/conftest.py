@@ -0,0 +1,33 @@
+# backend-python/tests/conftest.py
+"""
+Las pruebas usan una base SQLite temporal: la configuración de app.database
+se lee al importar, así que el entorno se fija antes de importar la app.
+"""
+import os
+import tempfile
+
+_tmp = tempfile.mkdtemp(prefix="productos-tests-")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_tmp, 'test.db')}"
+os.environ.setdefault("STORAGE_BACKEND", "null")
+os.environ.setdefault("METRICS_DIR", os.path.join(_tmp, "metrics"))
+os.environ.setdefault("CACHE_VERSION_FILE", os.path.join(_tmp, "versions.bin"))
+
+import pytest  # noqa: E402
+
+
+@pytest.fixture(scope="session")
+def prepared():
+    from app import bootstrap
+
+    bootstrap.prepare(warm=False)
+
+
+@pytest.fixture
+def db(prepared):
+    from app.database import SessionLocal
+
+    session = SessionLocal()
+    try:
+        yield session
+    finally:
+        session.close()
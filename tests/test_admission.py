@@ -0,0 +1,180 @@
+# backend-python/tests/test_admission.py
+import asyncio
+
+import pytest
+from starlette.requests import Request
+
+from app.utils.admission import AdmissionMiddleware, ConcurrencyLimiter, admission_slot, default_limiters, route_class
+
+
+def _run(coro):
+    return asyncio.run(coro)
+
+
+async def _settle():
+    # Deja correr a las tareas ya despertadas
+    for _ in range(5):
+        await asyncio.sleep(0)
+
+
+def test_waiters_are_admitted_in_fifo_order():
+    async def scenario():
+        limiter = ConcurrencyLimiter("read", limit=2, queue=5, timeout=5)
+        assert await limiter.acquire() is None
+        assert await limiter.acquire() is None
+        admitted = []
+
+        async def wait(i):
+            assert await limiter.acquire() is None
+            admitted.append(i)
+
+        tasks = [asyncio.create_task(wait(i)) for i in range(3)]
+        await _settle()
+        assert limiter.queued == 3 and admitted == []
+
+        for expected in ([0], [0, 1], [0, 1, 2]):
+            limiter.release()
+            await _settle()
+            assert admitted == expected
+            # El lugar pasa de mano sin liberarse
+            assert limiter.active == 2
+        await asyncio.gather(*tasks)
+        assert limiter.queued == 0
+
+    _run(scenario())
+
+
+def test_full_queue_is_rejected_without_waiting():
+    async def scenario():
+        limiter = ConcurrencyLimiter("write", limit=1, queue=1, timeout=5)
+        assert await limiter.acquire() is None
+        waiting = asyncio.create_task(limiter.acquire())
+        await _settle()
+        assert await limiter.acquire() == "queue_full"
+        limiter.release()
+        assert await waiting is None
+        limiter.release()
+        assert limiter.active == 0
+
+    _run(scenario())
+
+
+def test_wait_past_deadline_times_out():
+    async def scenario():
+        limiter = ConcurrencyLimiter("search", limit=1, queue=2, timeout=0.05)
+        assert await limiter.acquire() is None
+        assert await limiter.acquire() == "timeout"
+        assert limiter.queued == 0 and limiter.active == 1
+        limiter.release()
+        assert limiter.active == 0
+
+    _run(scenario())
+
+
+def test_cancelled_waiter_leaves_the_queue():
+    async def scenario():
+        limiter = ConcurrencyLimiter("read", limit=1, queue=2, timeout=5)
+        assert await limiter.acquire() is None
+        waiting = asyncio.create_task(limiter.acquire())
+        await _settle()
+        waiting.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiting
+        assert limiter.queued == 0
+        limiter.release()
+        assert limiter.active == 0
+
+    _run(scenario())
+
+
+def test_cancelled_after_handoff_returns_the_slot(monkeypatch):
+    # El cliente se va justo cuando se le cede el lugar
+    limiter = ConcurrencyLimiter("read", limit=1, queue=2, timeout=5)
+
+    async def cancelled_after_handoff(waiter, timeout):
+        limiter.release()
+        assert waiter.done()
+        raise asyncio.CancelledError
+
+    async def scenario():
+        assert await limiter.acquire() is None
+        monkeypatch.setattr(asyncio, "wait_for", cancelled_after_handoff)
+        with pytest.raises(asyncio.CancelledError):
+            await limiter.acquire()
+        assert limiter.active == 0 and limiter.queued == 0
+
+    _run(scenario())
+
+
+def test_slot_handed_off_at_the_deadline_is_not_leaked(monkeypatch):
+    # Regresión: con wait_for sobre asyncio.timeout (3.12+) el plazo puede
+    # vencer justo después de que release() cediera el lugar al que espera
+    limiter = ConcurrencyLimiter("read", limit=1, queue=2, timeout=5)
+
+    async def handed_off_at_deadline(waiter, timeout):
+        limiter.release()
+        assert waiter.done()
+        raise asyncio.TimeoutError
+
+    async def scenario():
+        assert await limiter.acquire() is None
+        monkeypatch.setattr(asyncio, "wait_for", handed_off_at_deadline)
+        assert await limiter.acquire() == "timeout"
+        assert limiter.active == 0 and limiter.queued == 0
+
+    _run(scenario())
+
+
+@pytest.mark.parametrize("capacity", range(5, 201))
+def test_default_limits_reserve_the_priority_lane(capacity):
+    limiters = default_limiters(capacity)
+    browse = sum(limiters[name].limit for name in ("read", "search", "write", "upload"))
+    assert limiters["priority"].limit >= 1
+    assert browse <= capacity - limiters["priority"].limit
+
+
+def test_change_feed_goes_through_admission():
+    assert route_class("GET", "/api/changes/") == "read"
+    assert route_class("POST", "/api/products/reservations") == "priority"
+    assert route_class("GET", "/metrics") is None
+
+
+def test_route_can_give_up_its_slot_while_it_waits():
+    limiter = ConcurrencyLimiter("read", limit=1, queue=0, timeout=1)
+    sleeping = asyncio.Event()
+    wake = asyncio.Event()
+    statuses = []
+
+    async def endpoint(scope, receive, send):
+        if scope["path"] == "/api/changes/":
+            slot = admission_slot(Request(scope))
+            slot.release()
+            sleeping.set()
+            await wake.wait()
+            assert await slot.reacquire()
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        await send({"type": "http.response.body", "body": b""})
+
+    app = AdmissionMiddleware(endpoint, limiters={"read": limiter})
+
+    async def request(path):
+        async def receive():
+            return {"type": "http.request", "body": b""}
+
+        async def send(message):
+            if message["type"] == "http.response.start":
+                statuses.append((path, message["status"]))
+
+        await app({"type": "http", "method": "GET", "path": path, "headers": []}, receive, send)
+
+    async def scenario():
+        poll = asyncio.create_task(request("/api/changes/"))
+        await sleeping.wait()
+        # Mientras el long-poll duerme su lugar lo usa otra lectura
+        await request("/api/products/")
+        wake.set()
+        await poll
+        assert limiter.active == 0
+
+    _run(scenario())
+    assert statuses == [("/api/products/", 200), ("/api/changes/", 200)]
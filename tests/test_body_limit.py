@@ -0,0 +1,72 @@
+# backend-python/tests/test_body_limit.py
+import asyncio
+
+from fastapi import FastAPI, File, UploadFile
+from starlette.testclient import TestClient
+
+from app.utils.body_limit import BodySizeLimitMiddleware
+
+LIMIT = 1000
+
+
+def _app():
+    app = FastAPI()
+    received = []
+
+    @app.post("/api/upload/upload")
+    async def upload(file: UploadFile = File(...)):
+        data = await file.read()
+        received.append(len(data))
+        return {"size": len(data)}
+
+    return BodySizeLimitMiddleware(app, max_bytes=LIMIT, paths=("/api/upload",), detail="Demasiado grande"), received
+
+
+def test_declared_length_over_the_limit_is_rejected_without_reading_the_body():
+    app, received = _app()
+    reads = []
+    messages = []
+
+    async def receive():
+        reads.append(1)
+        return {"type": "http.request", "body": b"x" * (LIMIT + 1), "more_body": False}
+
+    async def send(message):
+        messages.append(message)
+
+    scope = {
+        "type": "http", "method": "POST", "path": "/api/upload/upload", "query_string": b"",
+        "headers": [(b"content-length", str(LIMIT + 1).encode())],
+    }
+    asyncio.run(app(scope, receive, send))
+
+    assert messages[0]["status"] == 413
+    assert reads == [] and received == []
+
+
+def test_streamed_body_over_the_limit_is_cut_while_receiving():
+    app, received = _app()
+
+    def chunks():
+        for _ in range(10):
+            yield b"x" * 200
+
+    client = TestClient(app)
+    response = client.post(
+        "/api/upload/upload",
+        content=chunks(),
+        headers={"Content-Type": "multipart/form-data; boundary=limite"},
+    )
+    assert response.status_code == 413
+    assert response.json()["detail"] == "Demasiado grande"
+    assert received == []
+
+
+def test_uploads_within_the_limit_and_other_paths_pass():
+    app, received = _app()
+    client = TestClient(app)
+    response = client.post("/api/upload/upload", files={"file": ("a.png", b"x" * 100, "image/png")})
+    assert response.status_code == 200 and received == [100]
+
+    response = client.post("/api/otra", content=b"x" * (LIMIT + 1))
+    assert response.status_code == 404
@@ -0,0 +1,157 @@
+# backend-python/tests/test_cache.py
+import asyncio
+import threading
+import time
+
+import pytest
+
+from app.utils.cache import ReadThroughCache
+from app.utils.versioning import LocalVersionTable
+
+THREADS = 8
+
+
+def test_concurrent_loads_of_a_key_call_the_loader_once():
+    cache = ReadThroughCache()
+    release = threading.Event()
+    calls = []
+    results = []
+
+    def loader():
+        calls.append(1)
+        release.wait(5)
+        return "valor"
+
+    def worker():
+        results.append(cache.get_or_load("p1", loader))
+
+    threads = [threading.Thread(target=worker) for _ in range(THREADS)]
+    for thread in threads:
+        thread.start()
+    # Los demás se unen a la carga en curso antes de que termine
+    deadline = time.monotonic() + 5
+    while cache.stats()["coalesced"] < THREADS - 1 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    release.set()
+    for thread in threads:
+        thread.join()
+
+    assert len(calls) == 1
+    assert results == ["valor"] * THREADS
+    assert cache.stats()["coalesced"] == THREADS - 1
+    assert cache.get_or_load("p1", lambda: pytest.fail("debía salir de la caché")) == "valor"
+
+
+def test_loader_error_reaches_every_waiter_and_is_not_cached():
+    cache = ReadThroughCache()
+
+    def failing():
+        raise RuntimeError("base caída")
+
+    with pytest.raises(RuntimeError):
+        cache.get_or_load("p1", failing)
+    assert cache.get_or_load("p1", lambda: "valor") == "valor"
+
+
+def test_none_is_not_cached():
+    cache = ReadThroughCache()
+    calls = []
+
+    def loader():
+        calls.append(1)
+        return None
+
+    assert cache.get_or_load("falta", loader) is None
+    assert cache.get_or_load("falta", loader) is None
+    assert len(calls) == 2
+
+
+def test_entries_expire_after_ttl():
+    cache = ReadThroughCache(ttl=0.05)
+    assert cache.get_or_load("p1", lambda: "viejo") == "viejo"
+    time.sleep(0.06)
+    assert cache.get_or_load("p1", lambda: "nuevo") == "nuevo"
+    assert cache.stats()["stale"] == 1
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = ReadThroughCache(maxsize=2)
+    cache.get_or_load("a", lambda: 1)
+    cache.get_or_load("b", lambda: 2)
+    cache.get_or_load("a", lambda: pytest.fail("'a' debía seguir en caché"))
+    cache.get_or_load("c", lambda: 3)
+
+    assert cache.stats()["evictions"] == 1
+    assert cache.get_or_load("a", lambda: pytest.fail("'a' debía seguir en caché")) == 1
+    assert cache.get_or_load("b", lambda: "recargado") == "recargado"
+
+
+def test_version_bump_discards_the_entry():
+    versions = LocalVersionTable()
+    cache = ReadThroughCache(versions=versions)
+    cache.get_or_load("p1", lambda: "viejo")
+    versions.bump("p1")  # Escritura en otro worker
+    assert cache.get_or_load("p1", lambda: "nuevo") == "nuevo"
+
+
+def test_concurrent_async_loads_call_the_loader_once():
+    cache = ReadThroughCache()
+    calls = []
+
+    async def loader():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return "valor"
+
+    async def scenario():
+        return await asyncio.gather(*(cache.aget_or_load("p1", loader) for _ in range(THREADS)))
+
+    assert asyncio.run(scenario()) == ["valor"] * THREADS
+    assert len(calls) == 1
+    assert cache.stats()["coalesced"] == THREADS - 1
+
+
+def test_cancelled_leader_does_not_cancel_waiters():
+    cache = ReadThroughCache()
+    loading = asyncio.Event()
+    calls = []
+
+    async def slow_loader():
+        calls.append("líder")
+        loading.set()
+        await asyncio.sleep(10)
+        return "del líder"
+
+    async def loader():
+        calls.append("seguidor")
+        return "del seguidor"
+
+    async def scenario():
+        leader = asyncio.create_task(cache.aget_or_load("p1", slow_loader))
+        await loading.wait()
+        follower = asyncio.create_task(cache.aget_or_load("p1", loader))
+        await asyncio.sleep(0)
+        assert cache.stats()["coalesced"] == 1  # Espera la carga del líder
+        leader.cancel()  # El cliente que cargaba se desconecta
+        with pytest.raises(asyncio.CancelledError):
+            await leader
+        return await follower
+
+    assert asyncio.run(scenario()) == "del seguidor"
+    assert calls == ["líder", "seguidor"]
+    assert cache.get_or_load("p1", lambda: pytest.fail("debía salir de la caché")) == "del seguidor"
+
+
+def test_async_loader_error_reaches_waiters():
+    cache = ReadThroughCache()
+
+    async def failing():
+        await asyncio.sleep(0.01)
+        raise RuntimeError("base caída")
+
+    async def scenario():
+        return await asyncio.gather(
+            *(cache.aget_or_load("p1", failing) for _ in range(3)), return_exceptions=True
+        )
+
+    assert all(isinstance(result, RuntimeError) for result in asyncio.run(scenario()))
@@ -0,0 +1,144 @@
+# backend-python/tests/test_changes.py
+import threading
+import uuid
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import func, select, text, update
+
+from app.database import SessionLocal
+from app.models import Category, Change, Product
+from app.services import change_service
+
+WRITERS = 4
+UPDATES_PER_WRITER = 15
+
+
+def _create_product(db) -> str:
+    category_id = db.query(Category.id).order_by(Category.id).first()[0]
+    product = Product(
+        nombre="Cambios", precio=1, stock=0, categoria_id=category_id, sku=f"CAMBIOS-{uuid.uuid4().hex[:12]}"
+    )
+    db.add(product)
+    db.commit()
+    return product.id
+
+
+def _changes_of(db, product_id):
+    return db.execute(
+        select(Change).where(Change.entidad == "producto", Change.entidad_id == product_id).order_by(Change.seq)
+    ).scalars().all()
+
+
+def test_feed_is_read_only(db):
+    _create_product(db)
+    db.rollback()
+    pending = select(func.count()).select_from(Change).where(Change.seq.is_(None))
+    before = db.execute(pending).scalar()
+    assert before > 0
+
+    change_service.get_changes(db, change_service.latest_seq(db))
+    db.rollback()
+    # Leer no numera: eso lo hace el hilo de numeración
+    assert db.execute(pending).scalar() == before
+    change_service.assign_sequence(db)
+    assert db.execute(pending).scalar() == 0
+
+
+def test_seq_is_monotonic_across_interleaved_writes(db):
+    change_service.assign_sequence(db)
+    since = change_service.latest_seq(db)
+    db.rollback()
+    ids = [_create_product(db) for _ in range(WRITERS)]
+    done = threading.Event()
+    errors = []
+
+    def writer(product_id):
+        session = SessionLocal()
+        try:
+            for i in range(UPDATES_PER_WRITER):
+                session.execute(update(Product).where(Product.id == product_id).values(stock=i + 1))
+                session.commit()
+        except Exception as e:
+            errors.append(repr(e))
+        finally:
+            session.close()
+
+    def sequencer():
+        session = SessionLocal()
+        try:
+            while not done.is_set():
+                change_service.assign_sequence(session)
+                session.rollback()
+        except Exception as e:
+            errors.append(repr(e))
+        finally:
+            session.close()
+
+    seen = []
+
+    def read_new():
+        nonlocal since
+        session = SessionLocal()
+        try:
+            while True:
+                page = change_service.get_changes(session, since, limit=7, entidad="producto")
+                seen.extend(page["changes"])
+                since = page["next_since"]
+                if not page["has_more"]:
+                    return
+        finally:
+            session.close()
+
+    threads = [threading.Thread(target=writer, args=(product_id,)) for product_id in ids]
+    threads.append(threading.Thread(target=sequencer))
+    for thread in threads:
+        thread.start()
+    # El cliente lee mientras se escribe y se numera
+    while any(thread.is_alive() for thread in threads[:-1]):
+        read_new()
+    done.set()
+    for thread in threads:
+        thread.join()
+    change_service.assign_sequence(db)
+    read_new()
+
+    assert errors == []
+    seqs = [change["seq"] for change in seen]
+    assert seqs == sorted(set(seqs))
+    for product_id in ids:
+        versions = [change["version"] for change in seen if change["id"] == product_id]
+        # Cada escritura se ve exactamente una vez y en orden
+        assert versions == list(range(1, UPDATES_PER_WRITER + 2))
+
+
+def test_compaction_keeps_the_last_change_per_entity(db):
+    product_id = _create_product(db)
+    other_id = _create_product(db)
+    for stock in (1, 2, 3):
+        db.execute(update(Product).where(Product.id == product_id).values(stock=stock))
+        db.commit()
+    change_service.assign_sequence(db)
+    assert len(_changes_of(db, product_id)) == 4
+
+    change_service.compact(db)
+    remaining = _changes_of(db, product_id)
+    assert [(change.operacion, change.version) for change in remaining] == [("update", 4)]
+    assert len(_changes_of(db, other_id)) == 1
+
+
+def test_since_before_purge_is_gone(db):
+    product_id = _create_product(db)
+    change_service.assign_sequence(db)
+    seq = _changes_of(db, product_id)[-1].seq
+    db.execute(
+        update(Change).where(Change.seq <= seq).values(creado_en=text("datetime('now', '-30 days')"))
+    )
+    db.commit()
+    change_service.compact(db)
+
+    with pytest.raises(HTTPException) as error:
+        change_service.get_changes(db, seq - 1)
+    assert error.value.status_code == 410
+    assert error.value.detail["min_since"] >= seq
+    assert change_service.get_changes(db, error.value.detail["min_since"])["next_since"] >= seq
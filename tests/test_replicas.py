@@ -0,0 +1,129 @@
+# backend-python/tests/test_replicas.py
+"""
+Réplicas de lectura con dos ficheros SQLite: la base de las pruebas hace de
+primaria y una copia suya de réplica. Un producto que sólo existe en la copia
+muestra de dónde se leyó.
+"""
+import os
+import sqlite3
+import time
+import uuid
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+from starlette.testclient import TestClient
+
+from app import database, main
+from app.models import Category, Product
+from app.utils.replicas import ReadYourWritesMiddleware, ReplicaSet
+
+WINDOW_SECONDS = 1
+
+
+def _sqlite_path(url: str) -> str:
+    return url.split("sqlite:///", 1)[1]
+
+
+def _replica_set(url: str) -> ReplicaSet:
+    return ReplicaSet(
+        [url],
+        engine_factory=create_engine,
+        async_engine_factory=database._create_async_engine,
+        check_seconds=0,
+    )
+
+
+@pytest.fixture
+def replica_url(prepared, tmp_path):
+    primary = sqlite3.connect(_sqlite_path(database.DATABASE_URL))
+    copy = sqlite3.connect(str(tmp_path / "replica.db"))
+    try:
+        primary.backup(copy)
+    finally:
+        copy.close()
+        primary.close()
+    return f"sqlite:///{tmp_path / 'replica.db'}"
+
+
+@pytest.fixture
+def replica_only_sku(replica_url):
+    sku = f"SOLO-REPLICA-{uuid.uuid4().hex[:8]}"
+    engine = create_engine(replica_url)
+    try:
+        with Session(engine) as session:
+            category_id = session.query(Category.id).order_by(Category.id).first()[0]
+            session.add(Product(nombre="Sólo en la réplica", precio=1, stock=1, categoria_id=category_id, sku=sku))
+            session.commit()
+    finally:
+        engine.dispose()
+    return sku
+
+
+@pytest.fixture
+def replicas(replica_url, monkeypatch):
+    replica_set = _replica_set(replica_url)
+    monkeypatch.setattr(database, "read_replicas", replica_set)
+    yield replica_set
+    for engine in replica_set.engines().values():
+        engine.dispose()
+
+
+@pytest.fixture
+def client(replicas):
+    # main.app sólo monta la cookie si hay réplicas al importar
+    app = ReadYourWritesMiddleware(
+        main.app, cookie=database.READ_YOUR_WRITES_COOKIE, seconds=WINDOW_SECONDS, is_write=main.is_write
+    )
+    return TestClient(app)
+
+
+def _skus(client, prefix):
+    response = client.get("/api/products/", params={"sku_prefix": prefix})
+    assert response.status_code == 200
+    return [item["sku"] for item in response.json()]
+
+
+def test_listing_reads_from_replica(client, replica_only_sku):
+    assert _skus(client, replica_only_sku) == [replica_only_sku]
+
+
+def test_reads_go_to_primary_after_a_write(client, replica_only_sku, db):
+    category_id = db.query(Category.id).order_by(Category.id).first()[0]
+    sku = f"PRIMARIA-{uuid.uuid4().hex[:8]}"
+    response = client.post(
+        "/api/products/",
+        json={"nombre": "Recién creado", "precio": 2, "stock": 1, "categoria_id": category_id, "sku": sku},
+    )
+    assert response.status_code == 201
+    assert database.READ_YOUR_WRITES_COOKIE in response.cookies
+
+    # Dentro de la ventana se lee de la primaria: se ve el propio cambio y no
+    # el producto que sólo tiene la réplica
+    assert _skus(client, sku) == [sku]
+    assert _skus(client, replica_only_sku) == []
+
+    time.sleep(WINDOW_SECONDS + 0.2)
+    assert _skus(client, sku) == []
+    assert _skus(client, replica_only_sku) == [replica_only_sku]
+
+
+def test_unreachable_replica_falls_back_to_primary_until_it_recovers(tmp_path):
+    directory = tmp_path / "todavia-no"
+    replica_set = _replica_set(f"sqlite:///{directory / 'replica.db'}")
+    replica = replica_set.replicas[0]
+    try:
+        replica.check(replica_set.max_lag)
+        assert not replica.healthy
+        assert replica.last_error
+        assert replica_set.choose() is None
+
+        os.makedirs(directory)
+        replica.check(replica_set.max_lag)
+        assert replica.healthy
+        assert replica.last_error is None
+        assert replica_set.choose() is replica
+        # Aunque esté sana, un cliente con escrituras recientes lee de la primaria
+        assert replica_set.choose(sticky=True) is None
+    finally:
+        replica.engine.dispose()
@@ -0,0 +1,90 @@
+# backend-python/tests/test_reservations.py
+import random
+import threading
+import uuid
+
+import pytest
+from fastapi import HTTPException
+
+from app.database import SessionLocal
+from app.models import Category, Product
+from app.services import product_service
+
+THREADS = 8
+CARTS_PER_THREAD = 40
+PRODUCTS = 3
+INITIAL_STOCK = 150
+
+
+def _create_products(db) -> list:
+    category_id = db.query(Category.id).order_by(Category.id).first()[0]
+    ids = []
+    for i in range(PRODUCTS):
+        product = Product(
+            id=str(uuid.uuid4()),
+            nombre=f"Reserva {i}",
+            precio=1,
+            stock=INITIAL_STOCK,
+            categoria_id=category_id,
+            sku=f"RESERVA-{uuid.uuid4().hex[:12]}",
+        )
+        db.add(product)
+        ids.append(product.id)
+    db.commit()
+    return ids
+
+
+def test_concurrent_reservations_never_oversell(db):
+    ids = _create_products(db)
+    lock = threading.Lock()
+    reserved = {product_id: 0 for product_id in ids}
+    rejected = []
+    errors = []
+
+    def worker(seed: int):
+        rng = random.Random(seed)
+        session = SessionLocal()
+        try:
+            for _ in range(CARTS_PER_THREAD):
+                cart = [(rng.choice(ids), rng.randint(1, 3)) for _ in range(rng.randint(1, 4))]
+                try:
+                    lines = product_service.reserve_stock(session, cart)
+                except HTTPException as e:
+                    with lock:
+                        (rejected if e.status_code == 409 else errors).append(repr(e))
+                    continue
+                except Exception as e:
+                    with lock:
+                        errors.append(repr(e))
+                    continue
+                with lock:
+                    for line in lines:
+                        reserved[line["product_id"]] += line["cantidad"]
+        except Exception as e:
+            with lock:
+                errors.append(repr(e))
+        finally:
+            session.close()
+
+    threads = [threading.Thread(target=worker, args=(seed,)) for seed in range(THREADS)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert errors == []
+    # La demanda supera el stock: algunas reservas tienen que rechazarse
+    assert rejected
+    final = dict(db.query(Product.id, Product.stock).filter(Product.id.in_(ids)))
+    for product_id in ids:
+        assert final[product_id] >= 0
+        assert final[product_id] == INITIAL_STOCK - reserved[product_id]
+
+
+def test_reservation_of_missing_product_is_404_and_rolls_back(db):
+    ids = _create_products(db)
+    with pytest.raises(HTTPException) as error:
+        product_service.reserve_stock(db, [(ids[0], 1), ("no-existe", 1)])
+    assert error.value.status_code == 404
+    db.expire_all()
+    assert db.get(Product, ids[0]).stock == INITIAL_STOCK
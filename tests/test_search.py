@@ -0,0 +1,110 @@
+# backend-python/tests/test_search.py
+import uuid
+
+import pytest
+from sqlalchemy import func, select, update
+
+from app.models import Category, Change, Product
+from app.schemas import ProductCreate
+from app.services import change_service, product_service, search_service
+from app.services.search_service import InMemorySearchIndex
+from app.utils.versioning import LocalVersionTable
+
+
+def _add_product(db, nombre, sku, descripcion=None) -> Product:
+    # Por el servicio: también actualiza el índice de este proceso
+    category_id = db.query(Category.id).order_by(Category.id).first()[0]
+    return product_service.create_product(db, ProductCreate(
+        nombre=nombre, descripcion=descripcion, precio=1, stock=1, categoria_id=category_id, sku=sku
+    ))
+
+
+@pytest.fixture
+def token():
+    # Palabra única por prueba: la base se comparte entre pruebas
+    return "zq" + uuid.uuid4().hex[:6]
+
+
+def _names(db, query):
+    return [product.nombre for product in search_service.search_products(db, query)]
+
+
+def test_exact_sku_ranks_first(db, token):
+    _add_product(db, f"{token}-1 repuesto", f"{token}-10")
+    _add_product(db, f"Cafetera {token}", f"{token}-1")
+    _add_product(db, f"Molinillo {token}", f"{token}-2")
+    # SKU idéntico, luego SKU que empieza por la consulta; el resto no contiene la frase
+    assert _names(db, f"{token}-1") == [f"Cafetera {token}", f"{token}-1 repuesto"]
+
+
+def test_every_term_must_match_ignoring_case_and_accents(db, token):
+    _add_product(db, f"Cafetera exprés {token}", f"{token}-a")
+    _add_product(db, f"Café molido {token}", f"{token}-b")
+    _add_product(db, f"Tetera {token}", f"{token}-c", descripcion="Para té, no para café")
+
+    assert sorted(_names(db, f"cafe {token}")) == sorted(
+        [f"Cafetera exprés {token}", f"Café molido {token}", f"Tetera {token}"]
+    )
+    assert sorted(_names(db, f"CAFÉ MOLIDO {token.upper()}")) == [f"Café molido {token}"]
+    assert _names(db, f"expres {token}") == [f"Cafetera exprés {token}"]
+    assert _names(db, f"cafe {token} inexistente") == []
+
+
+@pytest.fixture
+def workers(db):
+    # Dos índices con la misma tabla de versiones hacen de dos workers
+    versions = LocalVersionTable()
+    first, second = (InMemorySearchIndex(versions=versions, staleness=3600) for _ in range(2))
+    first.ensure_loaded(db)
+    second.ensure_loaded(db)
+    db.rollback()
+    return first, second
+
+
+def test_writes_in_one_worker_reach_the_other(db, token, workers):
+    first, second = workers
+    product = _add_product(db, f"Lámpara {token}", f"{token}-l")
+    first.index(product)
+    assert first.search(token) == [product.id]
+    # Todavía sin seq: el cambio confirmado se aplica igualmente
+    second.ensure_current(db)
+    assert second.search(token) == [product.id]
+
+    change_service.assign_sequence(db)
+    db.execute(update(Product).where(Product.id == product.id).values(nombre=f"Farol {token}"))
+    db.commit()
+    first.index(db.get(Product, product.id))
+    change_service.assign_sequence(db)
+    second.ensure_current(db)
+    assert second.search(f"farol {token}") == [product.id]
+    assert second.search(f"lampara {token}") == []
+
+    db.delete(db.get(Product, product.id))
+    db.commit()
+    first.remove(product.id)
+    second.ensure_current(db)
+    assert second.search(token) == []
+
+
+def test_change_with_a_lower_id_numbered_later_is_applied(db, token, workers):
+    first, second = workers
+    product = _add_product(db, f"Mesa {token}", f"{token}-m")
+    change_service.assign_sequence(db)
+    first.index(product)
+    second.ensure_current(db)
+    assert second.search(token) == [product.id]
+
+    # En PostgreSQL un cambio con id menor puede confirmarse después de que
+    # el otro worker ya leyó cambios con ids mayores
+    db.execute(update(Product).where(Product.id == product.id).values(nombre=f"Silla {token}"))
+    db.commit()
+    latest = db.execute(
+        select(Change).where(Change.entidad_id == product.id).order_by(Change.id.desc())
+    ).scalars().first()
+    latest.id = db.execute(select(func.min(Change.id))).scalar() - 1
+    db.commit()
+    first.index(db.get(Product, product.id))
+    change_service.assign_sequence(db)
+
+    second.ensure_current(db)
+    assert second.search(f"silla {token}") == [product.id]